@@ -28,3 +28,23 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def migration_status():
+    """
+    Compare the database's Alembic revision with the latest migration
+
+    Returns:
+        Tuple of (current revision or None, head revision)
+    """
+    from pathlib import Path
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    alembic_config = Config(str(Path(__file__).resolve().parent.parent / "alembic.ini"))
+    alembic_config.set_main_option("script_location", str(Path(__file__).resolve().parent.parent / "migrations"))
+    head = ScriptDirectory.from_config(alembic_config).get_current_head()
+
+    with engine.connect() as connection:
+        current = MigrationContext.configure(connection).get_current_revision()
+    return current, head
@@ -42,11 +42,49 @@ class Settings(BaseSettings):
     FACE_MODEL: str = os.getenv("FACE_MODEL", "hog")
     FACE_ENCODING_MODEL: str = os.getenv("FACE_ENCODING_MODEL", "large")
     MAX_FACE_DISTANCE: float = float(os.getenv("MAX_FACE_DISTANCE", 0.6))
+    FACE_DETECTION_SCALE: float = float(os.getenv("FACE_DETECTION_SCALE", 1.0))
+    FACE_DETECTION_SHORT_SIDE: int = int(os.getenv("FACE_DETECTION_SHORT_SIDE", 0))  # 0 = use FACE_DETECTION_SCALE
+    FACE_DETECTION_UPSAMPLE: int = int(os.getenv("FACE_DETECTION_UPSAMPLE", 1))
+    FACE_MODEL_LOADING: str = os.getenv("FACE_MODEL_LOADING", "lazy")  # lazy or eager
+    FACE_WARMUP_MODELS: str = os.getenv("FACE_WARMUP_MODELS", "")  # e.g. "dlib,opencv,deepface:Facenet"
+    FACE_ANN_INDEX: str = os.getenv("FACE_ANN_INDEX", "flat")  # flat, ivf, float16 or int8
+    FACE_ANN_NLIST: int = int(os.getenv("FACE_ANN_NLIST", 0))  # 0 = sqrt(gallery size)
+    FACE_ANN_NPROBE: int = int(os.getenv("FACE_ANN_NPROBE", 8))
+    FACE_ANN_MIN_SIZE: int = int(os.getenv("FACE_ANN_MIN_SIZE", 20000))
+    FACE_MATCH_REDUCTION: str = os.getenv("FACE_MATCH_REDUCTION", "min")  # per-user score: min or centroid
+    FACE_ANN_SHORTLIST: int = int(os.getenv("FACE_ANN_SHORTLIST", 32))  # rows re-ranked exactly after a quantized scan
+    FACE_GALLERY_SNAPSHOT_DIR: str = os.getenv("FACE_GALLERY_SNAPSHOT_DIR", "")  # empty = always load from DB
+    FACE_SHARED_GALLERY_DIR: str = os.getenv("FACE_SHARED_GALLERY_DIR", "")  # e.g. /dev/shm/campus-face-gallery; empty = per-process gallery
+    FACE_WORKER_POOL_SIZE: int = int(os.getenv("FACE_WORKER_POOL_SIZE", 2))  # 0 = thread in API process
+    FACE_WORKER_QUEUE_DEPTH: int = int(os.getenv("FACE_WORKER_QUEUE_DEPTH", 32))
+    FACE_WORKER_START_METHOD: str = os.getenv("FACE_WORKER_START_METHOD", "spawn")
+    FACE_BATCH_WINDOW_MS: float = float(os.getenv("FACE_BATCH_WINDOW_MS", 10))  # 0 disables verify batching
+    FACE_BATCH_MAX_SIZE: int = int(os.getenv("FACE_BATCH_MAX_SIZE", 16))
+    FACE_SCHEDULE_SCOPE: bool = os.getenv("FACE_SCHEDULE_SCOPE", "true").lower() == "true"  # match a camera's room roster first
+    FACE_SCOPE_GRACE_MINUTES: int = int(os.getenv("FACE_SCOPE_GRACE_MINUTES", 10))
+    FACE_SCOPE_CACHE_SECONDS: float = float(os.getenv("FACE_SCOPE_CACHE_SECONDS", 300))
     
     # Camera Settings
     CAMERA_FRAME_RATE: int = int(os.getenv("CAMERA_FRAME_RATE", 30))
     CAMERA_RESOLUTION_WIDTH: int = int(os.getenv("CAMERA_RESOLUTION_WIDTH", 1280))
     CAMERA_RESOLUTION_HEIGHT: int = int(os.getenv("CAMERA_RESOLUTION_HEIGHT", 720))
+    CAMERA_INGESTION_ENABLED: bool = os.getenv("CAMERA_INGESTION_ENABLED", "false").lower() == "true"
+    CAMERA_ANALYSIS_FPS: float = float(os.getenv("CAMERA_ANALYSIS_FPS", 2))  # frames per second sent for recognition
+    CAMERA_HEARTBEAT_SECONDS: float = float(os.getenv("CAMERA_HEARTBEAT_SECONDS", 10))
+    CAMERA_RECONNECT_SECONDS: float = float(os.getenv("CAMERA_RECONNECT_SECONDS", 5))
+    CAMERA_MOTION_GATE: bool = os.getenv("CAMERA_MOTION_GATE", "true").lower() == "true"  # skip detection on static frames
+    CAMERA_MOTION_MODE: str = os.getenv("CAMERA_MOTION_MODE", "background")  # background or diff
+    CAMERA_MOTION_THRESHOLD: int = int(os.getenv("CAMERA_MOTION_THRESHOLD", 25))  # grey levels
+    CAMERA_MOTION_MIN_AREA: float = float(os.getenv("CAMERA_MOTION_MIN_AREA", 0.01))  # share of changed pixels
+    CAMERA_MOTION_MAX_IDLE_SECONDS: float = float(os.getenv("CAMERA_MOTION_MAX_IDLE_SECONDS", 10))
+    CAMERA_TRACKING: bool = os.getenv("CAMERA_TRACKING", "true").lower() == "true"  # encode tracked faces only when needed
+    CAMERA_TRACK_IOU_THRESHOLD: float = float(os.getenv("CAMERA_TRACK_IOU_THRESHOLD", 0.3))
+    CAMERA_TRACK_MAX_AGE_SECONDS: float = float(os.getenv("CAMERA_TRACK_MAX_AGE_SECONDS", 2))
+    CAMERA_TRACK_REENCODE_SECONDS: float = float(os.getenv("CAMERA_TRACK_REENCODE_SECONDS", 5))
+    CAMERA_TRACK_QUALITY_GAIN: float = float(os.getenv("CAMERA_TRACK_QUALITY_GAIN", 1.25))
+    CAMERA_TRACK_VOTE_MIN: int = int(os.getenv("CAMERA_TRACK_VOTE_MIN", 3))  # k of CAMERA_TRACK_VOTE_WINDOW
+    CAMERA_TRACK_VOTE_WINDOW: int = int(os.getenv("CAMERA_TRACK_VOTE_WINDOW", 5))
+    CAMERA_EVENT_COOLDOWN_SECONDS: float = float(os.getenv("CAMERA_EVENT_COOLDOWN_SECONDS", 300))
     STREAM_QUALITY: str = os.getenv("STREAM_QUALITY", "high")
     
     # RFID Settings
@@ -83,10 +121,30 @@ class Settings(BaseSettings):
     MAX_LOGIN_ATTEMPTS: int = int(os.getenv("MAX_LOGIN_ATTEMPTS", 5))
     LOCKOUT_DURATION_MINUTES: int = int(os.getenv("LOCKOUT_DURATION_MINUTES", 30))
     
+    # Listings
+    PAGINATION_MAX_LIMIT: int = int(os.getenv("PAGINATION_MAX_LIMIT", 1000))
+    PAGINATION_COUNT_CACHE_SECONDS: float = float(os.getenv("PAGINATION_COUNT_CACHE_SECONDS", 60))  # reuse total=exact counts
+    
     # Attendance
     AUTO_CHECKOUT_HOURS: int = int(os.getenv("AUTO_CHECKOUT_HOURS", 12))
     LATE_ARRIVAL_THRESHOLD_MINUTES: int = int(os.getenv("LATE_ARRIVAL_THRESHOLD_MINUTES", 15))
     EARLY_DEPARTURE_THRESHOLD_MINUTES: int = int(os.getenv("EARLY_DEPARTURE_THRESHOLD_MINUTES", 15))
+    ATTENDANCE_BATCH_MAX_EVENTS: int = int(os.getenv("ATTENDANCE_BATCH_MAX_EVENTS", 1000))
+    ATTENDANCE_WRITE_MODE: str = os.getenv("ATTENDANCE_WRITE_MODE", "sync")  # sync, memory or journal
+    ATTENDANCE_JOURNAL_PATH: str = os.getenv("ATTENDANCE_JOURNAL_PATH", "data/attendance.journal")
+    ATTENDANCE_JOURNAL_FSYNC: bool = os.getenv("ATTENDANCE_JOURNAL_FSYNC", "true").lower() == "true"
+    ATTENDANCE_QUEUE_MAX: int = int(os.getenv("ATTENDANCE_QUEUE_MAX", 10000))
+    ATTENDANCE_FLUSH_INTERVAL_MS: float = float(os.getenv("ATTENDANCE_FLUSH_INTERVAL_MS", 200))
+    ATTENDANCE_FLUSH_MAX_EVENTS: int = int(os.getenv("ATTENDANCE_FLUSH_MAX_EVENTS", 500))
+    ATTENDANCE_FLUSH_MAX_ATTEMPTS: int = int(os.getenv("ATTENDANCE_FLUSH_MAX_ATTEMPTS", 5))
+    ATTENDANCE_DEAD_LETTER_PATH: str = os.getenv("ATTENDANCE_DEAD_LETTER_PATH", "data/attendance.dead-letter.jsonl")
+    ATTENDANCE_OPEN_SESSION_INDEX: bool = os.getenv("ATTENDANCE_OPEN_SESSION_INDEX", "true").lower() == "true"
+    ATTENDANCE_SINGLE_WRITER: bool = os.getenv("ATTENDANCE_SINGLE_WRITER", "false").lower() == "true"
+    VIDEO_ATTENDANCE_WORKERS: int = int(os.getenv("VIDEO_ATTENDANCE_WORKERS", 0))  # 0 = CPU count
+    VIDEO_ATTENDANCE_CHUNK_SECONDS: float = float(os.getenv("VIDEO_ATTENDANCE_CHUNK_SECONDS", 120))
+    VIDEO_ATTENDANCE_SAMPLE_FPS: float = float(os.getenv("VIDEO_ATTENDANCE_SAMPLE_FPS", 1))
+    VIDEO_ATTENDANCE_MIN_PRESENCE: float = float(os.getenv("VIDEO_ATTENDANCE_MIN_PRESENCE", 0.25))  # share of minutes seen
+    VIDEO_ATTENDANCE_MIN_SAMPLES: int = int(os.getenv("VIDEO_ATTENDANCE_MIN_SAMPLES", 3))
     
     # Supabase
     SUPABASE_URL: Optional[str] = os.getenv("SUPABASE_URL")
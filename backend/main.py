@@ -6,18 +6,35 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
 import uvicorn
+import asyncio
+import json
 import logging
+import shutil
+import tempfile
+import zipfile
 from contextlib import asynccontextmanager
 
 # Import services and models
 from services.auth_service import AuthService, UserRole, Permission
-from models.database_models import Base, User, AttendanceRecord, Camera, RFIDCard
-from config.database import engine, get_db
+from models.database_models import User, AttendanceRecord, Camera, RFIDCard, VerificationMethod
+from services.face_gallery import FaceGallery, pack_encoding, ENCODING_FORMAT_VERSION
+from services.shared_gallery import SharedFaceGallery
+from services.verify_batcher import VerifyBatcher
+from services.schedule_scope import ScheduleScope
+from services.camera_ingestion import CameraIngestionManager
+from services.gallery_snapshot import warm_start_gallery
+from services.bulk_enrollment import BulkEnrollmentJob, ImageSource, parse_manifest
+from services.attendance_service import AttendanceEvent, AttendanceService
+from services.open_sessions import OpenSessionIndex
+from services.attendance_writer import AttendanceBufferFull, AttendanceWriteBuffer
+from services.pagination import CountCache, decode_cursor, encode_cursor, estimate_count, keyset_page
+from config.database import get_db, migration_status, SessionLocal
 from config.settings import Settings
 
 # Optional imports
 try:
     from services.face_recognition_service import FaceRecognitionService
+    from services.face_worker_pool import FaceWorkerPool, FaceWorkerPoolBusy
     FACE_SERVICE_AVAILABLE = True
 except ImportError as e:
     FACE_SERVICE_AVAILABLE = False
@@ -40,15 +57,55 @@ logger = logging.getLogger(__name__)
 # Initialize settings
 settings = Settings()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifecycle manager for app startup and shutdown"""
     logger.info("Starting AI Campus Attendance Tracker API")
+    # The schema is managed by Alembic migrations (alembic upgrade head)
+    try:
+        current_revision, head_revision = await asyncio.to_thread(migration_status)
+        if current_revision != head_revision:
+            logger.error(
+                f"Database schema is at revision {current_revision or 'none'}, expected {head_revision}; "
+                f"run 'alembic upgrade head' from the backend directory"
+            )
+    except Exception as e:
+        logger.error(f"Failed to check database migrations: {e}")
+    if face_service:
+        try:
+            with SessionLocal() as db:
+                if isinstance(face_gallery, SharedFaceGallery):
+                    # Only the first worker loads; the rest replay the DB delta
+                    face_gallery.initialize(db, settings.FACE_GALLERY_SNAPSHOT_DIR or None)
+                else:
+                    warm_start_gallery(face_gallery, db, settings.FACE_GALLERY_SNAPSHOT_DIR or None)
+        except Exception as e:
+            logger.error(f"Failed to load face gallery: {e}")
+        if settings.FACE_MODEL_LOADING == 'eager':
+            try:
+                await asyncio.to_thread(face_pool.warm_up)
+            except Exception as e:
+                logger.error(f"Failed to warm up face worker pool: {e}")
+    if camera_ingestion:
+        try:
+            await camera_ingestion.start()
+        except Exception as e:
+            logger.error(f"Failed to start camera ingestion: {e}")
+    if open_sessions:
+        try:
+            await asyncio.to_thread(open_sessions.rebuild)
+        except Exception as e:
+            logger.error(f"Failed to load open attendance sessions: {e}")
+    if attendance_buffer:
+        await attendance_buffer.start()
     yield
     logger.info("Shutting down API")
+    if camera_ingestion:
+        await camera_ingestion.stop()
+    if attendance_buffer:
+        await attendance_buffer.stop()
+    if face_pool:
+        face_pool.shutdown()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -74,20 +131,205 @@ auth_service = AuthService({
     'access_token_expire_minutes': settings.ACCESS_TOKEN_EXPIRE_MINUTES,
     'refresh_token_expire_days': settings.REFRESH_TOKEN_EXPIRE_DAYS
 })
+# Today's open sessions kept in memory so check-in/check-out skip the lookup query
+open_sessions = OpenSessionIndex(SessionLocal) if settings.ATTENDANCE_OPEN_SESSION_INDEX else None
+attendance_service = AttendanceService(
+    {'single_writer': settings.ATTENDANCE_SINGLE_WRITER},
+    open_sessions=open_sessions
+)
+
+# Write-behind: acknowledge attendance events once queued and write them in batches
+attendance_buffer = None
+if settings.ATTENDANCE_WRITE_MODE != 'sync':
+    attendance_buffer = AttendanceWriteBuffer(
+        SessionLocal,
+        attendance_service,
+        mode=settings.ATTENDANCE_WRITE_MODE,
+        journal_path=settings.ATTENDANCE_JOURNAL_PATH,
+        journal_fsync=settings.ATTENDANCE_JOURNAL_FSYNC,
+        max_queue=settings.ATTENDANCE_QUEUE_MAX,
+        flush_interval_ms=settings.ATTENDANCE_FLUSH_INTERVAL_MS,
+        flush_max_events=settings.ATTENDANCE_FLUSH_MAX_EVENTS,
+        max_flush_attempts=settings.ATTENDANCE_FLUSH_MAX_ATTEMPTS,
+        dead_letter_path=settings.ATTENDANCE_DEAD_LETTER_PATH or None
+    )
+
+
+def queue_attendance(events: List[AttendanceEvent]) -> JSONResponse:
+    """Hand events to the write-behind buffer and acknowledge with 202"""
+    try:
+        depth = attendance_buffer.submit(events)
+    except AttendanceBufferFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Attendance is busy, please retry",
+            headers={"Retry-After": "1"}
+        )
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"message": "Attendance queued", "queued": len(events), "queue_depth": depth}
+    )
+
+
+# Listing totals are optional; exact ones are reused for a short while
+listing_counts = CountCache(settings.PAGINATION_COUNT_CACHE_SECONDS)
+
+
+def check_page_params(limit: int, total: Optional[str], cursor: Optional[str], kind: str, order: list) -> Optional[list]:
+    """Validate listing parameters and decode the cursor"""
+    if not 1 <= limit <= settings.PAGINATION_MAX_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"limit must be between 1 and {settings.PAGINATION_MAX_LIMIT}"
+        )
+    if total not in (None, "exact", "estimate"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="total must be 'exact' or 'estimate'"
+        )
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor, kind, order)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+def listing_total(db: Session, query, total: Optional[str], key: tuple) -> Optional[int]:
+    """Total rows of a listing: None unless asked for, estimated or exact (cached)"""
+    if total is None:
+        return None
+    if total == "estimate":
+        estimate = estimate_count(db, query)
+        if estimate is not None:
+            return estimate
+    return listing_counts.get(key, query.count)
 
 # Initialize face service if available
+face_config = {
+    'face_detection_confidence': settings.FACE_DETECTION_CONFIDENCE,
+    'face_recognition_tolerance': settings.FACE_RECOGNITION_TOLERANCE,
+    'face_model': settings.FACE_MODEL,
+    'encoding_model': settings.FACE_ENCODING_MODEL,
+    'detection_scale': settings.FACE_DETECTION_SCALE,
+    'detection_short_side': settings.FACE_DETECTION_SHORT_SIDE,
+    'detection_upsample': settings.FACE_DETECTION_UPSAMPLE,
+    'model_loading': settings.FACE_MODEL_LOADING,
+    'warmup_models': settings.FACE_WARMUP_MODELS,
+    'ann_index': settings.FACE_ANN_INDEX,
+    'ann_nlist': settings.FACE_ANN_NLIST,
+    'ann_nprobe': settings.FACE_ANN_NPROBE,
+    'ann_min_size': settings.FACE_ANN_MIN_SIZE,
+    'ann_shortlist': settings.FACE_ANN_SHORTLIST,
+    'match_reduction': settings.FACE_MATCH_REDUCTION,
+    'shared_gallery_dir': settings.FACE_SHARED_GALLERY_DIR
+}
 face_service = None
+face_pool = None
 if FACE_SERVICE_AVAILABLE:
     try:
-        face_service = FaceRecognitionService({
-            'face_detection_confidence': settings.FACE_DETECTION_CONFIDENCE,
-            'face_recognition_tolerance': settings.FACE_RECOGNITION_TOLERANCE,
-            'face_model': settings.FACE_MODEL,
-            'encoding_model': settings.FACE_ENCODING_MODEL
-        })
+        face_service = FaceRecognitionService(face_config)
+        face_pool = FaceWorkerPool(
+            face_config,
+            max_workers=settings.FACE_WORKER_POOL_SIZE,
+            max_queue=settings.FACE_WORKER_QUEUE_DEPTH,
+            start_method=settings.FACE_WORKER_START_METHOD,
+            local_service=face_service
+        )
     except Exception as e:
         logger.error(f"Failed to initialize face service: {e}")
         face_service = None
+        face_pool = None
+
+# Resident gallery of enrolled face encodings, shared by all requests
+face_gallery = face_service.create_gallery() if face_service else FaceGallery()
+
+# Room/time candidate pruning for requests that say which camera they came from
+schedule_scope = None
+if face_service and settings.FACE_SCHEDULE_SCOPE:
+    schedule_scope = ScheduleScope(
+        SessionLocal,
+        face_gallery,
+        grace_minutes=settings.FACE_SCOPE_GRACE_MINUTES,
+        cache_seconds=settings.FACE_SCOPE_CACHE_SECONDS
+    )
+
+# Coalesces concurrent verify requests into micro-batches
+verify_batcher = None
+if face_service and settings.FACE_BATCH_WINDOW_MS > 0:
+    verify_batcher = VerifyBatcher(
+        face_pool,
+        face_service,
+        face_gallery,
+        window_ms=settings.FACE_BATCH_WINDOW_MS,
+        max_batch=settings.FACE_BATCH_MAX_SIZE,
+        scope=schedule_scope
+    )
+
+
+async def match_camera_faces(camera_id: int, captured_at: datetime, faces: List[dict]):
+    """Match the faces found in an ingested camera frame"""
+    import numpy as np
+    if not faces or not face_gallery.loaded:
+        return []
+    encodings = np.array([face['encoding'] for face in faces])
+    tolerance = face_service.face_recognition_tolerance
+    if schedule_scope:
+        # May refresh its schedule caches from the database
+        return await asyncio.to_thread(schedule_scope.match_batch, encodings, tolerance, camera_id)
+    return face_gallery.match_batch(encodings, tolerance)
+
+
+def _check_in_from_camera(camera_id: int, captured_at: datetime, event: dict):
+    check_in = AttendanceEvent(
+        type='check_in',
+        user_id=event['user_id'],
+        timestamp=captured_at,
+        camera_id=camera_id,
+        face_confidence=event['confidence']
+    )
+    if attendance_buffer:
+        attendance_buffer.submit([check_in])
+        return
+    with SessionLocal() as db:
+        result = attendance_service.ingest_events(db, [check_in])
+    if result['results'][0]['status'] == 'checked_in':
+        logger.info(f"Camera {camera_id} check-in for user {event['user_id']} (track {event['track_id']})")
+
+
+async def record_camera_attendance(camera_id: int, captured_at: datetime, event: dict):
+    """Check in a user whose identity was confirmed by a camera face track"""
+    await asyncio.to_thread(_check_in_from_camera, camera_id, captured_at, event)
+
+
+# Continuous capture from the cameras table; run with a single API worker or use
+# scripts/camera_ingestion.py as a dedicated process
+camera_ingestion = None
+if face_service and settings.CAMERA_INGESTION_ENABLED:
+    camera_ingestion = CameraIngestionManager(
+        face_pool,
+        handler=match_camera_faces,
+        event_handler=record_camera_attendance,
+        session_factory=SessionLocal,
+        analysis_fps=settings.CAMERA_ANALYSIS_FPS,
+        heartbeat_seconds=settings.CAMERA_HEARTBEAT_SECONDS,
+        reconnect_seconds=settings.CAMERA_RECONNECT_SECONDS,
+        motion_defaults={
+            'mode': settings.CAMERA_MOTION_MODE,
+            'threshold': settings.CAMERA_MOTION_THRESHOLD,
+            'min_area': settings.CAMERA_MOTION_MIN_AREA,
+            'max_idle_seconds': settings.CAMERA_MOTION_MAX_IDLE_SECONDS
+        } if settings.CAMERA_MOTION_GATE else None,
+        tracking_defaults={
+            'iou_threshold': settings.CAMERA_TRACK_IOU_THRESHOLD,
+            'max_age_seconds': settings.CAMERA_TRACK_MAX_AGE_SECONDS,
+            'reencode_seconds': settings.CAMERA_TRACK_REENCODE_SECONDS,
+            'quality_gain': settings.CAMERA_TRACK_QUALITY_GAIN,
+            'vote_min': settings.CAMERA_TRACK_VOTE_MIN,
+            'vote_window': settings.CAMERA_TRACK_VOTE_WINDOW,
+            'event_cooldown_seconds': settings.CAMERA_EVENT_COOLDOWN_SECONDS
+        } if settings.CAMERA_TRACKING else None
+    )
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
@@ -231,22 +473,32 @@ async def login(
 
 @app.get("/api/v1/users")
 async def get_users(
-    skip: int = 0,
+    cursor: Optional[str] = None,
     limit: int = 100,
     role: Optional[UserRole] = None,
+    total: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get all users with optional filtering"""
+    """
+    Get all users with optional filtering, by id
+    
+    Pass the previous page's next_cursor as cursor for the next page. The
+    total is only counted when asked for with total=exact (reused for
+    PAGINATION_COUNT_CACHE_SECONDS) or total=estimate.
+    """
+    after = check_page_params(limit, total, cursor, "users", [User.id])
+    
     try:
         query = db.query(User)
         
         if role:
             query = query.filter(User.role == role)
         
-        users = query.offset(skip).limit(limit).all()
+        users, more = keyset_page(query, [User.id], limit, after)
         
         return {
-            "total": query.count(),
+            "total": listing_total(db, query, total, ("users", role)),
+            "next_cursor": encode_cursor("users", [users[-1].id]) if more else None,
             "users": [
                 {
                     "id": u.id,
@@ -322,15 +574,10 @@ async def enroll_face(
                 detail="User not found"
             )
         
-        # Read and process image
-        import cv2
+        # Detect and encode face off the event loop
         import numpy as np
         contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        # Detect and encode face
-        faces_data = face_service.detect_and_encode_faces(img)
+        faces_data = await face_pool.detect_and_encode(contents)
         
         if not faces_data:
             raise HTTPException(
@@ -344,15 +591,16 @@ async def enroll_face(
                 detail="Multiple faces detected. Please provide image with single face"
             )
         
-        # Save face encoding
-        import json
+        # Save face encoding as raw float32 bytes
         face_data = faces_data[0]
-        encoding_json = json.dumps(face_data['encoding'])
+        encoding = np.asarray(face_data['encoding'], dtype=np.float32)
         
         from models.database_models import FaceEncoding
         face_encoding = FaceEncoding(
             user_id=user_id,
-            encoding_data=encoding_json,
+            encoding_blob=pack_encoding(encoding),
+            encoding_dim=len(encoding),
+            encoding_version=ENCODING_FORMAT_VERSION,
             is_primary=True,
             created_at=datetime.utcnow()
         )
@@ -360,6 +608,9 @@ async def enroll_face(
         db.add(face_encoding)
         db.commit()
         
+        if face_gallery.loaded:
+            face_gallery.add(face_encoding.id, user_id, encoding)
+        
         logger.info(f"Face enrolled for user: {user.username}")
         
         return {
@@ -370,6 +621,11 @@ async def enroll_face(
     
     except HTTPException:
         raise
+    except FaceWorkerPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Face recognition is busy, please retry"
+        )
     except Exception as e:
         logger.error(f"Face enrollment error: {e}")
         db.rollback()
@@ -379,12 +635,69 @@ async def enroll_face(
         )
 
 
+@app.post("/api/v1/face/enroll/bulk")
+async def enroll_faces_bulk(
+    archive: UploadFile = File(...),
+    manifest: UploadFile = File(...)
+):
+    """Enroll faces from a zip of images and a CSV manifest, streaming progress as NDJSON"""
+    # Check if face service is available
+    if not face_service:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Face recognition service not available. Install AI dependencies with: pip install -r requirements-ai.txt"
+        )
+    
+    # FastAPI closes the upload when this handler returns, before the body streams,
+    # so the archive is copied to a temporary file the stream owns
+    spooled = tempfile.TemporaryFile()
+    try:
+        entries = parse_manifest(await manifest.read())
+        await asyncio.to_thread(shutil.copyfileobj, archive.file, spooled)
+        spooled.seek(0)
+        source = ImageSource(spooled)
+    except (ValueError, zipfile.BadZipFile) as e:
+        spooled.close()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid bulk enrollment upload: {e}"
+        )
+    except Exception:
+        spooled.close()
+        raise
+    
+    async def stream():
+        # The request-scoped session closes before a streamed body is sent
+        db = SessionLocal()
+        try:
+            job = BulkEnrollmentJob(db, face_pool, gallery=face_gallery)
+            async for event in job.run(entries, source):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            logger.error(f"Bulk enrollment error: {e}")
+            db.rollback()
+            yield json.dumps({"type": "error", "detail": "Bulk enrollment failed"}) + "\n"
+        finally:
+            source.close()
+            spooled.close()
+            db.close()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @app.post("/api/v1/face/verify")
 async def verify_face(
     image: UploadFile = File(...),
+    camera_id: Optional[int] = None,
+    top_k: int = 0,
     db: Session = Depends(get_db)
 ):
-    """Verify face against enrolled faces"""
+    """
+    Verify face against enrolled faces, scoped to the camera's room schedule if given
+    
+    With top_k > 0 the response also lists the k closest users, one entry
+    per user however many encodings they have enrolled.
+    """
     # Check if face service is available
     if not face_service:
         raise HTTPException(
@@ -393,16 +706,34 @@ async def verify_face(
         )
     
     try:
-        # Read and process image
-        import cv2
-        import numpy as np
-        import json
+        if not face_gallery.loaded:
+            face_gallery.load_from_db(db)
+        
         contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
         
-        # Detect face in image
-        faces_data = face_service.detect_and_encode_faces(img)
+        if verify_batcher:
+            # Coalesce with concurrent verifies into one encode + match batch
+            result = await verify_batcher.verify(contents, camera_id)
+            faces_data, match_result = result['faces'], result['match']
+        else:
+            # Detect face in image off the event loop
+            import numpy as np
+            faces_data = await face_pool.detect_and_encode(contents)
+            match_result = None
+            if faces_data and schedule_scope and camera_id is not None:
+                # Students scheduled in the camera's room first, then everyone
+                match_result = (await asyncio.to_thread(
+                    schedule_scope.match_batch,
+                    np.array([faces_data[0]['encoding']]),
+                    face_service.face_recognition_tolerance,
+                    camera_id
+                ))[0]
+            elif faces_data:
+                # Match face against the resident gallery
+                match_result = face_service.match_face_against_gallery(
+                    np.array(faces_data[0]['encoding']),
+                    face_gallery
+                )
         
         if not faces_data:
             return {
@@ -410,22 +741,14 @@ async def verify_face(
                 "message": "No face detected"
             }
         
-        face_encoding = np.array(faces_data[0]['encoding'])
-        
-        # Load all enrolled faces
-        from models.database_models import FaceEncoding
-        enrolled_faces = db.query(FaceEncoding).all()
-        
-        known_encodings = []
-        for ef in enrolled_faces:
-            encoding = np.array(json.loads(ef.encoding_data))
-            known_encodings.append((ef.user_id, encoding))
-        
-        # Match face
-        match_result = face_service.match_face_against_database(
-            face_encoding,
-            known_encodings
-        )
+        extra = {}
+        if top_k > 0:
+            import numpy as np
+            extra["candidates"] = face_service.rank_candidates(
+                np.array(faces_data[0]['encoding']),
+                face_gallery,
+                k=min(top_k, 50)
+            )
         
         if match_result:
             user_id, confidence = match_result
@@ -436,14 +759,21 @@ async def verify_face(
                 "user_id": user_id,
                 "username": user.username,
                 "full_name": user.full_name,
-                "confidence": float(confidence)
+                "confidence": float(confidence),
+                **extra
             }
         else:
             return {
                 "verified": False,
-                "message": "Face not recognized"
+                "message": "Face not recognized",
+                **extra
             }
     
+    except FaceWorkerPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Face recognition is busy, please retry"
+        )
     except Exception as e:
         logger.error(f"Face verification error: {e}")
         raise HTTPException(
@@ -452,6 +782,152 @@ async def verify_face(
         )
 
 
+@app.post("/api/v1/face/identify")
+async def identify_faces(
+    image: UploadFile = File(...),
+    camera_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Identify every face in a frame against enrolled faces, scoped to the camera's room schedule if given"""
+    # Check if face service is available
+    if not face_service:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Face recognition service not available. Install AI dependencies with: pip install -r requirements-ai.txt"
+        )
+    
+    try:
+        # Detect and encode every face in the frame off the event loop
+        contents = await image.read()
+        faces_data = await face_pool.detect_and_encode(contents)
+        
+        if not faces_data:
+            return {
+                "face_count": 0,
+                "faces": []
+            }
+        
+        if not face_gallery.loaded:
+            face_gallery.load_from_db(db)
+        
+        encodings = [face['encoding'] for face in faces_data]
+        rows = None
+        if schedule_scope and camera_id is not None:
+            try:
+                rows = await asyncio.to_thread(schedule_scope.candidate_rows, camera_id)
+            except Exception as e:
+                logger.error(f"Schedule scope lookup failed: {e}")
+        
+        # Match all faces in one pass, against the room's roster first when known
+        matches = face_service.identify_faces(encodings, face_gallery, rows=rows)
+        
+        missed = [i for i, match in enumerate(matches) if match is None]
+        if rows is not None and missed:
+            # Fall back to the whole gallery for faces not found in the roster
+            assigned = {match[0] for match in matches if match}
+            fallback = face_service.identify_faces(
+                [encodings[i] for i in missed],
+                face_gallery,
+                exclude_users=assigned
+            )
+            for i, match in zip(missed, fallback):
+                matches[i] = match
+        
+        matched_ids = {match[0] for match in matches if match}
+        users = {}
+        if matched_ids:
+            users = {u.id: u for u in db.query(User).filter(User.id.in_(matched_ids)).all()}
+        
+        faces = []
+        for face_data, match in zip(faces_data, matches):
+            top, right, bottom, left = face_data['location']
+            face = {
+                "face_id": face_data['face_id'],
+                "location": {"top": int(top), "right": int(right), "bottom": int(bottom), "left": int(left)},
+                "verified": match is not None
+            }
+            if match:
+                user_id, confidence = match
+                user = users.get(user_id)
+                face.update({
+                    "user_id": user_id,
+                    "username": user.username if user else None,
+                    "full_name": user.full_name if user else None,
+                    "confidence": float(confidence)
+                })
+            faces.append(face)
+        
+        return {
+            "face_count": len(faces),
+            "identified_count": len(matched_ids),
+            "faces": faces
+        }
+    
+    except FaceWorkerPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Face recognition is busy, please retry"
+        )
+    except Exception as e:
+        logger.error(f"Face identification error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Face identification failed"
+        )
+
+
+@app.post("/api/v1/face/warmup")
+async def face_warmup():
+    """Load face recognition libraries and models ahead of the first request"""
+    if not face_service:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Face recognition service not available"
+        )
+    
+    started = datetime.utcnow()
+    import_times = await asyncio.to_thread(face_service.load_backends)
+    await asyncio.to_thread(face_service.warm_up, face_service.warmup_models or ['dlib'])
+    await asyncio.to_thread(face_pool.warm_up)
+    
+    return {
+        "message": "Face recognition warmed up",
+        "elapsed_seconds": (datetime.utcnow() - started).total_seconds(),
+        "import_seconds": import_times,
+        "models": face_service.models.stats()
+    }
+
+
+@app.get("/api/v1/face/pool/stats")
+async def face_pool_stats():
+    """Face worker pool size, queue depth and task timing"""
+    if not face_pool:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Face recognition service not available"
+        )
+    
+    stats = face_pool.stats()
+    stats["models"] = face_service.models.stats()
+    if verify_batcher:
+        stats["verify_batching"] = verify_batcher.stats()
+    if schedule_scope:
+        stats["schedule_scope"] = schedule_scope.stats()
+    return stats
+
+
+@app.get("/api/v1/cameras/ingestion/stats")
+async def camera_ingestion_stats():
+    """Per-camera capture and analysis FPS and dropped-frame counts"""
+    if not camera_ingestion:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Camera ingestion is not enabled"
+        )
+    
+    return {"cameras": camera_ingestion.stats()}
+
+
 # ============================================================================
 # ATTENDANCE ENDPOINTS
 # ============================================================================
@@ -463,52 +939,48 @@ async def check_in(
     camera_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    """Mark attendance check-in"""
+    """Mark attendance check-in (202 and applied later in write-behind mode)"""
+    if attendance_buffer:
+        try:
+            event = AttendanceEvent(
+                type='check_in',
+                user_id=user_id,
+                timestamp=datetime.utcnow(),
+                verification_method=verification_method,
+                camera_id=camera_id
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        return queue_attendance([event])
+    
     try:
         # Verify user exists
-        user = db.query(User).filter(User.id == user_id).first()
+        user = db.query(User.username).filter(User.id == user_id).first()
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
         
-        # Check if already checked in today
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        existing_record = db.query(AttendanceRecord).filter(
-            AttendanceRecord.user_id == user_id,
-            AttendanceRecord.check_in_time >= today_start,
-            AttendanceRecord.check_out_time == None
-        ).first()
+        try:
+            method = VerificationMethod(verification_method)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
         
-        if existing_record:
+        result = attendance_service.check_in(db, user_id, method, camera_id=camera_id)
+        if result['status'] == 'already_checked_in':
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="User already checked in"
             )
         
-        # Create attendance record
-        from models.database_models import VerificationMethod, AttendanceStatus
-        attendance = AttendanceRecord(
-            user_id=user_id,
-            camera_id=camera_id,
-            check_in_time=datetime.utcnow(),
-            verification_method=VerificationMethod(verification_method),
-            status=AttendanceStatus.PRESENT,
-            created_at=datetime.utcnow()
-        )
-        
-        db.add(attendance)
-        db.commit()
-        db.refresh(attendance)
-        
         logger.info(f"Check-in recorded for user: {user.username}")
         
         return {
             "message": "Check-in successful",
-            "attendance_id": attendance.id,
+            "attendance_id": result['attendance_id'],
             "user_id": user_id,
-            "check_in_time": attendance.check_in_time.isoformat()
+            "check_in_time": result['check_in_time'].isoformat()
         }
     
     except HTTPException:
@@ -524,36 +996,27 @@ async def check_in(
 
 @app.post("/api/v1/attendance/check-out")
 async def check_out(user_id: int, db: Session = Depends(get_db)):
-    """Mark attendance check-out"""
+    """Mark attendance check-out (202 and applied later in write-behind mode)"""
+    if attendance_buffer:
+        return queue_attendance([
+            AttendanceEvent(type='check_out', user_id=user_id, timestamp=datetime.utcnow())
+        ])
+    
     try:
-        # Find today's check-in record
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        attendance = db.query(AttendanceRecord).filter(
-            AttendanceRecord.user_id == user_id,
-            AttendanceRecord.check_in_time >= today_start,
-            AttendanceRecord.check_out_time == None
-        ).first()
-        
-        if not attendance:
+        result = attendance_service.check_out(db, user_id)
+        if result['status'] == 'no_open_session':
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="No active check-in found"
             )
         
-        # Update check-out time
-        attendance.check_out_time = datetime.utcnow()
-        duration = (attendance.check_out_time - attendance.check_in_time).total_seconds() / 60
-        attendance.duration_minutes = int(duration)
-        
-        db.commit()
-        
         logger.info(f"Check-out recorded for user ID: {user_id}")
         
         return {
             "message": "Check-out successful",
-            "attendance_id": attendance.id,
-            "check_out_time": attendance.check_out_time.isoformat(),
-            "duration_minutes": attendance.duration_minutes
+            "attendance_id": result['attendance_id'],
+            "check_out_time": result['check_out_time'].isoformat(),
+            "duration_minutes": result['duration_minutes']
         }
     
     except HTTPException:
@@ -567,16 +1030,64 @@ async def check_out(user_id: int, db: Session = Depends(get_db)):
         )
 
 
+@app.post("/api/v1/attendance/events/batch")
+async def ingest_attendance_events(events: List[AttendanceEvent], db: Session = Depends(get_db)):
+    """
+    Apply a batch of check-in/check-out events in one transaction
+    
+    Returns one result per event in request order. Replaying a batch is
+    safe: already applied events come back as 'duplicate'. In write-behind
+    mode the batch is only queued and the response is 202.
+    """
+    if len(events) > settings.ATTENDANCE_BATCH_MAX_EVENTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.ATTENDANCE_BATCH_MAX_EVENTS} events per batch"
+        )
+    
+    if attendance_buffer:
+        return queue_attendance(events)
+    
+    try:
+        return await asyncio.to_thread(attendance_service.ingest_events, db, events)
+    
+    except Exception as e:
+        logger.error(f"Attendance batch error: {e}")
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Attendance batch failed"
+        )
+
+
+@app.get("/api/v1/attendance/writer/stats")
+async def attendance_writer_stats():
+    """Write-behind queue depth, flush latency and results, and open-session index hit rates"""
+    stats = attendance_buffer.stats() if attendance_buffer else {"mode": "sync"}
+    stats["open_sessions"] = open_sessions.stats() if open_sessions else None
+    return stats
+
+
 @app.get("/api/v1/attendance/records")
 async def get_attendance_records(
     user_id: Optional[int] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    skip: int = 0,
+    cursor: Optional[str] = None,
     limit: int = 100,
+    total: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get attendance records with filtering"""
+    """
+    Get attendance records with filtering, newest first
+    
+    Pass the previous page's next_cursor as cursor for the next page. The
+    total is only counted when asked for with total=exact (reused for
+    PAGINATION_COUNT_CACHE_SECONDS) or total=estimate.
+    """
+    order = [AttendanceRecord.check_in_time, AttendanceRecord.id]
+    after = check_page_params(limit, total, cursor, "attendance", order)
+    
     try:
         query = db.query(AttendanceRecord)
         
@@ -591,11 +1102,11 @@ async def get_attendance_records(
             end_dt = datetime.fromisoformat(end_date)
             query = query.filter(AttendanceRecord.check_in_time <= end_dt)
         
-        total = query.count()
-        records = query.offset(skip).limit(limit).all()
+        records, more = keyset_page(query, order, limit, after, descending=True)
         
         return {
-            "total": total,
+            "total": listing_total(db, query, total, ("attendance", user_id, start_date, end_date)),
+            "next_cursor": encode_cursor("attendance", [records[-1].check_in_time, records[-1].id]) if more else None,
             "records": [
                 {
                     "id": r.id,
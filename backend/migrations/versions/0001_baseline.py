@@ -0,0 +1,242 @@
+"""Baseline schema
+
+The tables as Base.metadata.create_all created them before the schema was
+migration-managed, including the binary face encoding columns added by
+scripts/migrate_face_encodings.py.
+
+A database created by an earlier version of the API already has these
+tables: run scripts/migrate_face_encodings.py if it has not been run, then
+adopt the database with ``alembic stamp 0001_baseline`` before
+``alembic upgrade head``.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+ENUM_TYPES = ('camerastatus', 'userrole', 'attendancestatus', 'verificationmethod')
+
+
+def upgrade():
+    op.create_table('cameras',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('location', sa.String(), nullable=False),
+        sa.Column('camera_url', sa.String(), nullable=False),
+        sa.Column('camera_type', sa.String(), nullable=True),
+        sa.Column('resolution', sa.String(), nullable=True),
+        sa.Column('fps', sa.Integer(), nullable=True),
+        sa.Column('status', sa.Enum('ACTIVE', 'INACTIVE', 'ERROR', 'MAINTENANCE', name='camerastatus'), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('last_heartbeat', sa.DateTime(), nullable=True),
+        sa.Column('camera_metadata', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_cameras_id', 'cameras', ['id'], unique=False)
+
+    op.create_table('users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('username', sa.String(), nullable=False),
+        sa.Column('password_hash', sa.String(), nullable=False),
+        sa.Column('full_name', sa.String(), nullable=False),
+        sa.Column('role', sa.Enum('ADMIN', 'TEACHER', 'STUDENT', 'SECURITY', name='userrole'), nullable=False),
+        sa.Column('employee_id', sa.String(), nullable=True),
+        sa.Column('student_id', sa.String(), nullable=True),
+        sa.Column('phone', sa.String(), nullable=True),
+        sa.Column('department', sa.String(), nullable=True),
+        sa.Column('course', sa.String(), nullable=True),
+        sa.Column('year', sa.Integer(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('is_verified', sa.Boolean(), nullable=True),
+        sa.Column('profile_image', sa.String(), nullable=True),
+        sa.Column('failed_login_attempts', sa.Integer(), nullable=True),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('last_login', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('employee_id'),
+        sa.UniqueConstraint('student_id')
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+
+    op.create_table('alerts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.Column('severity', sa.String(), nullable=True),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('source', sa.String(), nullable=True),
+        sa.Column('is_resolved', sa.Boolean(), nullable=True),
+        sa.Column('resolved_by', sa.Integer(), nullable=True),
+        sa.Column('resolved_at', sa.DateTime(), nullable=True),
+        sa.Column('alert_metadata', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['resolved_by'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_alerts_id', 'alerts', ['id'], unique=False)
+
+    op.create_table('attendance_records',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('camera_id', sa.Integer(), nullable=True),
+        sa.Column('check_in_time', sa.DateTime(), nullable=False),
+        sa.Column('check_out_time', sa.DateTime(), nullable=True),
+        sa.Column('status', sa.Enum('PRESENT', 'ABSENT', 'LATE', 'EXCUSED', name='attendancestatus'), nullable=True),
+        sa.Column('verification_method', sa.Enum('FACE', 'RFID', 'MANUAL', 'BOTH', name='verificationmethod'), nullable=False),
+        sa.Column('temperature', sa.Float(), nullable=True),
+        sa.Column('location', sa.String(), nullable=True),
+        sa.Column('face_confidence', sa.Float(), nullable=True),
+        sa.Column('is_late', sa.Boolean(), nullable=True),
+        sa.Column('is_early_departure', sa.Boolean(), nullable=True),
+        sa.Column('duration_minutes', sa.Integer(), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('verified_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['camera_id'], ['cameras.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['verified_by'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_attendance_records_id', 'attendance_records', ['id'], unique=False)
+
+    op.create_table('audit_logs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('action', sa.String(), nullable=False),
+        sa.Column('resource_type', sa.String(), nullable=False),
+        sa.Column('resource_id', sa.Integer(), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('ip_address', sa.String(), nullable=True),
+        sa.Column('user_agent', sa.String(), nullable=True),
+        sa.Column('changes', sa.JSON(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_audit_logs_id', 'audit_logs', ['id'], unique=False)
+
+    op.create_table('face_encodings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('encoding_data', sa.Text(), nullable=True),
+        sa.Column('encoding_blob', sa.LargeBinary(), nullable=True),
+        sa.Column('encoding_dim', sa.Integer(), nullable=True),
+        sa.Column('encoding_version', sa.Integer(), nullable=True),
+        sa.Column('image_path', sa.String(), nullable=True),
+        sa.Column('confidence_score', sa.Float(), nullable=True),
+        sa.Column('is_primary', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_face_encodings_id', 'face_encodings', ['id'], unique=False)
+
+    op.create_table('notifications',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('type', sa.String(), nullable=True),
+        sa.Column('priority', sa.String(), nullable=True),
+        sa.Column('is_read', sa.Boolean(), nullable=True),
+        sa.Column('read_at', sa.DateTime(), nullable=True),
+        sa.Column('action_url', sa.String(), nullable=True),
+        sa.Column('notification_metadata', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_notifications_id', 'notifications', ['id'], unique=False)
+
+    op.create_table('reports',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('generated_by', sa.Integer(), nullable=True),
+        sa.Column('file_path', sa.String(), nullable=True),
+        sa.Column('parameters', sa.JSON(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['generated_by'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_reports_id', 'reports', ['id'], unique=False)
+
+    op.create_table('rfid_cards',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('card_uid', sa.String(), nullable=False),
+        sa.Column('card_number', sa.String(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('is_primary', sa.Boolean(), nullable=True),
+        sa.Column('issued_date', sa.DateTime(), nullable=True),
+        sa.Column('expiry_date', sa.DateTime(), nullable=True),
+        sa.Column('last_used', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_rfid_cards_card_uid', 'rfid_cards', ['card_uid'], unique=True)
+    op.create_index('ix_rfid_cards_id', 'rfid_cards', ['id'], unique=False)
+
+    op.create_table('schedules',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('day_of_week', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.String(), nullable=False),
+        sa.Column('end_time', sa.String(), nullable=False),
+        sa.Column('course_code', sa.String(), nullable=True),
+        sa.Column('room_number', sa.String(), nullable=True),
+        sa.Column('teacher_id', sa.Integer(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['teacher_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_schedules_id', 'schedules', ['id'], unique=False)
+
+    op.create_table('system_settings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('value', sa.Text(), nullable=False),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('is_public', sa.Boolean(), nullable=True),
+        sa.Column('updated_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['updated_by'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_system_settings_id', 'system_settings', ['id'], unique=False)
+    op.create_index('ix_system_settings_key', 'system_settings', ['key'], unique=True)
+
+
+def downgrade():
+    for table in (
+        'system_settings', 'schedules', 'rfid_cards', 'reports', 'notifications',
+        'face_encodings', 'audit_logs', 'attendance_records', 'alerts', 'users', 'cameras'
+    ):
+        op.drop_table(table)
+
+    if op.get_bind().dialect.name == 'postgresql':
+        for name in ENUM_TYPES:
+            op.execute(f"DROP TYPE IF EXISTS {name}")
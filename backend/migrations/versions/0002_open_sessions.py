@@ -0,0 +1,67 @@
+"""Open-session column and unique index
+
+Adds attendance_records.attendance_date (the UTC day of check_in_time),
+backfills it, and creates uq_attendance_open_session: at most one open
+session per user per day, which the in-memory open-session index relies on.
+
+Both steps are skipped when scripts/migrate_open_sessions.py already did
+them; on a large table prefer that script, which backfills in chunks, then
+run ``alembic upgrade head``.
+
+Revision ID: 0002_open_sessions
+Revises: 0001_baseline
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002_open_sessions'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = 'uq_attendance_open_session'
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {column['name'] for column in inspector.get_columns('attendance_records')}
+    indexes = {index['name'] for index in inspector.get_indexes('attendance_records')}
+
+    if 'attendance_date' not in columns:
+        op.add_column('attendance_records', sa.Column('attendance_date', sa.Date(), nullable=True))
+
+    day = 'date(check_in_time)' if bind.dialect.name == 'sqlite' else 'CAST(check_in_time AS DATE)'
+    op.execute(f"UPDATE attendance_records SET attendance_date = {day} WHERE attendance_date IS NULL")
+
+    if INDEX_NAME in indexes:
+        return
+
+    duplicates = bind.execute(sa.text(
+        "SELECT COUNT(*) FROM (SELECT user_id FROM attendance_records WHERE check_out_time IS NULL "
+        "GROUP BY user_id, attendance_date HAVING COUNT(*) > 1) AS duplicated"
+    )).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f"{duplicates} user/day pairs have several open attendance sessions; close them with "
+            f"'python scripts/migrate_open_sessions.py --close-duplicates' and rerun the upgrade"
+        )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            INDEX_NAME,
+            'attendance_records',
+            ['user_id', 'attendance_date'],
+            unique=True,
+            postgresql_where=sa.text('check_out_time IS NULL'),
+            sqlite_where=sa.text('check_out_time IS NULL'),
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    op.drop_index(INDEX_NAME, table_name='attendance_records')
+    with op.batch_alter_table('attendance_records') as batch_op:
+        batch_op.drop_column('attendance_date')
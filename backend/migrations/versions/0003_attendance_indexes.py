@@ -0,0 +1,58 @@
+"""Indexes for the attendance hot queries
+
+* (user_id, check_in_time): a user's records in a date range
+  (GET /api/v1/attendance/records?user_id=...) and the check-in/check-out
+  lookup of today's open session.
+* (check_in_time) WHERE check_out_time IS NULL: the day's open sessions
+  (open-session index rebuild, forgotten check-outs), only as large as the
+  number of open sessions.
+* (camera_id, check_in_time): a camera's records in a date range.
+
+Built CONCURRENTLY on PostgreSQL so attendance keeps being written while
+they build. scripts/check_query_plans.py verifies the queries use them.
+
+Revision ID: 0003_attendance_indexes
+Revises: 0002_open_sessions
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003_attendance_indexes'
+down_revision = '0002_open_sessions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_attendance_records_user_check_in',
+            'attendance_records',
+            ['user_id', 'check_in_time'],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.create_index(
+            'ix_attendance_records_open_check_in',
+            'attendance_records',
+            ['check_in_time'],
+            postgresql_where=sa.text('check_out_time IS NULL'),
+            sqlite_where=sa.text('check_out_time IS NULL'),
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.create_index(
+            'ix_attendance_records_camera_check_in',
+            'attendance_records',
+            ['camera_id', 'check_in_time'],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade():
+    op.drop_index('ix_attendance_records_camera_check_in', table_name='attendance_records')
+    op.drop_index('ix_attendance_records_open_check_in', table_name='attendance_records')
+    op.drop_index('ix_attendance_records_user_check_in', table_name='attendance_records')
@@ -0,0 +1,33 @@
+"""Index for the attendance listing sort order
+
+GET /api/v1/attendance/records pages newest first on (check_in_time, id);
+without a user filter only an index in that order lets each page start
+at its cursor instead of sorting the table. Built CONCURRENTLY on
+PostgreSQL.
+
+Revision ID: 0004_attendance_listing_index
+Revises: 0003_attendance_indexes
+Create Date: 2026-10-16
+"""
+from alembic import op
+
+
+revision = '0004_attendance_listing_index'
+down_revision = '0003_attendance_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_attendance_records_check_in_id',
+            'attendance_records',
+            ['check_in_time', 'id'],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade():
+    op.drop_index('ix_attendance_records_check_in_id', table_name='attendance_records')
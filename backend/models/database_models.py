@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Text, Enum, JSON
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Float, Text, Enum, JSON, LargeBinary, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -57,7 +57,7 @@ class User(Base):
     # Relationships
     face_encodings = relationship("FaceEncoding", back_populates="user", cascade="all, delete-orphan")
     rfid_cards = relationship("RFIDCard", back_populates="user", cascade="all, delete-orphan")
-    attendance_records = relationship("AttendanceRecord", back_populates="user", cascade="all, delete-orphan")
+    attendance_records = relationship("AttendanceRecord", back_populates="user", foreign_keys="AttendanceRecord.user_id", cascade="all, delete-orphan")
     notifications = relationship("Notification", back_populates="user", cascade="all, delete-orphan")
     audit_logs = relationship("AuditLog", foreign_keys="AuditLog.user_id", back_populates="user")
 
@@ -66,7 +66,10 @@ class FaceEncoding(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    encoding_data = Column(Text, nullable=False)  # JSON string of face encoding
+    encoding_data = Column(Text, nullable=True)  # Legacy JSON string of face encoding
+    encoding_blob = Column(LargeBinary, nullable=True)  # Raw little-endian float32 bytes
+    encoding_dim = Column(Integer, nullable=True)
+    encoding_version = Column(Integer, nullable=True)
     image_path = Column(String, nullable=True)
     confidence_score = Column(Float, default=0.0)
     is_primary = Column(Boolean, default=False)
@@ -113,13 +116,39 @@ class Camera(Base):
     # Relationships
     attendance_records = relationship("AttendanceRecord", back_populates="camera")
 
+def _attendance_date(context):
+    return context.get_current_parameters()['check_in_time'].date()
+
 class AttendanceRecord(Base):
     __tablename__ = "attendance_records"
+    __table_args__ = (
+        # At most one open session per user per day, whichever process writes it
+        Index(
+            "uq_attendance_open_session",
+            "user_id",
+            "attendance_date",
+            unique=True,
+            postgresql_where=text("check_out_time IS NULL"),
+            sqlite_where=text("check_out_time IS NULL")
+        ),
+        # Hot queries: a user's or a camera's records in a time range, and the day's open sessions
+        Index("ix_attendance_records_user_check_in", "user_id", "check_in_time"),
+        Index(
+            "ix_attendance_records_open_check_in",
+            "check_in_time",
+            postgresql_where=text("check_out_time IS NULL"),
+            sqlite_where=text("check_out_time IS NULL")
+        ),
+        Index("ix_attendance_records_camera_check_in", "camera_id", "check_in_time"),
+        # Listing order of GET /api/v1/attendance/records (keyset pagination)
+        Index("ix_attendance_records_check_in_id", "check_in_time", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     camera_id = Column(Integer, ForeignKey("cameras.id", ondelete="SET NULL"), nullable=True)
     check_in_time = Column(DateTime, nullable=False)
+    attendance_date = Column(Date, nullable=True, default=_attendance_date)  # UTC day of check_in_time
     check_out_time = Column(DateTime, nullable=True)
     status = Column(Enum(AttendanceStatus), default=AttendanceStatus.PRESENT)
     verification_method = Column(Enum(VerificationMethod), nullable=False)
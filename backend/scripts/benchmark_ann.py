@@ -0,0 +1,85 @@
+"""
+Benchmark ANN gallery search against the brute-force baseline
+
+Generates synthetic 128-d encodings clustered around identities (several
+encodings per identity, like re-enrolled users), then compares the IVF index
+with an exact scan on recall@1 and p50/p99 query latency.
+
+Usage (from the backend directory):
+    python scripts/benchmark_ann.py
+    python scripts/benchmark_ann.py --sizes 10000 100000 --nprobe 4 8 16
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from services.ann_index import FlatIndex, IVFIndex, search_index
+
+
+def synthetic_gallery(size: int, per_identity: int, dimension: int, rng) -> tuple:
+    """Clustered encodings with a matching set of held-out queries"""
+    identities = max(1, size // per_identity)
+    centers = rng.normal(0.0, 0.1, size=(identities, dimension)).astype(np.float32)
+    labels = rng.integers(0, identities, size=size)
+    vectors = centers[labels] + rng.normal(0.0, 0.03, size=(size, dimension)).astype(np.float32)
+    return vectors.astype(np.float32), centers
+
+
+def run_queries(index, vectors, sq_norms, queries, nprobe=None):
+    latencies = np.empty(len(queries))
+    results = np.empty(len(queries), dtype=np.int64)
+    for i, query in enumerate(queries):
+        started = time.perf_counter()
+        _, rows = search_index(index, vectors, sq_norms, query, k=1, nprobe=nprobe)
+        latencies[i] = time.perf_counter() - started
+        results[i] = rows[0]
+    return results, latencies
+
+
+def format_latency(latencies) -> str:
+    p50, p99 = np.percentile(latencies * 1000.0, [50, 99])
+    return f"p50 {p50:8.3f} ms  p99 {p99:8.3f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[4, 8, 16, 32])
+    parser.add_argument('--per-identity', type=int, default=4)
+    parser.add_argument('--dimension', type=int, default=128)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+
+    for size in args.sizes:
+        vectors, centers = synthetic_gallery(size, args.per_identity, args.dimension, rng)
+        sq_norms = np.einsum('ij,ij->i', vectors, vectors)
+        query_labels = rng.integers(0, len(centers), size=args.queries)
+        queries = centers[query_labels] + rng.normal(0.0, 0.03, size=(args.queries, args.dimension))
+        queries = queries.astype(np.float32)
+
+        print(f"\n=== {size:,} encodings ({vectors.nbytes / 1e6:.0f} MB) ===")
+
+        exact, latencies = run_queries(FlatIndex(), vectors, sq_norms, queries)
+        print(f"{'brute force':<22} recall@1 1.0000  {format_latency(latencies)}")
+
+        index = IVFIndex()
+        started = time.perf_counter()
+        index.build(vectors)
+        print(f"IVF build: {len(index.centroids)} lists in {time.perf_counter() - started:.2f}s")
+
+        for nprobe in args.nprobe:
+            found, latencies = run_queries(index, vectors, sq_norms, queries, nprobe=nprobe)
+            recall = float(np.mean(found == exact))
+            print(f"{'ivf nprobe=' + str(nprobe):<22} recall@1 {recall:.4f}  {format_latency(latencies)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark downscaled face detection
+
+Runs detect_faces on every image in a directory at several detection scales
+and reports mean detection time, speedup over full resolution, and recall
+against the full-resolution detections (a box counts as found when a scaled
+detection overlaps it with IoU >= 0.5).
+
+Without --images a synthetic set is built by pasting the faces found in
+--faces (any folder of portraits) at random sizes onto 1280x720 canvases.
+
+With --roi each scale is also timed with detection restricted to the given
+camera regions; recall is then measured on the reference faces centred
+inside them.
+
+Usage (from the backend directory):
+    python scripts/benchmark_detection_scale.py --images /path/to/frames
+    python scripts/benchmark_detection_scale.py --faces /path/to/portraits --synthetic 50
+    python scripts/benchmark_detection_scale.py --images frames --scales 1 0.75 0.5 0.35 --upsample 1 2
+    python scripts/benchmark_detection_scale.py --images frames --roi '[{"rect": [0.3, 0.2, 0.4, 0.75]}]'
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cv2
+import numpy as np
+
+from services.face_recognition_service import FaceRecognitionService
+from services.roi import box_center_inside, parse_roi, roi_area_ratio
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+
+def iou(a, b) -> float:
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+def load_images(directory: Path):
+    return [
+        cv2.imread(str(path))
+        for path in sorted(directory.iterdir())
+        if path.suffix.lower() in IMAGE_SUFFIXES
+    ]
+
+
+def synthetic_frames(portraits, count: int, rng, width: int = 1280, height: int = 720):
+    """Paste portraits at random sizes and positions onto plain frames"""
+    frames = []
+    for _ in range(count):
+        frame = np.full((height, width, 3), rng.integers(40, 200), dtype=np.uint8)
+        for _ in range(rng.integers(1, 6)):
+            portrait = portraits[rng.integers(len(portraits))]
+            size = int(rng.integers(60, 300))
+            scale = size / max(portrait.shape[:2])
+            patch = cv2.resize(portrait, None, fx=scale, fy=scale)
+            h, w = patch.shape[:2]
+            if h >= height or w >= width:
+                continue
+            y, x = int(rng.integers(0, height - h)), int(rng.integers(0, width - w))
+            frame[y:y + h, x:x + w] = patch
+        frames.append(frame)
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=Path, help='Directory of test frames')
+    parser.add_argument('--faces', type=Path, help='Directory of portraits for synthetic frames')
+    parser.add_argument('--synthetic', type=int, default=30, help='Synthetic frames to generate')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1.0, 0.75, 0.5, 0.35, 0.25])
+    parser.add_argument('--upsample', type=int, nargs='+', default=[1])
+    parser.add_argument('--method', default='dlib', choices=['dlib', 'mtcnn', 'opencv'])
+    parser.add_argument('--model', default='hog', choices=['hog', 'cnn'])
+    parser.add_argument('--roi', type=json.loads, help='Camera ROI regions as JSON (see services.roi)')
+    args = parser.parse_args()
+
+    if args.images:
+        images = load_images(args.images)
+    elif args.faces:
+        images = synthetic_frames(load_images(args.faces), args.synthetic, np.random.default_rng(0))
+    else:
+        parser.error("pass --images or --faces")
+
+    print(f"{len(images)} frames, method={args.method}, model={args.model}")
+
+    reference_service = FaceRecognitionService({'face_model': args.model})
+    reference = [reference_service.detect_faces(image, args.method, scale=1.0) for image in images]
+    total_reference = sum(len(boxes) for boxes in reference)
+    print(f"{total_reference} faces found at full resolution\n")
+
+    baseline = None
+    for upsample in args.upsample:
+        service = FaceRecognitionService({'face_model': args.model, 'detection_upsample': upsample})
+        for scale in args.scales:
+            started = time.perf_counter()
+            detections = [service.detect_faces(image, args.method, scale=scale) for image in images]
+            mean_ms = (time.perf_counter() - started) * 1000.0 / len(images)
+            baseline = baseline or mean_ms
+
+            found = sum(
+                1
+                for ref_boxes, boxes in zip(reference, detections)
+                for ref in ref_boxes
+                if any(iou(ref, box) >= 0.5 for box in boxes)
+            )
+            recall = found / total_reference if total_reference else 1.0
+            print(
+                f"upsample={upsample} scale={scale:<5} {mean_ms:8.1f} ms/frame  "
+                f"speedup {baseline / mean_ms:5.2f}x  recall {recall:.3f}"
+            )
+
+            if args.roi:
+                started = time.perf_counter()
+                detections = [service.detect_faces(image, args.method, scale=scale, roi=args.roi) for image in images]
+                roi_ms = (time.perf_counter() - started) * 1000.0 / len(images)
+
+                inside = [
+                    [ref for ref in ref_boxes if any(box_center_inside(ref, r) for r in parse_roi(args.roi, image.shape))]
+                    for image, ref_boxes in zip(images, reference)
+                ]
+                total_inside = sum(len(boxes) for boxes in inside)
+                found = sum(
+                    1
+                    for ref_boxes, boxes in zip(inside, detections)
+                    for ref in ref_boxes
+                    if any(iou(ref, box) >= 0.5 for box in boxes)
+                )
+                coverage = roi_area_ratio(parse_roi(args.roi, images[0].shape), images[0].shape)
+                print(
+                    f"  with roi ({coverage:.0%} of frame) {roi_ms:8.1f} ms/frame  "
+                    f"speedup {baseline / roi_ms:5.2f}x  recall in roi {found / total_inside if total_inside else 1.0:.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark face tracking on a recorded clip
+
+Samples the clip at the analysis rate, detects faces on every sample and
+runs them through a FaceTracker so only new, unconfirmed, improved or
+stale tracks are encoded. Reports encodings with and without tracking
+(without tracking every detection is encoded), encodings per second of
+video saved, and the encoding time saved using the measured mean cost of
+one encoding.
+
+With --gallery the encoded faces are matched against a gallery snapshot
+and confirmed identities (k-of-n votes) are printed as they happen.
+
+Usage (from the backend directory):
+    python scripts/benchmark_face_tracking.py --video lecture.mp4
+    python scripts/benchmark_face_tracking.py --video door.mp4 --analysis-fps 5 --gallery data/face_gallery
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cv2
+
+from services.face_gallery import FaceGallery
+from services.face_recognition_service import FaceRecognitionService
+from services.face_tracker import FaceTracker
+from services.gallery_snapshot import load_gallery_snapshot
+
+
+def sampled_frames(path: str, analysis_fps: float, max_seconds: float):
+    """Yield (video time, frame) at roughly analysis_fps"""
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    step = max(1, int(round(fps / analysis_fps)))
+    index = 0
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            timestamp = index / fps
+            if max_seconds and timestamp > max_seconds:
+                break
+            if index % step == 0:
+                yield timestamp, frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video', required=True, help='Recorded clip')
+    parser.add_argument('--analysis-fps', type=float, default=2.0)
+    parser.add_argument('--max-seconds', type=float, default=0, help='Stop after this much video (0 = whole clip)')
+    parser.add_argument('--method', default='dlib', choices=['dlib', 'mtcnn', 'opencv'])
+    parser.add_argument('--model', default='hog', choices=['hog', 'cnn'])
+    parser.add_argument('--gallery', help='Gallery snapshot directory to identify against')
+    parser.add_argument('--tolerance', type=float, default=0.6)
+    parser.add_argument('--vote-min', type=int, default=3)
+    parser.add_argument('--vote-window', type=int, default=5)
+    parser.add_argument('--reencode-seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    service = FaceRecognitionService({'face_model': args.model})
+    gallery = None
+    if args.gallery:
+        gallery = FaceGallery()
+        if load_gallery_snapshot(gallery, args.gallery) is None:
+            parser.error(f"no gallery snapshot in {args.gallery}")
+
+    tracker = FaceTracker(
+        vote_min=args.vote_min,
+        vote_window=args.vote_window,
+        reencode_seconds=args.reencode_seconds
+    )
+
+    frames = 0
+    clip_seconds = 0.0
+    detect_seconds = 0.0
+    encode_seconds = 0.0
+    for timestamp, frame in sampled_frames(args.video, args.analysis_fps, args.max_seconds):
+        frames += 1
+        clip_seconds = timestamp
+
+        started = time.perf_counter()
+        locations = service.detect_faces(frame, args.method)
+        qualities = [service.face_quality(frame, location) for location in locations]
+        detect_seconds += time.perf_counter() - started
+
+        for track in tracker.update(locations, qualities, timestamp):
+            if not tracker.needs_encoding(track, timestamp):
+                continue
+            started = time.perf_counter()
+            encoding = service.encode_face(frame, track.box)
+            encode_seconds += time.perf_counter() - started
+
+            match = None
+            if encoding is not None and gallery is not None:
+                match = gallery.match(encoding, args.tolerance)
+            event = tracker.record_identity(track, match, timestamp)
+            if event:
+                print(
+                    f"{timestamp:8.1f}s  track {event['track_id']} -> user {event['user_id']} "
+                    f"({event['votes']}/{event['window']} votes, confidence {event['confidence']:.3f})"
+                )
+
+    stats = tracker.stats()
+    per_encoding = encode_seconds / stats['encodings'] if stats['encodings'] else 0.0
+    print(f"\n{frames} frames analyzed over {clip_seconds:.1f}s of video, {stats['tracks_created']} tracks")
+    print(f"detection:           {detect_seconds / max(frames, 1) * 1000:8.1f} ms/frame")
+    print(f"encodings untracked: {stats['detections']:8d}")
+    print(f"encodings tracked:   {stats['encodings']:8d}  ({per_encoding * 1000:.1f} ms each)")
+    print(
+        f"saved:               {stats['encodings_saved']:8d}  "
+        f"({stats['encodings_saved'] / max(clip_seconds, 1e-6):.2f} encodings/s of video, "
+        f"~{stats['encodings_saved'] * per_encoding:.1f}s of encoding time)"
+    )
+    print(f"events:              {stats['events']:8d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark offset vs keyset pagination of the attendance listing
+
+Fills a scratch database with synthetic attendance records (SQLite file by
+default, or --database-url for a scratch PostgreSQL database; never point
+it at a real one), then times fetching a page at several depths the way
+GET /api/v1/attendance/records used to (OFFSET/LIMIT plus COUNT(*)) and
+the way it does now (keyset on (check_in_time, id) from a cursor).
+
+The cursor for a deep page is located once before timing, as a client
+that paged there would already hold it.
+
+Usage (from the backend directory):
+    python scripts/benchmark_pagination.py --rows 10000000
+    python scripts/benchmark_pagination.py --rows 1000000 --pages 1 100 10000 --user-id 7
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from sqlalchemy import create_engine, func, insert
+from sqlalchemy.orm import sessionmaker
+
+from models.database_models import AttendanceRecord, Base, User
+from services.pagination import keyset_page
+
+
+def populate(engine, rows: int, users: int, chunk: int = 200000):
+    """Synthetic records spread over two years, with indexes built after the load"""
+    Base.metadata.create_all(engine)
+    table = AttendanceRecord.__table__
+
+    with engine.begin() as conn:
+        existing = conn.execute(func.count(table.c.id).select()).scalar()
+        if existing >= rows:
+            print(f"Reusing {existing} existing records")
+            return
+        if existing:
+            raise SystemExit(f"Scratch database has {existing} records; remove it or pass --rows {existing}")
+
+        conn.execute(insert(User.__table__), [
+            {'id': i, 'email': f'user{i}@example.com', 'username': f'user{i}', 'password_hash': 'x',
+             'full_name': f'User {i}', 'role': 'STUDENT'}
+            for i in range(1, users + 1)
+        ])
+        for index in table.indexes:
+            index.drop(conn)
+
+    rng = np.random.default_rng(0)
+    start = datetime(2023, 1, 1)
+    span_seconds = 2 * 365 * 86400
+    started = time.perf_counter()
+    for offset in range(0, rows, chunk):
+        count = min(chunk, rows - offset)
+        seconds = rng.integers(0, span_seconds, size=count)
+        user_ids = rng.integers(1, users + 1, size=count)
+        with engine.begin() as conn:
+            conn.execute(insert(table), [
+                {
+                    'user_id': int(user_id),
+                    'check_in_time': start + timedelta(seconds=int(second)),
+                    'check_out_time': start + timedelta(seconds=int(second) + 3600),
+                    'verification_method': 'FACE',
+                    'status': 'PRESENT'
+                }
+                for user_id, second in zip(user_ids, seconds)
+            ])
+        print(f"\rInserted {offset + count}/{rows} records ({time.perf_counter() - started:.0f}s)", end='', flush=True)
+    print()
+
+    with engine.begin() as conn:
+        for index in table.indexes:
+            index.create(conn)
+    print(f"Loaded and indexed in {time.perf_counter() - started:.0f}s")
+
+
+def timed(fn, repeat: int) -> np.ndarray:
+    latencies = np.empty(repeat)
+    for i in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies[i] = time.perf_counter() - started
+    return latencies * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default='sqlite:////tmp/benchmark_pagination.db',
+                        help='Scratch database (created and filled if empty)')
+    parser.add_argument('--rows', type=int, default=10000000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 100, 10000])
+    parser.add_argument('--user-id', type=int, help="Benchmark one user's listing instead of all records")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    populate(engine, args.rows, args.users)
+    Session = sessionmaker(bind=engine)
+    order = [AttendanceRecord.check_in_time, AttendanceRecord.id]
+
+    with Session() as db:
+        query = db.query(AttendanceRecord)
+        if args.user_id:
+            query = query.filter(AttendanceRecord.user_id == args.user_id)
+
+        count = timed(query.count, max(1, args.repeat // 4))
+        print(f"COUNT(*): {np.median(count):9.2f} ms (paid on every page by the offset listing)")
+        print(f"{'page':>8} {'offset p50':>12} {'offset p95':>12} {'keyset p50':>12} {'keyset p95':>12}")
+
+        for page in args.pages:
+            skip = (page - 1) * args.page_size
+            ordered = query.order_by(*[column.desc() for column in order])
+
+            def offset_page():
+                return ordered.offset(skip).limit(args.page_size).all()
+
+            after = None
+            if skip:
+                last = ordered.with_entities(*order).offset(skip - 1).limit(1).first()
+                if last is None:
+                    print(f"{page:>8} beyond the last page")
+                    continue
+                after = list(last)
+
+            def cursor_page():
+                return keyset_page(query, order, args.page_size, after, descending=True)[0]
+
+            if [r.id for r in offset_page()] != [r.id for r in cursor_page()]:
+                raise SystemExit(f"Offset and keyset pages differ at page {page}")
+
+            offset_ms = timed(offset_page, args.repeat)
+            keyset_ms = timed(cursor_page, args.repeat)
+            print(
+                f"{page:>8} {np.median(offset_ms):9.2f} ms {np.percentile(offset_ms, 95):9.2f} ms "
+                f"{np.median(keyset_ms):9.2f} ms {np.percentile(keyset_ms, 95):9.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark the float16 / int8 quantized gallery scan against the exact scan
+
+Generates synthetic 128-d encodings clustered around identities, plus
+genuine probes (new samples of enrolled identities) and impostor probes
+(identities that are not enrolled). For each precision it reports the
+memory held by the scanned data, single-query latency and scan throughput,
+and how many match decisions (user id or no match at the tolerance) differ
+from the exact float32 path after the shortlist is re-ranked.
+
+Usage (from the backend directory):
+    python scripts/benchmark_quantized_scan.py
+    python scripts/benchmark_quantized_scan.py --sizes 100000 --shortlist 8 32 128
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from services.ann_index import QuantizedIndex, search_index
+
+
+def synthetic_gallery(size: int, per_identity: int, dimension: int, rng):
+    """Clustered encodings, their identity labels and the identity centers"""
+    identities = max(1, size // per_identity)
+    centers = rng.normal(0.0, 0.1, size=(identities, dimension)).astype(np.float32)
+    labels = rng.integers(0, identities, size=size)
+    vectors = centers[labels] + rng.normal(0.0, 0.03, size=(size, dimension)).astype(np.float32)
+    return vectors.astype(np.float32), labels, centers
+
+
+def probes(centers, count: int, impostor_share: float, rng):
+    """Genuine probes of enrolled identities mixed with unseen impostors"""
+    dimension = centers.shape[1]
+    impostors = int(count * impostor_share)
+    genuine = centers[rng.integers(0, len(centers), size=count - impostors)]
+    unseen = rng.normal(0.0, 0.1, size=(impostors, dimension))
+    queries = np.concatenate((genuine, unseen)) + rng.normal(0.0, 0.03, size=(count, dimension))
+    return queries.astype(np.float32)
+
+
+def decide(index, vectors, sq_norms, labels, queries, tolerance):
+    decisions = np.empty(len(queries), dtype=np.int64)
+    latencies = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        started = time.perf_counter()
+        distances, rows = search_index(index, vectors, sq_norms, query, k=1)
+        latencies[i] = time.perf_counter() - started
+        decisions[i] = labels[rows[0]] if distances[0] <= tolerance else -1
+    return decisions, latencies
+
+
+def report(name, nbytes, latencies, size, decisions, exact):
+    p50, p99 = np.percentile(latencies * 1000.0, [50, 99])
+    rows_per_second = size / np.median(latencies)
+    changed = int((decisions != exact).sum())
+    print(
+        f"  {name:<18} {nbytes / 2**20:8.1f} MiB  p50 {p50:7.3f} ms  p99 {p99:7.3f} ms  "
+        f"{rows_per_second / 1e6:7.1f} M rows/s  changed decisions {changed}/{len(exact)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--shortlist', type=int, nargs='+', default=[8, 32])
+    parser.add_argument('--tolerance', type=float, default=0.6)
+    parser.add_argument('--impostors', type=float, default=0.3, help='Share of probes with no enrolled identity')
+    parser.add_argument('--per-identity', type=int, default=4)
+    parser.add_argument('--dimension', type=int, default=128)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+
+    for size in args.sizes:
+        vectors, labels, centers = synthetic_gallery(size, args.per_identity, args.dimension, rng)
+        sq_norms = np.einsum('ij,ij->i', vectors, vectors)
+        queries = probes(centers, args.queries, args.impostors, rng)
+
+        print(f"\n{size} encodings, {args.queries} probes ({args.impostors:.0%} impostors), tolerance {args.tolerance}")
+        exact, latencies = decide(None, vectors, sq_norms, labels, queries, args.tolerance)
+        report('float32 exact', vectors.nbytes + sq_norms.nbytes, latencies, size, exact, exact)
+
+        for precision in ('float16', 'int8'):
+            for shortlist in args.shortlist:
+                index = QuantizedIndex(precision=precision, shortlist=shortlist)
+                index.build(vectors)
+                decisions, latencies = decide(index, vectors, sq_norms, labels, queries, args.tolerance)
+                report(f"{precision} top-{shortlist}", index.nbytes, latencies, size, decisions, exact)
+
+    print("\nMemory is the data scanned per query; the float32 matrix is still kept for re-ranking.")
+
+
+if __name__ == '__main__':
+    main()
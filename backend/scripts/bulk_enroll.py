@@ -0,0 +1,93 @@
+"""
+Bulk-enroll faces from a directory or zip of images
+
+The manifest is a CSV with a 'file' column (path inside the directory or
+archive) and one of user_id, username, student_id or employee_id. Images are
+decoded and encoded across a process pool and inserted in batches; a
+per-file report lists images with no face, several faces, unknown users or
+missing files.
+
+Running API workers pick up the new encodings on their next gallery load.
+
+Usage (from the backend directory):
+    python scripts/bulk_enroll.py --source photos.zip --manifest intake.csv
+    python scripts/bulk_enroll.py --source photos/ --manifest intake.csv --workers 8 --report report.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.database import SessionLocal
+from config.settings import Settings
+from services.bulk_enrollment import BulkEnrollmentJob, ImageSource, parse_manifest
+from services.face_worker_pool import FaceWorkerPool
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("bulk_enroll")
+
+
+async def run(args):
+    settings = Settings()
+    config = {
+        'face_detection_confidence': settings.FACE_DETECTION_CONFIDENCE,
+        'face_model': settings.FACE_MODEL,
+        'encoding_model': settings.FACE_ENCODING_MODEL,
+        'detection_scale': settings.FACE_DETECTION_SCALE,
+        'detection_short_side': settings.FACE_DETECTION_SHORT_SIDE,
+        'detection_upsample': settings.FACE_DETECTION_UPSAMPLE
+    }
+
+    entries = parse_manifest(Path(args.manifest).read_text())
+    source = ImageSource(args.source)
+    pool = FaceWorkerPool(config, max_workers=args.workers, max_queue=args.batch_size)
+
+    summary = None
+    with SessionLocal() as db:
+        try:
+            job = BulkEnrollmentJob(db, pool, batch_size=args.batch_size, insert_batch_size=args.insert_batch_size)
+            async for event in job.run(entries, source):
+                if event['type'] == 'progress':
+                    logger.info(
+                        f"{event['processed']}/{event['total']} processed, "
+                        f"{event['enrolled']} enrolled, {event['no_face']} no face, "
+                        f"{event['multiple_faces']} multiple faces"
+                    )
+                else:
+                    summary = event
+        finally:
+            source.close()
+            pool.shutdown()
+
+    if args.report:
+        Path(args.report).write_text(json.dumps(summary, indent=2))
+        logger.info(f"Report written to {args.report}")
+    else:
+        for entry in summary['files']:
+            print(f"{entry['status']:<15} {entry['file']}")
+
+    logger.info(
+        f"Done in {summary['elapsed_seconds']}s: {summary['enrolled']} enrolled, "
+        f"{summary['no_face']} no face, {summary['multiple_faces']} multiple faces, "
+        f"{summary['unknown_user']} unknown users, {summary['missing_file']} missing files"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', required=True, help='Image directory or zip archive')
+    parser.add_argument('--manifest', required=True, help='CSV mapping files to users')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--batch-size', type=int, default=64, help='Images per pool round')
+    parser.add_argument('--insert-batch-size', type=int, default=500, help='Rows per bulk insert')
+    parser.add_argument('--report', help='Write the per-file report as JSON')
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
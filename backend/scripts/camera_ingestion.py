@@ -0,0 +1,129 @@
+"""
+Run continuous camera ingestion outside the API process
+
+Reads every active camera from the database, or local video files standing
+in for RTSP feeds, keeps only the newest frame per camera, sends samples
+that pass the motion gate to a face worker pool at the analysis rate and
+prints per-camera capture FPS, analysis FPS, dropped-frame and
+static-frame counts, and the encodings saved by face tracking.
+
+With --video no database is needed; camera ids are numbered from 1.
+
+Usage (from the backend directory):
+    python scripts/camera_ingestion.py
+    python scripts/camera_ingestion.py --video door.mp4 --video hall.mp4 --analysis-fps 4 --duration 60
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.settings import Settings
+from services.camera_ingestion import CameraIngestionManager
+from services.face_worker_pool import FaceWorkerPool
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("camera_ingestion")
+
+
+def print_stats(stats):
+    print(
+        f"{'camera':>6} {'status':<9} {'capture fps':>11} {'analysis fps':>12} "
+        f"{'captured':>9} {'dropped':>8} {'analyzed':>8} {'static':>7} {'busy':>5} {'faces':>6} {'saved':>6}"
+    )
+    for camera_id, s in sorted(stats.items()):
+        print(
+            f"{camera_id:>6} {s['status']:<9} {s['capture_fps']:>11.1f} {s['analysis_fps']:>12.2f} "
+            f"{s['frames_captured']:>9} {s['frames_dropped']:>8} {s['frames_analyzed']:>8} "
+            f"{s['motion_skips']:>7} {s['busy_skips']:>5} {s['faces_detected']:>6} "
+            f"{s['tracking']['encodings_saved'] if s['tracking'] else '-':>6}"
+        )
+    print()
+
+
+async def run(args):
+    settings = Settings()
+    analysis_fps = args.analysis_fps or settings.CAMERA_ANALYSIS_FPS
+    config = {
+        'face_detection_confidence': settings.FACE_DETECTION_CONFIDENCE,
+        'face_model': settings.FACE_MODEL,
+        'encoding_model': settings.FACE_ENCODING_MODEL,
+        'detection_scale': settings.FACE_DETECTION_SCALE,
+        'detection_short_side': settings.FACE_DETECTION_SHORT_SIDE,
+        'detection_upsample': settings.FACE_DETECTION_UPSAMPLE
+    }
+    pool = FaceWorkerPool(config, max_workers=args.workers, max_queue=max(args.workers, 1) * 2)
+
+    session_factory = None
+    cameras = None
+    if args.video:
+        cameras = [
+            {'id': i, 'name': Path(path).name, 'url': path, 'type': 'file', 'fps': 30, 'metadata': {}}
+            for i, path in enumerate(args.video, start=1)
+        ]
+    else:
+        from config.database import SessionLocal
+        session_factory = SessionLocal
+
+    manager = CameraIngestionManager(
+        pool,
+        session_factory=session_factory,
+        analysis_fps=analysis_fps,
+        heartbeat_seconds=settings.CAMERA_HEARTBEAT_SECONDS,
+        reconnect_seconds=settings.CAMERA_RECONNECT_SECONDS,
+        loop_files=args.loop,
+        motion_defaults=None if args.no_motion_gate else {
+            'mode': settings.CAMERA_MOTION_MODE,
+            'threshold': settings.CAMERA_MOTION_THRESHOLD,
+            'min_area': settings.CAMERA_MOTION_MIN_AREA,
+            'max_idle_seconds': settings.CAMERA_MOTION_MAX_IDLE_SECONDS
+        },
+        tracking_defaults=None if args.no_tracking else {
+            'iou_threshold': settings.CAMERA_TRACK_IOU_THRESHOLD,
+            'max_age_seconds': settings.CAMERA_TRACK_MAX_AGE_SECONDS,
+            'reencode_seconds': settings.CAMERA_TRACK_REENCODE_SECONDS,
+            'quality_gain': settings.CAMERA_TRACK_QUALITY_GAIN,
+            'vote_min': settings.CAMERA_TRACK_VOTE_MIN,
+            'vote_window': settings.CAMERA_TRACK_VOTE_WINDOW,
+            'event_cooldown_seconds': settings.CAMERA_EVENT_COOLDOWN_SECONDS
+        }
+    )
+
+    await asyncio.to_thread(pool.warm_up)
+    await manager.start(cameras)
+
+    started = time.monotonic()
+    try:
+        while args.duration <= 0 or time.monotonic() - started < args.duration:
+            await asyncio.sleep(args.report_every)
+            stats = manager.stats()
+            print_stats(stats)
+            if args.video and not args.loop and all(s['status'] == 'finished' for s in stats.values()):
+                break
+    finally:
+        await manager.stop()
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video', action='append', help='Local video file to use as a camera (repeatable)')
+    parser.add_argument('--loop', action='store_true', help='Loop video files')
+    parser.add_argument('--no-motion-gate', action='store_true', help='Run detection on every sampled frame')
+    parser.add_argument('--no-tracking', action='store_true', help='Encode every detected face')
+    parser.add_argument('--analysis-fps', type=float, help='Default: CAMERA_ANALYSIS_FPS')
+    parser.add_argument('--workers', type=int, default=2, help='Face worker processes')
+    parser.add_argument('--duration', type=float, default=0, help='Seconds to run (0 = until interrupted)')
+    parser.add_argument('--report-every', type=float, default=5.0, help='Seconds between stats reports')
+    try:
+        asyncio.run(run(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Check that the attendance hot queries are served by their indexes
+
+Runs EXPLAIN for each query against the configured database (migrated with
+``alembic upgrade head``) and exits with status 1 if any of them scans
+attendance_records sequentially or stops using the indexes it was given,
+so it can gate CI or a deploy.
+
+On PostgreSQL, sequential scans are disabled for the check by default, so
+it answers "can the planner use the index" even on a small or empty
+database; pass --planner-costs to see what the planner picks with the real
+table statistics instead. SQLite plans come from EXPLAIN QUERY PLAN.
+
+Usage (from the backend directory):
+    python scripts/check_query_plans.py
+    python scripts/check_query_plans.py --planner-costs --verbose
+"""
+import argparse
+import json
+import logging
+import re
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import select, text
+
+from config.database import engine
+from models.database_models import AttendanceRecord
+from services.pagination import keyset_after
+
+logger = logging.getLogger("check_query_plans")
+
+TABLE = AttendanceRecord.__tablename__
+
+
+def hot_queries():
+    """(name, statement, indexes any of which must serve it) for each hot query"""
+    day_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    day_end = day_start + timedelta(days=1)
+    month_start = day_start - timedelta(days=30)
+    listing_order = [AttendanceRecord.check_in_time, AttendanceRecord.id]
+    cursor = [day_start, 1000]
+
+    return [
+        (
+            # GET /api/v1/attendance/records?user_id=...&start_date=...&end_date=...
+            'user_records_in_range',
+            select(AttendanceRecord).where(
+                AttendanceRecord.user_id == 1,
+                AttendanceRecord.check_in_time >= month_start,
+                AttendanceRecord.check_in_time <= day_end
+            ),
+            {'ix_attendance_records_user_check_in'}
+        ),
+        (
+            # AttendanceService check-in/check-out: the user's open session today
+            'user_open_session',
+            select(AttendanceRecord.id, AttendanceRecord.check_in_time).where(
+                AttendanceRecord.user_id == 1,
+                AttendanceRecord.check_in_time >= day_start,
+                AttendanceRecord.check_in_time < day_end,
+                AttendanceRecord.check_out_time == None
+            ),
+            {'ix_attendance_records_user_check_in', 'ix_attendance_records_open_check_in'}
+        ),
+        (
+            # OpenSessionIndex.rebuild: every open session today
+            'open_sessions_today',
+            select(AttendanceRecord.user_id, AttendanceRecord.id, AttendanceRecord.check_in_time).where(
+                AttendanceRecord.check_in_time >= day_start,
+                AttendanceRecord.check_in_time < day_end,
+                AttendanceRecord.check_out_time == None
+            ),
+            {'ix_attendance_records_open_check_in'}
+        ),
+        (
+            # A camera's records in a time range
+            'camera_records_in_range',
+            select(AttendanceRecord).where(
+                AttendanceRecord.camera_id == 1,
+                AttendanceRecord.check_in_time >= month_start,
+                AttendanceRecord.check_in_time < day_end
+            ),
+            {'ix_attendance_records_camera_check_in'}
+        ),
+        (
+            # GET /api/v1/attendance/records?cursor=...: a page deep into the listing
+            'records_page_after_cursor',
+            select(AttendanceRecord).where(
+                keyset_after(listing_order, cursor, descending=True)
+            ).order_by(*[column.desc() for column in listing_order]).limit(100),
+            {'ix_attendance_records_check_in_id'}
+        ),
+        (
+            # GET /api/v1/attendance/records?user_id=...&cursor=...
+            'user_records_page_after_cursor',
+            select(AttendanceRecord).where(
+                AttendanceRecord.user_id == 1,
+                keyset_after(listing_order, cursor, descending=True)
+            ).order_by(*[column.desc() for column in listing_order]).limit(100),
+            {'ix_attendance_records_user_check_in'}
+        ),
+    ]
+
+
+def _run_explain(conn, prefix: str, statement):
+    compiled = statement.compile(dialect=conn.dialect)
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    return conn.exec_driver_sql(prefix + str(compiled), params).fetchall()
+
+
+def _postgres_plan(conn, statement):
+    """(indexes used on the table, sequential scan on the table?, plan text)"""
+    plan = _run_explain(conn, "EXPLAIN (FORMAT JSON) ", statement)[0][0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    indexes, seq_scan = set(), False
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        nodes.extend(node.get('Plans', []))
+        if node.get('Relation Name') == TABLE and node['Node Type'] == 'Seq Scan':
+            seq_scan = True
+        if 'Index Name' in node:
+            indexes.add(node['Index Name'])
+    return indexes, seq_scan, json.dumps(plan, indent=2)
+
+
+def _sqlite_plan(conn, statement):
+    """(indexes used on the table, full table scan?, plan text)"""
+    details = [row[3] for row in _run_explain(conn, "EXPLAIN QUERY PLAN ", statement)]
+    indexes, seq_scan = set(), False
+    for detail in details:
+        if re.match(rf"SCAN {TABLE}\b(?! USING)", detail):
+            seq_scan = True
+        match = re.search(r"USING (?:COVERING )?INDEX (\w+)", detail)
+        if match:
+            indexes.add(match.group(1))
+    return indexes, seq_scan, '\n'.join(details)
+
+
+def check_plans(planner_costs: bool = False, verbose: bool = False, bind=None) -> bool:
+    """
+    EXPLAIN every hot query and report whether it uses its indexes
+
+    Args:
+        planner_costs: On PostgreSQL, keep sequential scans enabled
+        verbose: Log the full plans
+        bind: Engine to check (defaults to the configured database)
+
+    Returns:
+        True if every query is served by one of its expected indexes
+    """
+    bind = bind if bind is not None else engine
+    dialect = bind.dialect.name
+    if dialect not in ('postgresql', 'sqlite'):
+        raise SystemExit(f"Query plan checks support PostgreSQL and SQLite, not {dialect}")
+
+    ok = True
+    with bind.connect() as conn:
+        with conn.begin():
+            if dialect == 'postgresql' and not planner_costs:
+                conn.execute(text("SET LOCAL enable_seqscan = off"))
+
+            for name, statement, expected in hot_queries():
+                if dialect == 'postgresql':
+                    indexes, seq_scan, plan = _postgres_plan(conn, statement)
+                else:
+                    indexes, seq_scan, plan = _sqlite_plan(conn, statement)
+
+                passed = bool(indexes & expected) and not seq_scan
+                ok = ok and passed
+                used = ', '.join(sorted(indexes)) or 'no index'
+                if passed:
+                    logger.info(f"ok    {name}: {used}")
+                else:
+                    logger.error(
+                        f"FAIL  {name}: {'sequential scan, ' if seq_scan else ''}{used}; "
+                        f"expected one of {', '.join(sorted(expected))}"
+                    )
+                if verbose or not passed:
+                    logger.info(f"{name} plan:\n{plan}")
+    return ok
+
+
+def main():
+    # force: importing services logs optional-dependency warnings, which configures the root logger first
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', force=True)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--planner-costs', action='store_true',
+                        help='PostgreSQL: leave sequential scans enabled and check the plan the planner prefers')
+    parser.add_argument('--verbose', action='store_true', help='Print every plan')
+    args = parser.parse_args()
+
+    if not check_plans(args.planner_costs, args.verbose):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
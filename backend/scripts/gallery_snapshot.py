@@ -0,0 +1,46 @@
+"""
+Write a fresh face gallery snapshot
+
+Loads the current snapshot (if any) and applies the database delta, or
+reads the whole face_encodings table, then writes a new snapshot generation.
+Run it periodically (e.g. from cron) so API workers only replay a small
+delta at startup.
+
+Usage (from the backend directory):
+    python scripts/gallery_snapshot.py
+    python scripts/gallery_snapshot.py --directory data/face_gallery --full
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.database import SessionLocal
+from config.settings import Settings
+from services.face_gallery import FaceGallery
+from services.gallery_snapshot import save_gallery_snapshot, warm_start_gallery
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def main():
+    settings = Settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--directory', default=settings.FACE_GALLERY_SNAPSHOT_DIR or 'data/face_gallery')
+    parser.add_argument('--full', action='store_true', help='Ignore the existing snapshot and read the whole table')
+    args = parser.parse_args()
+
+    gallery = FaceGallery()
+    with SessionLocal() as db:
+        if args.full:
+            gallery.load_from_db(db)
+        else:
+            warm_start_gallery(gallery, db, args.directory, write_if_missing=False)
+
+    save_gallery_snapshot(gallery, args.directory)
+
+
+if __name__ == "__main__":
+    main()
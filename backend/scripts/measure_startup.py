@@ -0,0 +1,78 @@
+"""
+Measure API import time and memory for lazy vs eager model loading
+
+Each measurement runs in a fresh interpreter so module caches do not leak
+between runs. Reports wall-clock time to import ``main`` (which builds the
+services) and the peak RSS afterwards, plus the cost of each AI library on
+its own.
+
+Usage (from the backend directory):
+    python scripts/measure_startup.py
+    python scripts/measure_startup.py --runs 5 --modes lazy eager
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss_kb //= 1024
+print(json.dumps({{"seconds": elapsed, "rss_mb": rss_kb / 1024}}))
+"""
+
+LIBRARIES = ['cv2', 'face_recognition', 'mtcnn', 'deepface']
+
+
+def probe(statement: str, env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE.format(statement=statement)],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr else "failed"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    ok = [s for s in samples if 'error' not in s]
+    if not ok:
+        return samples[0]['error']
+    seconds = statistics.median(s['seconds'] for s in ok)
+    rss = statistics.median(s['rss_mb'] for s in ok)
+    return f"{seconds:7.2f} s  {rss:8.1f} MB RSS"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--modes', nargs='+', default=['lazy', 'eager'])
+    args = parser.parse_args()
+
+    print("Importing main (median of runs)")
+    for mode in args.modes:
+        env = {**os.environ, 'FACE_MODEL_LOADING': mode}
+        samples = [probe("import main", env) for _ in range(args.runs)]
+        print(f"  {mode:<6} {summarize(samples)}")
+
+    print("\nAI libraries imported alone")
+    for library in LIBRARIES:
+        samples = [probe(f"import {library}", dict(os.environ)) for _ in range(args.runs)]
+        print(f"  {library:<17} {summarize(samples)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Backfill binary float32 face encodings from the legacy JSON column
+
+Adds the encoding_blob / encoding_dim / encoding_version columns if they are
+missing, then converts rows in small keyset-paginated chunks. Each chunk is
+its own short transaction touching only the rows it converts, so the table
+stays available to enroll/verify traffic while the backfill runs.
+
+Usage (from the backend directory):
+    python scripts/migrate_face_encodings.py --chunk-size 500 --pause 0.05
+    python scripts/migrate_face_encodings.py --clear-json
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import inspect, text
+
+from config.database import engine, SessionLocal
+from models.database_models import FaceEncoding
+from services.face_gallery import pack_encoding, ENCODING_FORMAT_VERSION
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("migrate_face_encodings")
+
+
+def ensure_columns():
+    """Add the binary encoding columns to an existing face_encodings table"""
+    columns = {c['name']: c for c in inspect(engine).get_columns('face_encodings')}
+    blob_type = 'BYTEA' if engine.dialect.name == 'postgresql' else 'BLOB'
+
+    with engine.begin() as conn:
+        for name, ddl_type in (
+            ('encoding_blob', blob_type),
+            ('encoding_dim', 'INTEGER'),
+            ('encoding_version', 'INTEGER')
+        ):
+            if name not in columns:
+                logger.info(f"Adding column face_encodings.{name}")
+                conn.execute(text(f"ALTER TABLE face_encodings ADD COLUMN {name} {ddl_type}"))
+
+        if not columns['encoding_data']['nullable']:
+            if engine.dialect.name == 'postgresql':
+                conn.execute(text("ALTER TABLE face_encodings ALTER COLUMN encoding_data DROP NOT NULL"))
+            else:
+                logger.warning(
+                    "encoding_data is NOT NULL and this database cannot relax it in place; "
+                    "new enrollments need the table recreated from the current models"
+                )
+
+
+def backfill(chunk_size: int, pause: float, clear_json: bool) -> int:
+    """
+    Convert JSON encodings to binary in keyset-paginated chunks
+
+    Args:
+        chunk_size: Rows converted per transaction
+        pause: Seconds to sleep between chunks
+        clear_json: Null out the JSON column once the blob is written
+
+    Returns:
+        Number of rows converted
+    """
+    converted = 0
+    last_id = 0
+
+    while True:
+        with SessionLocal() as db:
+            rows = db.query(FaceEncoding.id, FaceEncoding.encoding_data).filter(
+                FaceEncoding.id > last_id,
+                FaceEncoding.encoding_blob == None,
+                FaceEncoding.encoding_data != None
+            ).order_by(FaceEncoding.id).limit(chunk_size).all()
+
+            if not rows:
+                break
+
+            mappings = []
+            for encoding_id, encoding_data in rows:
+                encoding = json.loads(encoding_data)
+                mapping = {
+                    'id': encoding_id,
+                    'encoding_blob': pack_encoding(encoding),
+                    'encoding_dim': len(encoding),
+                    'encoding_version': ENCODING_FORMAT_VERSION
+                }
+                if clear_json:
+                    mapping['encoding_data'] = None
+                mappings.append(mapping)
+
+            db.bulk_update_mappings(FaceEncoding, mappings)
+            db.commit()
+
+        converted += len(rows)
+        last_id = rows[-1][0]
+        logger.info(f"Converted {converted} encodings (last id {last_id})")
+
+        if pause:
+            time.sleep(pause)
+
+    return converted
+
+
+def clear_converted_json(chunk_size: int, pause: float) -> int:
+    """Null out JSON for rows that were already converted on an earlier run"""
+    cleared = 0
+    last_id = 0
+
+    while True:
+        with SessionLocal() as db:
+            ids = [row[0] for row in db.query(FaceEncoding.id).filter(
+                FaceEncoding.id > last_id,
+                FaceEncoding.encoding_blob != None,
+                FaceEncoding.encoding_data != None
+            ).order_by(FaceEncoding.id).limit(chunk_size).all()]
+
+            if not ids:
+                break
+
+            db.query(FaceEncoding).filter(FaceEncoding.id.in_(ids)).update(
+                {FaceEncoding.encoding_data: None},
+                synchronize_session=False
+            )
+            db.commit()
+
+        cleared += len(ids)
+        last_id = ids[-1]
+
+        if pause:
+            time.sleep(pause)
+
+    return cleared
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chunk-size', type=int, default=500, help='Rows converted per transaction')
+    parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between chunks')
+    parser.add_argument('--clear-json', action='store_true', help='Null out legacy JSON after conversion')
+    args = parser.parse_args()
+
+    ensure_columns()
+    converted = backfill(args.chunk_size, args.pause, args.clear_json)
+    logger.info(f"Backfill complete: {converted} encodings converted")
+
+    if args.clear_json:
+        cleared = clear_converted_json(args.chunk_size, args.pause)
+        logger.info(f"Cleared legacy JSON on {cleared} previously converted encodings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Prepare attendance_records for the in-memory open-session index
+
+Adds the attendance_date column if it is missing, backfills it from
+check_in_time in keyset-paginated chunks, and creates the partial unique
+index uq_attendance_open_session on (user_id, attendance_date) WHERE
+check_out_time IS NULL (CONCURRENTLY on PostgreSQL, so check-ins keep
+working while it builds).
+
+The index cannot be created while a user has several open sessions on the
+same day. Those are reported; with --close-duplicates every open session
+but the earliest of each user and day is closed at its own check-in time
+(duration 0).
+
+Alembic revision 0002_open_sessions makes the same change with a single
+UPDATE; on a large table run this script first and the revision then
+finds nothing left to do.
+
+Usage (from the backend directory):
+    python scripts/migrate_open_sessions.py --chunk-size 5000
+    python scripts/migrate_open_sessions.py --close-duplicates
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import func, inspect, text
+
+from config.database import engine, SessionLocal
+from models.database_models import AttendanceRecord
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("migrate_open_sessions")
+
+INDEX_NAME = 'uq_attendance_open_session'
+
+
+def ensure_column():
+    """Add attendance_date to an existing attendance_records table"""
+    columns = {c['name'] for c in inspect(engine).get_columns('attendance_records')}
+    if 'attendance_date' not in columns:
+        logger.info("Adding column attendance_records.attendance_date")
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE attendance_records ADD COLUMN attendance_date DATE"))
+
+
+def backfill(chunk_size: int, pause: float) -> int:
+    """
+    Set attendance_date from check_in_time in keyset-paginated chunks
+
+    Args:
+        chunk_size: Rows updated per transaction
+        pause: Seconds to sleep between chunks
+
+    Returns:
+        Number of rows updated
+    """
+    updated = 0
+    last_id = 0
+
+    while True:
+        with SessionLocal() as db:
+            rows = db.query(AttendanceRecord.id, AttendanceRecord.check_in_time).filter(
+                AttendanceRecord.id > last_id,
+                AttendanceRecord.attendance_date == None
+            ).order_by(AttendanceRecord.id).limit(chunk_size).all()
+
+            if not rows:
+                break
+
+            db.bulk_update_mappings(AttendanceRecord, [
+                {'id': record_id, 'attendance_date': check_in_time.date()}
+                for record_id, check_in_time in rows
+            ])
+            db.commit()
+
+        updated += len(rows)
+        last_id = rows[-1][0]
+        logger.info(f"Backfilled {updated} rows (last id {last_id})")
+
+        if pause:
+            time.sleep(pause)
+
+    return updated
+
+
+def duplicate_open_sessions():
+    """(user_id, attendance_date, open sessions) for every user and day with more than one"""
+    with SessionLocal() as db:
+        return db.query(
+            AttendanceRecord.user_id,
+            AttendanceRecord.attendance_date,
+            func.count(AttendanceRecord.id)
+        ).filter(
+            AttendanceRecord.check_out_time == None
+        ).group_by(
+            AttendanceRecord.user_id,
+            AttendanceRecord.attendance_date
+        ).having(func.count(AttendanceRecord.id) > 1).all()
+
+
+def close_duplicates(duplicates) -> int:
+    """Close all but the earliest open session of each duplicated user and day"""
+    closed = 0
+    with SessionLocal() as db:
+        for user_id, attendance_date, _ in duplicates:
+            extra = db.query(AttendanceRecord).filter(
+                AttendanceRecord.user_id == user_id,
+                AttendanceRecord.attendance_date == attendance_date,
+                AttendanceRecord.check_out_time == None
+            ).order_by(AttendanceRecord.check_in_time, AttendanceRecord.id).all()[1:]
+
+            for record in extra:
+                record.check_out_time = record.check_in_time
+                record.duration_minutes = 0
+                logger.info(f"Closing duplicate open session {record.id} (user {user_id}, {attendance_date})")
+            closed += len(extra)
+        db.commit()
+    return closed
+
+
+def create_index():
+    """Create the partial unique index unless it exists"""
+    existing = {index['name'] for index in inspect(engine).get_indexes('attendance_records')}
+    if INDEX_NAME in existing:
+        logger.info(f"Index {INDEX_NAME} already exists")
+        return
+
+    concurrently = 'CONCURRENTLY ' if engine.dialect.name == 'postgresql' else ''
+    logger.info(f"Creating index {INDEX_NAME}")
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(
+            f"CREATE UNIQUE INDEX {concurrently}{INDEX_NAME} "
+            f"ON attendance_records (user_id, attendance_date) WHERE check_out_time IS NULL"
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Rows backfilled per transaction')
+    parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between chunks')
+    parser.add_argument('--close-duplicates', action='store_true',
+                        help='Close extra open sessions of the same user and day instead of stopping')
+    args = parser.parse_args()
+
+    ensure_column()
+    updated = backfill(args.chunk_size, args.pause)
+    logger.info(f"Backfill complete: {updated} rows")
+
+    duplicates = duplicate_open_sessions()
+    if duplicates:
+        if not args.close_duplicates:
+            for user_id, attendance_date, count in duplicates[:20]:
+                logger.error(f"User {user_id} has {count} open sessions on {attendance_date}")
+            logger.error(
+                f"{len(duplicates)} user/day pairs have several open sessions; "
+                f"rerun with --close-duplicates to close all but the earliest"
+            )
+            sys.exit(1)
+        logger.info(f"Closed {close_duplicates(duplicates)} duplicate open sessions")
+
+    create_index()
+
+
+if __name__ == "__main__":
+    main()
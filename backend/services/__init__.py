@@ -1,5 +1,9 @@
 from .auth_service import AuthService, UserRole, Permission
 from .face_recognition_service import FaceRecognitionService
+from .face_gallery import FaceGallery
+from .shared_gallery import SharedFaceGallery, SharedGalleryUnavailable
+from .face_worker_pool import FaceWorkerPool, FaceWorkerPoolBusy
+from .verify_batcher import VerifyBatcher
 from .rfid_service import RFIDService, RFIDCardManager
 
 __all__ = [
@@ -7,6 +11,12 @@ __all__ = [
     'UserRole',
     'Permission',
     'FaceRecognitionService',
+    'FaceGallery',
+    'SharedFaceGallery',
+    'SharedGalleryUnavailable',
+    'FaceWorkerPool',
+    'FaceWorkerPoolBusy',
+    'VerifyBatcher',
     'RFIDService',
     'RFIDCardManager'
 ]
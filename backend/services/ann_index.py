@@ -0,0 +1,356 @@
+import logging
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def squared_distances(vectors: np.ndarray, sq_norms: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Squared Euclidean distances using ||a - b||^2 = ||a||^2 - 2 a.b + ||b||^2"""
+    sq_distances = sq_norms - 2.0 * (vectors @ query) + float(query @ query)
+    np.maximum(sq_distances, 0.0, out=sq_distances)
+    return sq_distances
+
+
+class FlatIndex:
+    """
+    Exact brute-force index
+
+    Every search scans all rows. This is the baseline the approximate
+    indexes are measured against and the default for small galleries.
+    """
+
+    name = 'flat'
+
+    def __init__(self):
+        self.built_size = 0
+
+    def build(self, vectors: np.ndarray):
+        self.built_size = len(vectors)
+
+    def needs_rebuild(self, size: int) -> bool:
+        return False
+
+    def candidates(self, query: np.ndarray, size: int, nprobe: Optional[int] = None) -> Optional[np.ndarray]:
+        """Flat search has no shortlist: every row is a candidate"""
+        return None
+
+
+class IVFIndex:
+    """
+    Inverted-file index with k-means coarse quantization
+
+    Rows are clustered around ``n_lists`` centroids. A query only scans the
+    rows in its ``nprobe`` nearest lists plus any rows appended since the
+    last build, then the shortlist is re-ranked with exact distances so
+    tolerance decisions are made on true float32 distances.
+
+    Args:
+        n_lists: Number of coarse centroids (0 picks ~sqrt(N) at build time)
+        nprobe: Lists scanned per query; higher means better recall
+        kmeans_iterations: Lloyd iterations used to train centroids
+        train_size: Maximum rows sampled to train centroids
+        rebuild_ratio: Rebuild once unindexed rows exceed this share of built rows
+        seed: Random seed for reproducible training
+    """
+
+    name = 'ivf'
+
+    def __init__(
+        self,
+        n_lists: int = 0,
+        nprobe: int = 8,
+        kmeans_iterations: int = 15,
+        train_size: int = 100000,
+        rebuild_ratio: float = 0.1,
+        seed: int = 0
+    ):
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.kmeans_iterations = kmeans_iterations
+        self.train_size = train_size
+        self.rebuild_ratio = rebuild_ratio
+        self.seed = seed
+
+        self.centroids = None
+        self.centroid_sq_norms = None
+        self.list_offsets = None
+        self.list_rows = None
+        self.built_size = 0
+
+    def _assign(self, vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """Nearest-centroid assignment, chunked to bound the temporary matrix"""
+        centroid_sq_norms = np.einsum('ij,ij->i', centroids, centroids)
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk_size):
+            chunk = vectors[start:start + chunk_size]
+            # ||x||^2 is constant per row and does not change the argmin
+            scores = centroid_sq_norms - 2.0 * (chunk @ centroids.T)
+            assignments[start:start + chunk_size] = np.argmin(scores, axis=1)
+        return assignments
+
+    def _train(self, vectors: np.ndarray, n_lists: int) -> np.ndarray:
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(vectors), max(self.train_size, n_lists))
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+
+        for _ in range(self.kmeans_iterations):
+            assignments = self._assign(sample, centroids)
+            counts = np.bincount(assignments, minlength=n_lists)
+            order = np.argsort(assignments, kind='stable')
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+            empty = counts == 0
+            # Segment sums over assignment-sorted rows; empty segments are skipped
+            sums = np.add.reduceat(sample[order], starts[~empty], axis=0)
+            centroids[~empty] = sums / counts[~empty, None]
+            # Re-seed empty lists from random samples so no centroid is wasted
+            if empty.any():
+                centroids[empty] = sample[rng.choice(sample_size, int(empty.sum()), replace=False)]
+
+        return centroids.astype(np.float32)
+
+    def build(self, vectors: np.ndarray):
+        """
+        Train centroids and build inverted lists over the given rows
+
+        Args:
+            vectors: Gallery matrix, rows indexed by gallery position
+        """
+        started = time.perf_counter()
+        size = len(vectors)
+        n_lists = self.n_lists or int(np.sqrt(size))
+        n_lists = max(1, min(n_lists, size))
+
+        if size == 0:
+            self.centroids = None
+            self.built_size = 0
+            return
+
+        centroids = self._train(vectors, n_lists)
+        assignments = self._assign(vectors, centroids)
+
+        # CSR layout: rows of list c are list_rows[list_offsets[c]:list_offsets[c + 1]]
+        list_rows = np.argsort(assignments, kind='stable')
+        list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=n_lists), out=list_offsets[1:])
+
+        self.centroids = centroids
+        self.centroid_sq_norms = np.einsum('ij,ij->i', centroids, centroids)
+        self.list_rows = list_rows
+        self.list_offsets = list_offsets
+        self.built_size = size
+
+        logger.info(
+            f"IVF index built: {size} rows, {n_lists} lists "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+    def needs_rebuild(self, size: int) -> bool:
+        return size - self.built_size > max(1000, self.rebuild_ratio * self.built_size)
+
+    def candidates(self, query: np.ndarray, size: int, nprobe: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        Gallery rows worth scoring exactly for a query
+
+        Args:
+            query: Face encoding being searched
+            size: Current gallery size; rows past the built size are always included
+            nprobe: Optional override of the configured nprobe
+
+        Returns:
+            Array of candidate row positions, or None to fall back to a full scan
+        """
+        if self.centroids is None:
+            return None
+
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        centroid_distances = squared_distances(self.centroids, self.centroid_sq_norms, query)
+        probes = np.argpartition(centroid_distances, nprobe - 1)[:nprobe]
+
+        parts = [self.list_rows[self.list_offsets[c]:self.list_offsets[c + 1]] for c in probes]
+        if size > self.built_size:
+            parts.append(np.arange(self.built_size, size))
+        return np.concatenate(parts)
+
+
+class QuantizedIndex:
+    """
+    Low-precision copy of the gallery for a fast coarse scan
+
+    Rows are stored as float16, or as int8 with one float32 scale per row
+    (x ~= codes * scale). A query scans the compact copy in cache-sized
+    chunks to pick a ``shortlist`` of rows, plus any rows appended since
+    the last build, and search_index re-ranks them exactly in float32, so
+    tolerance decisions never use quantized distances.
+
+    int8 cuts the scanned bytes about 4x. NumPy converts float16 in
+    software, so float16 mainly saves memory rather than scan time.
+
+    Args:
+        precision: 'float16' or 'int8'
+        shortlist: Rows kept from the coarse scan for exact re-ranking
+        chunk_size: Rows dequantized per block during the scan
+        rebuild_ratio: Rebuild once unindexed rows exceed this share of built rows
+    """
+
+    name = 'quantized'
+
+    def __init__(
+        self,
+        precision: str = 'int8',
+        shortlist: int = 32,
+        chunk_size: int = 1024,
+        rebuild_ratio: float = 0.1
+    ):
+        if precision not in ('float16', 'int8'):
+            raise ValueError(f"Unsupported precision: {precision}")
+        self.precision = precision
+        self.shortlist = shortlist
+        self.chunk_size = chunk_size
+        self.rebuild_ratio = rebuild_ratio
+
+        self.codes = None
+        self.scales = None
+        self.sq_norms = None
+        self.built_size = 0
+
+    def build(self, vectors: np.ndarray):
+        """
+        Quantize the given rows
+
+        Args:
+            vectors: Gallery matrix, rows indexed by gallery position
+        """
+        started = time.perf_counter()
+        vectors = np.asarray(vectors, dtype=np.float32)
+
+        if self.precision == 'float16':
+            self.codes = vectors.astype(np.float16)
+            self.scales = None
+        else:
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self.codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+            self.scales = scales.astype(np.float32)
+
+        self.sq_norms = np.einsum('ij,ij->i', vectors, vectors)
+        self.built_size = len(vectors)
+
+        logger.info(
+            f"Quantized index built: {self.built_size} rows as {self.precision} "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the quantized copy"""
+        if self.codes is None:
+            return 0
+        scales = self.scales.nbytes if self.scales is not None else 0
+        return self.codes.nbytes + scales + self.sq_norms.nbytes
+
+    def needs_rebuild(self, size: int) -> bool:
+        return size - self.built_size > max(1000, self.rebuild_ratio * self.built_size)
+
+    def coarse_sq_distances(self, query: np.ndarray) -> np.ndarray:
+        """Approximate squared distances (minus ||q||^2) to every built row"""
+        scores = np.empty(self.built_size, dtype=np.float32)
+        # One small float32 block is reused so the dequantized rows stay in cache
+        block = np.empty((self.chunk_size, self.codes.shape[1]), dtype=np.float32)
+        for start in range(0, self.built_size, self.chunk_size):
+            end = min(start + self.chunk_size, self.built_size)
+            rows = block[:end - start]
+            np.copyto(rows, self.codes[start:end], casting='unsafe')
+            dots = rows @ query
+            if self.scales is not None:
+                dots *= self.scales[start:end]
+            scores[start:end] = self.sq_norms[start:end] - 2.0 * dots
+        return scores
+
+    def candidates(self, query: np.ndarray, size: int, nprobe: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        Gallery rows worth scoring exactly for a query
+
+        Args:
+            query: Face encoding being searched
+            size: Current gallery size; rows past the built size are always included
+            nprobe: Unused; the shortlist length controls recall
+
+        Returns:
+            Array of candidate row positions, or None to fall back to a full scan
+        """
+        if self.codes is None or self.built_size == 0:
+            return None
+
+        scores = self.coarse_sq_distances(query)
+        shortlist = min(self.shortlist, self.built_size)
+        rows = np.argpartition(scores, shortlist - 1)[:shortlist]
+        if size > self.built_size:
+            rows = np.concatenate((rows, np.arange(self.built_size, size)))
+        return rows
+
+
+def search_index(
+    index,
+    vectors: np.ndarray,
+    sq_norms: np.ndarray,
+    query: np.ndarray,
+    k: int = 1,
+    nprobe: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Shortlist with an index, then re-rank exactly in float32
+
+    Args:
+        index: FlatIndex, IVFIndex or QuantizedIndex
+        vectors: Gallery matrix
+        sq_norms: Squared norms of gallery rows
+        query: Face encoding being searched
+        k: Number of nearest rows to return
+        nprobe: Optional recall knob forwarded to the index
+
+    Returns:
+        Tuple of (distances, rows) for the k nearest candidates, nearest first
+    """
+    query = np.asarray(query, dtype=np.float32)
+    rows = index.candidates(query, len(vectors), nprobe) if index is not None else None
+
+    if rows is None:
+        sq_distances = squared_distances(vectors, sq_norms, query)
+        rows = np.arange(len(vectors))
+    else:
+        sq_distances = squared_distances(vectors[rows], sq_norms[rows], query)
+
+    k = min(k, len(rows))
+    if k == 0:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+    top = np.argpartition(sq_distances, k - 1)[:k]
+    top = top[np.argsort(sq_distances[top])]
+    return np.sqrt(sq_distances[top]), rows[top]
+
+
+def create_ann_index(kind: str = 'flat', **options):
+    """
+    Build an index by name
+
+    Args:
+        kind: 'flat' for exact search, 'ivf' for the inverted-file index,
+            or 'float16' / 'int8' for a quantized scan with exact re-ranking
+        **options: Index constructor options
+
+    Returns:
+        Index instance
+    """
+    if kind == 'flat':
+        return FlatIndex()
+    elif kind == 'ivf':
+        return IVFIndex(**options)
+    elif kind in ('float16', 'int8'):
+        return QuantizedIndex(precision=kind, **options)
+    else:
+        raise ValueError(f"Unknown ANN index: {kind}")
@@ -0,0 +1,372 @@
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, field_validator
+from sqlalchemy.exc import IntegrityError
+
+from models.database_models import AttendanceRecord, AttendanceStatus, Camera, User, VerificationMethod
+
+logger = logging.getLogger(__name__)
+
+
+class AttendanceEvent(BaseModel):
+    """One check-in or check-out reported by a gate, camera or reader"""
+
+    type: Literal['check_in', 'check_out']
+    user_id: int
+    timestamp: datetime
+    verification_method: VerificationMethod = VerificationMethod.FACE
+    camera_id: Optional[int] = None
+    face_confidence: Optional[float] = None
+
+    @field_validator('timestamp')
+    @classmethod
+    def _naive_utc(cls, value: datetime) -> datetime:
+        # attendance_records stores naive UTC times
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+def _day_start(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class AttendanceService:
+    """
+    Apply check-ins, check-outs and batches of attendance events
+
+    A batch costs one IN query for users, one for cameras, one for the
+    users' attendance rows on the days involved, one bulk INSERT and one
+    bulk UPDATE, and a single commit, however many events it holds.
+
+    Events are applied per user in timestamp order with the same rules as
+    the single check-in/check-out endpoints: one open session per user per
+    day. Replays are idempotent on the natural key: a check-in whose
+    (user_id, check_in_time) already exists, or a check-out whose
+    (user_id, check_out_time) already exists, is reported as 'duplicate'
+    with the existing record id.
+
+    Per-event statuses: 'checked_in', 'checked_out', 'duplicate',
+    'already_checked_in', 'no_open_session' (also for a check-out before
+    the open session's check-in), 'unknown_user' and 'unknown_camera'.
+
+    With an OpenSessionIndex, single check-ins and check-outs for today
+    are answered from memory. Unless ``single_writer`` is set, anything
+    another process could have changed is confirmed cheaply: a remembered
+    open session by primary key, a check-out by a conditional UPDATE, and
+    a check-in that is not remembered is simply inserted, relying on the
+    uq_attendance_open_session unique index to reject a duplicate.
+
+    Args:
+        config: Optional settings; 'single_writer' trusts the index without
+            verification (only one process writes attendance)
+        open_sessions: Optional OpenSessionIndex to consult and maintain
+    """
+
+    def __init__(self, config: Dict = None, open_sessions=None):
+        self.config = config or {}
+        self.single_writer = bool(self.config.get('single_writer', False))
+        self.open_sessions = open_sessions
+
+    def _find_open(self, db, user_id: int, when: datetime) -> Optional[Tuple[int, datetime]]:
+        """The user's open (record id, check_in_time) on when's day, from the database"""
+        day_start = _day_start(when)
+        return db.query(AttendanceRecord.id, AttendanceRecord.check_in_time).filter(
+            AttendanceRecord.user_id == user_id,
+            AttendanceRecord.check_in_time >= day_start,
+            AttendanceRecord.check_in_time < day_start + timedelta(days=1),
+            AttendanceRecord.check_out_time == None
+        ).first()
+
+    def _still_open(self, db, record_id: int) -> bool:
+        row = db.query(AttendanceRecord.check_out_time).filter(AttendanceRecord.id == record_id).first()
+        return row is not None and row[0] is None
+
+    def _close(self, db, record_id: int, check_in_time: datetime, when: datetime) -> bool:
+        """Conditionally close a session; False if it was already closed"""
+        updated = db.query(AttendanceRecord).filter(
+            AttendanceRecord.id == record_id,
+            AttendanceRecord.check_out_time == None
+        ).update({
+            AttendanceRecord.check_out_time: when,
+            AttendanceRecord.duration_minutes: int((when - check_in_time).total_seconds() / 60),
+            AttendanceRecord.updated_at: datetime.utcnow()
+        }, synchronize_session=False)
+        db.commit()
+        return updated == 1
+
+    def check_in(
+        self,
+        db,
+        user_id: int,
+        verification_method: VerificationMethod,
+        camera_id: Optional[int] = None,
+        when: Optional[datetime] = None,
+        face_confidence: Optional[float] = None
+    ) -> Dict:
+        """
+        Open an attendance session unless the user already has one today
+
+        Args:
+            db: SQLAlchemy session
+            user_id: Existing user
+            verification_method: How the user was verified
+            camera_id: Camera that saw the user
+            when: Check-in time (defaults to now, UTC)
+            face_confidence: Match confidence for face check-ins
+
+        Returns:
+            Dictionary with 'status' ('checked_in' or 'already_checked_in'),
+            'attendance_id' and 'check_in_time'
+        """
+        when = when or datetime.utcnow()
+        indexed = self.open_sessions is not None and self.open_sessions.covers(when)
+
+        session = self.open_sessions.get(user_id, when) if indexed else self._find_open(db, user_id, when)
+        if session is not None:
+            if not indexed or self.single_writer or self._still_open(db, session[0]):
+                return {'status': 'already_checked_in', 'attendance_id': session[0], 'check_in_time': session[1]}
+            self.open_sessions.closed(user_id, session[0])
+
+        record = AttendanceRecord(
+            user_id=user_id,
+            camera_id=camera_id,
+            check_in_time=when,
+            attendance_date=when.date(),
+            verification_method=verification_method,
+            status=AttendanceStatus.PRESENT,
+            face_confidence=face_confidence,
+            created_at=datetime.utcnow()
+        )
+        try:
+            db.add(record)
+            db.flush()
+            record_id = record.id
+            db.commit()
+        except IntegrityError:
+            # Another process opened a session first
+            db.rollback()
+            session = self._find_open(db, user_id, when)
+            if session is None:
+                raise
+            if indexed:
+                self.open_sessions.opened(user_id, session[0], session[1])
+            return {'status': 'already_checked_in', 'attendance_id': session[0], 'check_in_time': session[1]}
+
+        if indexed:
+            self.open_sessions.opened(user_id, record_id, when)
+        return {'status': 'checked_in', 'attendance_id': record_id, 'check_in_time': when}
+
+    def check_out(self, db, user_id: int, when: Optional[datetime] = None) -> Dict:
+        """
+        Close the user's open session of the day
+
+        Args:
+            db: SQLAlchemy session
+            user_id: User checking out
+            when: Check-out time (defaults to now, UTC)
+
+        Returns:
+            Dictionary with 'status' ('checked_out' or 'no_open_session'),
+            'attendance_id', 'check_out_time' and 'duration_minutes'
+        """
+        when = when or datetime.utcnow()
+        indexed = self.open_sessions is not None and self.open_sessions.covers(when)
+        missing = {'status': 'no_open_session', 'attendance_id': None, 'check_out_time': None, 'duration_minutes': None}
+
+        session = self.open_sessions.get(user_id, when) if indexed else None
+        if session is not None:
+            closed = self._close(db, session[0], session[1], when)
+            self.open_sessions.closed(user_id, session[0])
+            if closed:
+                return {
+                    'status': 'checked_out',
+                    'attendance_id': session[0],
+                    'check_out_time': when,
+                    'duration_minutes': int((when - session[1]).total_seconds() / 60)
+                }
+        elif indexed and self.single_writer:
+            return missing
+
+        session = self._find_open(db, user_id, when)
+        if session is None or not self._close(db, session[0], session[1], when):
+            return missing
+        return {
+            'status': 'checked_out',
+            'attendance_id': session[0],
+            'check_out_time': when,
+            'duration_minutes': int((when - session[1]).total_seconds() / 60)
+        }
+
+    def _load_rows(self, db, user_ids: List[int], events: List[AttendanceEvent]) -> Dict[int, List[Dict]]:
+        """The users' rows that start on the batch's days, as mutable dicts"""
+        if not user_ids:
+            return {}
+
+        first_day = _day_start(min(event.timestamp for event in events))
+        last_day = _day_start(max(event.timestamp for event in events)) + timedelta(days=1)
+        records = db.query(
+            AttendanceRecord.id,
+            AttendanceRecord.user_id,
+            AttendanceRecord.check_in_time,
+            AttendanceRecord.check_out_time
+        ).filter(
+            AttendanceRecord.user_id.in_(user_ids),
+            AttendanceRecord.check_in_time >= first_day,
+            AttendanceRecord.check_in_time < last_day
+        ).all()
+
+        rows = defaultdict(list)
+        for record_id, user_id, check_in_time, check_out_time in records:
+            rows[user_id].append({
+                'id': record_id,
+                'check_in_time': check_in_time,
+                'check_out_time': check_out_time
+            })
+        return rows
+
+    def ingest_events(self, db, events: List[AttendanceEvent], attempts: int = 3) -> Dict:
+        """
+        Validate and apply a batch of events
+
+        A batch that collides with a session another process opened
+        concurrently is rolled back and re-evaluated.
+
+        Args:
+            db: SQLAlchemy session
+            events: Events in any order
+            attempts: Tries before a unique-index conflict is raised
+
+        Returns:
+            Dictionary with 'results' (one per event, in request order, with
+            'index', 'status' and 'attendance_id') and status 'counts'
+        """
+        for attempt in range(attempts):
+            try:
+                return self._apply_events(db, events)
+            except IntegrityError:
+                db.rollback()
+                if attempt == attempts - 1:
+                    raise
+                logger.warning("Attendance batch conflicted with a concurrent check-in, retrying")
+
+    def _apply_events(self, db, events: List[AttendanceEvent]) -> Dict:
+        results: List[Optional[Dict]] = [None] * len(events)
+
+        user_ids = sorted({event.user_id for event in events})
+        known_users = {
+            row[0] for row in db.query(User.id).filter(User.id.in_(user_ids)).all()
+        } if user_ids else set()
+
+        camera_ids = sorted({event.camera_id for event in events if event.camera_id is not None})
+        known_cameras = {
+            row[0] for row in db.query(Camera.id).filter(Camera.id.in_(camera_ids)).all()
+        } if camera_ids else set()
+
+        valid = []
+        for index, event in enumerate(events):
+            if event.user_id not in known_users:
+                results[index] = {'index': index, 'status': 'unknown_user', 'attendance_id': None}
+            elif event.camera_id is not None and event.camera_id not in known_cameras:
+                results[index] = {'index': index, 'status': 'unknown_camera', 'attendance_id': None}
+            else:
+                valid.append(index)
+
+        rows_by_user = self._load_rows(db, sorted({events[i].user_id for i in valid}), [events[i] for i in valid])
+        now = datetime.utcnow()
+        inserts: List[Dict] = []
+        updates: Dict[int, Dict] = {}
+        closed: List[Tuple[int, int]] = []
+        # Results that point at rows inserted by this batch get their ids after the insert
+        pending_ids = []
+
+        for index in sorted(valid, key=lambda i: (events[i].user_id, events[i].timestamp, events[i].type != 'check_in')):
+            event = events[index]
+            rows = rows_by_user[event.user_id]
+            day_start = _day_start(event.timestamp)
+
+            if event.type == 'check_in':
+                existing = next((row for row in rows if row['check_in_time'] == event.timestamp), None)
+                if existing is not None:
+                    status = 'duplicate'
+                    row = existing
+                else:
+                    # Checked in at the event's time, or still open (one open session per day);
+                    # judged at the timestamp so replaying a batch after its check-out gives the same answer
+                    row = next((
+                        row for row in rows
+                        if day_start <= row['check_in_time'] < day_start + timedelta(days=1) and (
+                            row['check_out_time'] is None
+                            or row['check_in_time'] <= event.timestamp < row['check_out_time']
+                        )
+                    ), None)
+                    if row is not None:
+                        status = 'already_checked_in'
+                    else:
+                        status = 'checked_in'
+                        row = {
+                            'user_id': event.user_id,
+                            'camera_id': event.camera_id,
+                            'check_in_time': event.timestamp,
+                            'attendance_date': event.timestamp.date(),
+                            'check_out_time': None,
+                            'verification_method': event.verification_method,
+                            'status': AttendanceStatus.PRESENT,
+                            'face_confidence': event.face_confidence,
+                            'created_at': now,
+                            'updated_at': now
+                        }
+                        rows.append(row)
+                        inserts.append(row)
+            else:
+                existing = next((row for row in rows if row['check_out_time'] == event.timestamp), None)
+                if existing is not None:
+                    status = 'duplicate'
+                    row = existing
+                else:
+                    row = next((
+                        row for row in rows
+                        if row['check_out_time'] is None and day_start <= row['check_in_time'] <= event.timestamp
+                    ), None)
+                    if row is None:
+                        status = 'no_open_session'
+                    else:
+                        status = 'checked_out'
+                        row['check_out_time'] = event.timestamp
+                        row['duration_minutes'] = int((event.timestamp - row['check_in_time']).total_seconds() / 60)
+                        if 'id' in row:
+                            updates[row['id']] = {
+                                'id': row['id'],
+                                'check_out_time': row['check_out_time'],
+                                'duration_minutes': row['duration_minutes'],
+                                'updated_at': now
+                            }
+                            closed.append((event.user_id, row['id']))
+
+            results[index] = {'index': index, 'status': status, 'attendance_id': row.get('id') if row else None}
+            if row is not None and 'id' not in row:
+                pending_ids.append((index, row))
+
+        if inserts:
+            db.bulk_insert_mappings(AttendanceRecord, inserts, return_defaults=True)
+        if updates:
+            db.bulk_update_mappings(AttendanceRecord, list(updates.values()))
+        if inserts or updates:
+            db.commit()
+
+        for index, row in pending_ids:
+            results[index]['attendance_id'] = row['id']
+
+        if self.open_sessions is not None:
+            for row in inserts:
+                if row['check_out_time'] is None:
+                    self.open_sessions.opened(row['user_id'], row['id'], row['check_in_time'])
+            for user_id, record_id in closed:
+                self.open_sessions.closed(user_id, record_id)
+
+        counts = Counter(result['status'] for result in results)
+        logger.info(f"Attendance batch applied: {len(events)} events, {dict(counts)}")
+        return {'results': results, 'counts': dict(counts)}
@@ -0,0 +1,479 @@
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+from itertools import islice
+from pathlib import Path
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+
+from .attendance_service import AttendanceEvent, AttendanceService
+
+logger = logging.getLogger(__name__)
+
+
+def _is_transient(error: Exception) -> bool:
+    """Whether a flush failed because the database was unreachable rather than because of the events"""
+    if isinstance(error, (OperationalError, InterfaceError, PoolTimeoutError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+def _checkpoint_path(journal: Path) -> Path:
+    return journal.with_name(journal.name + '.checkpoint')
+
+
+def _try_lock(handle) -> bool:
+    """Take an exclusive, non-blocking lock on an open file; True where locking is unavailable"""
+    try:
+        import fcntl
+    except ImportError:
+        # Native Windows: no flock, so every journal looks unowned (see _open_journal)
+        return True
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class AttendanceBufferFull(Exception):
+    """Raised when the write-behind buffer cannot take more events"""
+
+
+class AttendanceWriteBuffer:
+    """
+    Write-behind buffer for attendance events
+
+    Accepted events are acknowledged as soon as they are queued; a
+    background task drains the queue every ``flush_interval_ms`` (or as soon
+    as ``flush_max_events`` are waiting) through
+    AttendanceService.ingest_events, so a burst of check-ins costs one
+    transaction per flush instead of one commit per request.
+
+    Durability depends on the mode:
+
+    * 'memory': events live only in this process and are lost if it dies
+      before the next flush.
+    * 'journal': events are appended to a local JSON-lines journal (fsynced
+      when ``journal_fsync`` is set) before they are acknowledged. After
+      each flush the last written sequence number is checkpointed; on
+      start, journaled events past the checkpoint are replayed. A crash
+      between commit and checkpoint replays events that were already
+      written, which ingest_events reports as duplicates.
+
+      Each process writes its own journal, ``<journal_path>.<pid>``, and
+      holds an exclusive lock on it while running. On start, journals no
+      live process holds (left by a worker that died, including one
+      written at ``journal_path`` itself) are taken over: their pending
+      events are copied into this process's journal and queued, and the
+      orphaned files are removed.
+
+    When ``max_queue`` events are waiting, new events are rejected with
+    AttendanceBufferFull. A failed flush keeps its events queued and is
+    retried with backoff. While the database is unreachable that goes on
+    indefinitely; a batch that fails ``max_flush_attempts`` times for any
+    other reason is retried one event at a time, and events that still fail
+    are appended to ``dead_letter_path`` (JSON lines with the error) and
+    dropped from the queue.
+
+    Args:
+        session_factory: Callable returning a SQLAlchemy session
+        attendance_service: Service the buffered events are applied with
+        mode: 'memory' or 'journal'
+        journal_path: Journal file for 'journal' mode
+        journal_fsync: fsync the journal before acknowledging
+        max_queue: Maximum queued events
+        flush_interval_ms: Longest an event waits before a flush
+        flush_max_events: Events per flush; reaching it triggers an early flush
+        max_flush_attempts: Failures of the same batch before its events are isolated
+        dead_letter_path: File events that cannot be written are appended to (None: log only)
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        attendance_service: AttendanceService,
+        mode: str = 'memory',
+        journal_path: Optional[str] = None,
+        journal_fsync: bool = True,
+        max_queue: int = 10000,
+        flush_interval_ms: float = 200.0,
+        flush_max_events: int = 500,
+        max_flush_attempts: int = 5,
+        dead_letter_path: Optional[str] = None
+    ):
+        if mode not in ('memory', 'journal'):
+            raise ValueError(f"Unknown attendance write-behind mode: {mode}")
+        if mode == 'journal' and not journal_path:
+            raise ValueError("Journal mode needs a journal path")
+
+        self.session_factory = session_factory
+        self.attendance_service = attendance_service
+        self.mode = mode
+        self.journal_path = Path(journal_path) if journal_path else None
+        self.own_journal_path = self.journal_path.with_name(f"{self.journal_path.name}.{os.getpid()}") if journal_path else None
+        self.checkpoint_path = _checkpoint_path(self.own_journal_path) if journal_path else None
+        self.journal_fsync = journal_fsync
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.flush_max_events = flush_max_events
+        self.max_flush_attempts = max_flush_attempts
+        self.dead_letter_path = Path(dead_letter_path) if dead_letter_path else None
+
+        self._lock = threading.Lock()
+        # Held for a whole flush, so a flush still running in a thread after
+        # its task was cancelled cannot overlap the final drain in stop()
+        self._flush_lock = threading.Lock()
+        # (sequence number, queued at, event)
+        self._queue = deque()
+        self._sequence = 0
+        self._journal = None
+        self._loop = None
+        self._wake = None
+        self._task = None
+
+        self._accepted = 0
+        self._rejected = 0
+        self._flushed = 0
+        self._flushes = 0
+        self._flush_failures = 0
+        self._high_water = 0
+        self._replayed = 0
+        self._dead_lettered = 0
+        # Sequence number of the batch front that keeps failing, and how often it has
+        self._front_sequence = None
+        self._front_failures = 0
+        self._results = Counter()
+        self._flush_times = deque(maxlen=1000)
+        self._last_flush_at = None
+        self._last_error = None
+
+    def _orphaned_journals(self) -> List[Path]:
+        """Journals of this path other than this process's own"""
+        prefix = self.journal_path.name + '.'
+        candidates = [self.journal_path] if self.journal_path.exists() else []
+        candidates += sorted(
+            path for path in self.journal_path.parent.glob(prefix + '*')
+            if path.name[len(prefix):].isdigit() and path != self.own_journal_path
+        )
+        return candidates
+
+    def _take_over(self, path: Path) -> List[AttendanceEvent]:
+        """Pending events of a journal no live process holds; removes the journal"""
+        try:
+            handle = open(path, 'r')
+        except FileNotFoundError:
+            return []
+        try:
+            if not _try_lock(handle):
+                return []
+            # Another process may have taken it over and removed it between open and lock
+            if not path.exists() or os.stat(path).st_ino != os.fstat(handle.fileno()).st_ino:
+                return []
+
+            checkpoint_path = _checkpoint_path(path)
+            checkpoint = int(checkpoint_path.read_text().strip() or 0) if checkpoint_path.exists() else 0
+            events = []
+            for line in handle:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn last line from a crash mid-append; it was never acknowledged
+                    continue
+                if entry['seq'] > checkpoint:
+                    events.append(AttendanceEvent(**entry['event']))
+
+            path.unlink()
+            checkpoint_path.unlink(missing_ok=True)
+            if events:
+                logger.warning(f"Taking over {len(events)} attendance events from {path}")
+            return events
+        finally:
+            handle.close()
+
+    def _open_journal(self):
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        if importlib.util.find_spec('fcntl') is None:
+            logger.warning(
+                "Journal files cannot be locked on this platform; run a single API process "
+                "or other workers' journals will be replayed as orphans"
+            )
+
+        # A journal at our own path was left by an earlier process with the same pid
+        pending = self._take_over(self.own_journal_path)
+        _checkpoint_path(self.own_journal_path).unlink(missing_ok=True)
+
+        # Locked before looking at the others, so none of them mistakes it for an orphan
+        while True:
+            self._journal = open(self.own_journal_path, 'a')
+            if not _try_lock(self._journal):
+                self._journal.close()
+                self._journal = None
+                raise RuntimeError(f"Attendance journal {self.own_journal_path} is locked by another process")
+            # Created and taken over by another starting process before we locked it
+            if self.own_journal_path.exists() and \
+                    os.stat(self.own_journal_path).st_ino == os.fstat(self._journal.fileno()).st_ino:
+                break
+            self._journal.close()
+
+        for path in self._orphaned_journals():
+            pending.extend(self._take_over(path))
+
+        if pending:
+            # Re-journal before queueing so they survive another crash
+            self._write_journal(self._enqueue(pending))
+            self._replayed = len(pending)
+            logger.warning(f"Replaying {self._replayed} journaled attendance events")
+
+    def _enqueue(self, events: List[AttendanceEvent]) -> List:
+        """Number and queue events; the caller holds the lock or is still starting"""
+        now = time.monotonic()
+        entries = []
+        for event in events:
+            self._sequence += 1
+            entries.append((self._sequence, now, event))
+        self._queue.extend(entries)
+        return entries
+
+    def _write_journal(self, entries: List):
+        self._journal.write(''.join(
+            json.dumps({'seq': seq, 'event': event.model_dump(mode='json')}) + '\n'
+            for seq, _, event in entries
+        ))
+        self._journal.flush()
+        if self.journal_fsync:
+            os.fsync(self._journal.fileno())
+
+    def _write_checkpoint(self, sequence: int):
+        temporary = self.checkpoint_path.with_name(self.checkpoint_path.name + '.tmp')
+        with open(temporary, 'w') as checkpoint:
+            checkpoint.write(str(sequence))
+            checkpoint.flush()
+            if self.journal_fsync:
+                os.fsync(checkpoint.fileno())
+        os.replace(temporary, self.checkpoint_path)
+
+    async def start(self):
+        """Replay the journal and start the background flusher"""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        if self.mode == 'journal':
+            await asyncio.to_thread(self._open_journal)
+        self._task = asyncio.create_task(self._flush_loop())
+        logger.info(f"Attendance write-behind started (mode: {self.mode}, queue: {self.max_queue})")
+
+    async def stop(self):
+        """Stop the flusher after draining what is queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # A flush the cancelled task started may still be running; _flush_lock waits for it
+        while self._queue:
+            try:
+                if not await asyncio.to_thread(self._flush_once):
+                    break
+            except Exception as e:
+                logger.error(f"Final attendance flush failed, {len(self._queue)} events left: {e}")
+                break
+        if self._journal is not None:
+            if not self._queue:
+                # Everything was written; nothing for another process to take over
+                self.own_journal_path.unlink(missing_ok=True)
+                self.checkpoint_path.unlink(missing_ok=True)
+            self._journal.close()
+            self._journal = None
+        logger.info("Attendance write-behind stopped")
+
+    def submit(self, events: List[AttendanceEvent]) -> int:
+        """
+        Queue events for the next flush
+
+        Thread-safe; returns once the events are queued (and journaled in
+        'journal' mode).
+
+        Args:
+            events: Events to write
+
+        Returns:
+            Number of events now queued
+
+        Raises:
+            AttendanceBufferFull: If the events do not fit in the queue
+        """
+        with self._lock:
+            if len(self._queue) + len(events) > self.max_queue:
+                self._rejected += len(events)
+                raise AttendanceBufferFull(f"Attendance write buffer full ({self.max_queue} queued)")
+
+            entries = self._enqueue(events)
+            if self._journal is not None:
+                try:
+                    self._write_journal(entries)
+                except Exception:
+                    # Not acknowledged, so not queued either
+                    for _ in entries:
+                        self._queue.pop()
+                    raise
+            self._accepted += len(events)
+            depth = len(self._queue)
+            self._high_water = max(self._high_water, depth)
+
+        if depth >= self.flush_max_events and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return depth
+
+    def _flush_once(self) -> int:
+        """Write up to flush_max_events queued events; returns how many"""
+        with self._flush_lock:
+            return self._flush_batch()
+
+    def _flush_batch(self) -> int:
+        with self._lock:
+            batch = list(islice(self._queue, self.flush_max_events))
+        if not batch:
+            return 0
+
+        # A batch that keeps failing for a reason other than the database being
+        # unreachable is written event by event, and the events that still fail
+        # are dead-lettered so the rest of the queue can move on
+        isolate = self._front_sequence == batch[0][0] and self._front_failures >= self.max_flush_attempts
+        started = time.perf_counter()
+        try:
+            if isolate:
+                counts, dead = self._ingest_one_by_one(batch)
+            else:
+                with self.session_factory() as db:
+                    counts = self.attendance_service.ingest_events(db, [event for _, _, event in batch])['counts']
+                dead = []
+        except Exception as e:
+            if not _is_transient(e):
+                if self._front_sequence != batch[0][0]:
+                    self._front_sequence, self._front_failures = batch[0][0], 0
+                self._front_failures += 1
+            raise
+        elapsed = time.perf_counter() - started
+        self._front_sequence, self._front_failures = None, 0
+
+        if dead:
+            self._dead_letter(dead)
+
+        with self._lock:
+            # Flushes are serialized and only they remove entries, so the batch is still at the front
+            for _ in batch:
+                self._queue.popleft()
+            self._flushed += len(batch) - len(dead)
+            self._dead_lettered += len(dead)
+            self._flushes += 1
+            self._results.update(counts)
+            self._flush_times.append(elapsed)
+            self._last_flush_at = time.monotonic()
+
+        if self._journal is not None:
+            # Outside _lock so submit() does not wait for the fsync; _flush_lock orders checkpoints
+            self._write_checkpoint(batch[-1][0])
+            with self._lock:
+                # Nothing was journaled since this batch, so everything in the journal is in
+                # the database. Truncating must exclude appends, but is not fsynced.
+                if not self._queue and self._sequence == batch[-1][0]:
+                    self._journal.truncate(0)
+
+        return len(batch)
+
+    def _ingest_one_by_one(self, batch: List):
+        """Write a batch an event at a time; returns (status counts, entries that failed with their errors)"""
+        counts = Counter()
+        dead = []
+        for entry in batch:
+            try:
+                with self.session_factory() as db:
+                    counts.update(self.attendance_service.ingest_events(db, [entry[2]])['counts'])
+            except Exception as e:
+                if _is_transient(e):
+                    raise
+                dead.append((entry, e))
+        return counts, dead
+
+    def _dead_letter(self, dead: List):
+        """Append events that cannot be written to the dead-letter file"""
+        failed_at = datetime.utcnow().isoformat()
+        lines = ''.join(
+            json.dumps({
+                'event': event.model_dump(mode='json'),
+                'error': f"{type(error).__name__}: {error}",
+                'failed_at': failed_at
+            }) + '\n'
+            for (_, _, event), error in dead
+        )
+        for (_, _, event), error in dead:
+            logger.error(f"Dead-lettering attendance event {event.type} for user {event.user_id} at {event.timestamp}: {error}")
+
+        if self.dead_letter_path is None:
+            return
+        self.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+        # One append per batch, so lines from several workers do not interleave
+        with open(self.dead_letter_path, 'a') as dead_letters:
+            dead_letters.write(lines)
+            dead_letters.flush()
+            if self.journal_fsync:
+                os.fsync(dead_letters.fileno())
+
+    async def _flush_loop(self):
+        backoff = self.flush_interval
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=backoff)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            try:
+                while await asyncio.to_thread(self._flush_once) >= self.flush_max_events:
+                    pass
+                backoff = self.flush_interval
+                self._last_error = None
+            except Exception as e:
+                self._flush_failures += 1
+                self._last_error = str(e)
+                backoff = min(max(backoff * 2, self.flush_interval), 5.0)
+                logger.error(f"Attendance flush failed ({len(self._queue)} queued, retry in {backoff:.1f}s): {e}")
+
+    def stats(self) -> Dict:
+        """Queue depth, throughput counters and flush latency"""
+        with self._lock:
+            latency = np.array(self._flush_times) * 1000.0
+            oldest = self._queue[0][1] if self._queue else None
+            return {
+                'mode': self.mode,
+                'queue_depth': len(self._queue),
+                'queue_capacity': self.max_queue,
+                'queue_high_water': self._high_water,
+                'oldest_event_age_seconds': round(time.monotonic() - oldest, 3) if oldest is not None else None,
+                'accepted': self._accepted,
+                'rejected': self._rejected,
+                'replayed': self._replayed,
+                'flushed': self._flushed,
+                'dead_lettered': self._dead_lettered,
+                'flushes': self._flushes,
+                'flush_failures': self._flush_failures,
+                'last_flush_age_seconds': round(time.monotonic() - self._last_flush_at, 3)
+                if self._last_flush_at is not None else None,
+                'last_error': self._last_error,
+                'flush_ms': {
+                    'p50': round(float(np.percentile(latency, 50)), 2),
+                    'p95': round(float(np.percentile(latency, 95)), 2),
+                    'max': round(float(latency.max()), 2)
+                } if len(latency) else None,
+                'results': dict(self._results)
+            }
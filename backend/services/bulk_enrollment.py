@@ -0,0 +1,278 @@
+import asyncio
+import csv
+import io
+import logging
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Union
+
+import numpy as np
+
+from .face_gallery import pack_encoding, ENCODING_FORMAT_VERSION
+from .face_worker_pool import FaceWorkerPoolBusy
+
+logger = logging.getLogger(__name__)
+
+# Manifest columns that can identify the user an image belongs to
+USER_REFERENCE_COLUMNS = ('user_id', 'username', 'student_id', 'employee_id')
+
+
+class ImageSource:
+    """
+    Read enrollment images from a directory or a zip archive
+
+    Args:
+        source: Directory path, zip path, or an open binary file of a zip
+    """
+
+    def __init__(self, source: Union[str, Path, io.IOBase]):
+        self.directory = None
+        self.archive = None
+
+        if isinstance(source, (str, Path)) and Path(source).is_dir():
+            self.directory = Path(source)
+        else:
+            self.archive = zipfile.ZipFile(source)
+
+    def read(self, name: str) -> Optional[bytes]:
+        """Raw bytes of an image, or None if it is missing"""
+        try:
+            if self.directory is not None:
+                return (self.directory / name).read_bytes()
+            return self.archive.read(name)
+        except (KeyError, FileNotFoundError, IsADirectoryError):
+            return None
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+
+
+def parse_manifest(content: Union[str, bytes]) -> List[Dict]:
+    """
+    Parse a CSV manifest mapping image files to users
+
+    The manifest needs a 'file' column and one of user_id, username,
+    student_id or employee_id.
+
+    Args:
+        content: CSV text
+
+    Returns:
+        List of {'file', 'column', 'value'} entries
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+
+    reader = csv.DictReader(io.StringIO(content))
+    fields = reader.fieldnames or []
+    if 'file' not in fields:
+        raise ValueError("Manifest must have a 'file' column")
+
+    column = next((c for c in USER_REFERENCE_COLUMNS if c in fields), None)
+    if column is None:
+        raise ValueError(f"Manifest must have one of: {', '.join(USER_REFERENCE_COLUMNS)}")
+
+    return [
+        {'file': row['file'].strip(), 'column': column, 'value': row[column].strip()}
+        for row in reader
+        if row.get('file')
+    ]
+
+
+class BulkEnrollmentJob:
+    """
+    Enroll faces for many users from a manifest in one pass
+
+    Images are encoded in parallel through a FaceWorkerPool, encodings are
+    written with batched bulk inserts, and the in-memory gallery is extended
+    once per committed insert batch instead of once per image.
+
+    When the pool is shared with live requests, the job only takes a
+    quarter of its queue per round and backs off while the queue is full,
+    so verify requests keep being served while it runs.
+
+    Args:
+        db: SQLAlchemy session
+        face_pool: FaceWorkerPool used to detect and encode images
+        gallery: Optional FaceGallery to extend with the new encodings
+        batch_size: Images sent to the pool per round (default: a quarter of its queue)
+        insert_batch_size: Encodings per bulk insert
+        busy_timeout: Seconds to keep retrying a round the pool has no room for
+    """
+
+    def __init__(
+        self,
+        db,
+        face_pool,
+        gallery=None,
+        batch_size: Optional[int] = None,
+        insert_batch_size: int = 500,
+        busy_timeout: float = 60.0
+    ):
+        self.db = db
+        self.face_pool = face_pool
+        self.gallery = gallery
+        if batch_size is None:
+            batch_size = face_pool.max_queue // 4
+        self.batch_size = max(1, min(batch_size, face_pool.max_queue))
+        self.insert_batch_size = insert_batch_size
+        self.busy_timeout = busy_timeout
+
+        self.report: List[Dict] = []
+        self._pending_rows: List[Dict] = []
+        self._pending_vectors: List[np.ndarray] = []
+        self._busy_retries = 0
+
+    def _resolve_users(self, entries: List[Dict]) -> Dict[str, int]:
+        """Map manifest values to user ids with one IN query"""
+        from models.database_models import User
+
+        if not entries:
+            return {}
+
+        column = entries[0]['column']
+        values = {entry['value'] for entry in entries}
+        if column == 'user_id':
+            values = {int(v) for v in values if v.isdigit()}
+
+        attribute = getattr(User, 'id' if column == 'user_id' else column)
+        rows = self.db.query(User.id, attribute).filter(attribute.in_(values)).all()
+        return {str(value): user_id for user_id, value in rows}
+
+    def _users_with_encodings(self, user_ids) -> set:
+        """Users among user_ids that already have a face encoding"""
+        from models.database_models import FaceEncoding
+
+        if not user_ids:
+            return set()
+        rows = self.db.query(FaceEncoding.user_id).filter(FaceEncoding.user_id.in_(user_ids)).distinct().all()
+        return {user_id for user_id, in rows}
+
+    def _flush_inserts(self):
+        from models.database_models import FaceEncoding
+
+        if not self._pending_rows:
+            return
+
+        rows, self._pending_rows = self._pending_rows, []
+        vectors, self._pending_vectors = self._pending_vectors, []
+        self.db.bulk_insert_mappings(FaceEncoding, rows, return_defaults=True)
+        self.db.commit()
+
+        # Only committed encodings are matched against
+        if self.gallery is not None and self.gallery.loaded:
+            self.gallery.add_many(
+                [row['id'] for row in rows],
+                [row['user_id'] for row in rows],
+                np.array(vectors)
+            )
+
+    async def _encode(self, images: List[bytes]) -> List[List[Dict]]:
+        """Detect and encode a round of images, waiting while the pool is full"""
+        deadline = time.monotonic() + self.busy_timeout
+        delay = 0.05
+        while True:
+            try:
+                return await self.face_pool.detect_and_encode_batch(images)
+            except FaceWorkerPoolBusy:
+                if time.monotonic() + delay > deadline:
+                    raise
+                self._busy_retries += 1
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 1.0)
+
+    async def run(self, entries: List[Dict], source: ImageSource) -> AsyncIterator[Dict]:
+        """
+        Process every manifest entry, yielding progress after each batch
+
+        Args:
+            entries: Parsed manifest entries
+            source: Where the image files are read from
+
+        Yields:
+            Progress dictionaries; the last one has type 'summary'
+        """
+        started = time.perf_counter()
+        # Database work runs in a thread so the job does not block the event loop
+        user_ids = await asyncio.to_thread(self._resolve_users, entries)
+        counts = {'enrolled': 0, 'no_face': 0, 'multiple_faces': 0, 'unknown_user': 0, 'missing_file': 0}
+
+        runnable = []
+        for entry in entries:
+            user_id = user_ids.get(entry['value'])
+            if user_id is None:
+                counts['unknown_user'] += 1
+                self.report.append({'file': entry['file'], 'status': 'unknown_user'})
+            else:
+                runnable.append((entry['file'], user_id))
+
+        # A user's first encoding is primary; enrolling more does not replace it
+        has_primary = await asyncio.to_thread(self._users_with_encodings, {user_id for _, user_id in runnable})
+
+        processed = len(entries) - len(runnable)
+        for start in range(0, len(runnable), self.batch_size):
+            batch = []
+            for name, user_id in runnable[start:start + self.batch_size]:
+                image_bytes = source.read(name)
+                if image_bytes is None:
+                    counts['missing_file'] += 1
+                    self.report.append({'file': name, 'status': 'missing_file'})
+                else:
+                    batch.append((name, user_id, image_bytes))
+
+            faces_per_image = []
+            if batch:
+                faces_per_image = await self._encode([image_bytes for _, _, image_bytes in batch])
+
+            now = datetime.utcnow()
+            for (name, user_id, _), faces in zip(batch, faces_per_image):
+                if not faces:
+                    status = 'no_face'
+                elif len(faces) > 1:
+                    status = 'multiple_faces'
+                else:
+                    status = 'enrolled'
+                    encoding = np.asarray(faces[0]['encoding'], dtype=np.float32)
+                    self._pending_rows.append({
+                        'user_id': user_id,
+                        'encoding_blob': pack_encoding(encoding),
+                        'encoding_dim': len(encoding),
+                        'encoding_version': ENCODING_FORMAT_VERSION,
+                        'image_path': name,
+                        'is_primary': user_id not in has_primary,
+                        'created_at': now,
+                        'updated_at': now
+                    })
+                    self._pending_vectors.append(encoding)
+                    has_primary.add(user_id)
+
+                counts[status] += 1
+                entry = {'file': name, 'status': status, 'user_id': user_id}
+                if status == 'multiple_faces':
+                    entry['face_count'] = len(faces)
+                self.report.append(entry)
+
+            if len(self._pending_rows) >= self.insert_batch_size:
+                await asyncio.to_thread(self._flush_inserts)
+
+            processed += min(self.batch_size, len(runnable) - start)
+            yield {'type': 'progress', 'processed': processed, 'total': len(entries), **counts}
+
+        await asyncio.to_thread(self._flush_inserts)
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Bulk enrollment finished: {counts['enrolled']}/{len(entries)} enrolled in {elapsed:.1f}s "
+            f"({self._busy_retries} rounds retried on a busy pool)"
+        )
+
+        yield {
+            'type': 'summary',
+            'total': len(entries),
+            'elapsed_seconds': round(elapsed, 2),
+            **counts,
+            'files': [entry for entry in self.report if entry['status'] != 'enrolled']
+        }
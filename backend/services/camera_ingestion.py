@@ -0,0 +1,543 @@
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .face_tracker import FaceTracker
+from .face_worker_pool import FaceWorkerPoolBusy
+from .lazy_import import LazyImport
+from .motion_gate import MotionGate
+from .roi import parse_roi
+
+cv2 = LazyImport('cv2')
+
+logger = logging.getLogger(__name__)
+
+# handler(camera_id, captured_at, faces) -> optional list of matches, sync or async
+FaceHandler = Callable[[int, datetime, List[Dict]], Union[Optional[List], Awaitable[Optional[List]]]]
+# event_handler(camera_id, captured_at, event) for identities confirmed by a FaceTracker
+EventHandler = Callable[[int, datetime, Dict], Union[None, Awaitable[None]]]
+
+
+class RateMeter:
+    """Events per second over a sliding window"""
+
+    def __init__(self, window_seconds: float = 5.0):
+        self.window = window_seconds
+        self._events = deque()
+
+    def tick(self, now: Optional[float] = None):
+        now = now if now is not None else time.monotonic()
+        self._events.append(now)
+        while self._events and now - self._events[0] > self.window:
+            self._events.popleft()
+
+    def rate(self) -> float:
+        now = time.monotonic()
+        while self._events and now - self._events[0] > self.window:
+            self._events.popleft()
+        if len(self._events) < 2:
+            return 0.0
+        return (len(self._events) - 1) / max(now - self._events[0], 1e-6)
+
+
+class LatestFrame:
+    """
+    Single-slot buffer that only ever holds the newest frame
+
+    The capture thread overwrites the slot on every read; the analyzer takes
+    whatever is newest when it is ready. Frames overwritten before anyone
+    took them are counted as dropped instead of being queued.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frame = None
+        self._captured_at = None
+        self._sequence = 0
+        self._taken = 0
+        self.dropped = 0
+
+    def put(self, frame: np.ndarray, captured_at: datetime):
+        with self._lock:
+            if self._sequence != self._taken:
+                self.dropped += 1
+            self._frame = frame
+            self._captured_at = captured_at
+            self._sequence += 1
+
+    @property
+    def pending(self) -> bool:
+        """Whether a frame is waiting to be taken"""
+        return self._sequence != self._taken
+
+    def take(self) -> Optional[Tuple[np.ndarray, datetime]]:
+        """Newest frame not handed out yet, or None"""
+        with self._lock:
+            if self._sequence == self._taken:
+                return None
+            self._taken = self._sequence
+            return self._frame, self._captured_at
+
+
+class CameraCapture(threading.Thread):
+    """
+    Capture thread for one camera
+
+    Reads frames as fast as the source delivers them into a LatestFrame
+    slot, reconnecting with a delay when the stream fails. USB cameras are
+    given as a device index in camera_url. Local video files stand in for
+    RTSP feeds: they are paced at their own frame rate and can loop.
+
+    Args:
+        camera: Dictionary with 'id', 'url', 'type' and 'fps'
+        reconnect_seconds: Delay before reopening a failed stream
+        loop_files: Restart video files at the end instead of stopping
+    """
+
+    def __init__(self, camera: Dict, reconnect_seconds: float = 5.0, loop_files: bool = False):
+        super().__init__(name=f"camera-capture-{camera['id']}", daemon=True)
+        self.camera = camera
+        self.reconnect_seconds = reconnect_seconds
+        self.loop_files = loop_files
+
+        self.slot = LatestFrame()
+        self.meter = RateMeter()
+        self.status = 'starting'
+        self.frames_captured = 0
+        self.reconnects = 0
+        self.last_error = None
+        self.last_frame_at = None
+        self.is_file = False
+
+        self._capture = None
+        self._stop_event = threading.Event()
+
+    def _open(self):
+        url = str(self.camera['url'])
+        source = int(url) if self.camera.get('type') == 'usb' and url.isdigit() else url
+        self.is_file = isinstance(source, str) and Path(source).is_file()
+
+        capture = cv2.VideoCapture(source)
+        if not capture.isOpened():
+            capture.release()
+            raise IOError(f"Cannot open camera source {url}")
+        if not self.is_file:
+            # Keep the driver-side queue short so reads return recent frames
+            capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self._capture = capture
+        self.status = 'active'
+        self.last_error = None
+
+    def _release(self):
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+
+    def run(self):
+        frame_interval = None
+        next_frame_time = 0.0
+
+        while not self._stop_event.is_set():
+            if self._capture is None:
+                try:
+                    self._open()
+                    source_fps = self._capture.get(cv2.CAP_PROP_FPS) or self.camera.get('fps') or 30
+                    frame_interval = 1.0 / source_fps if self.is_file else None
+                    next_frame_time = time.monotonic()
+                except Exception as e:
+                    self.status = 'error'
+                    self.last_error = str(e)
+                    logger.warning(f"Camera {self.camera['id']}: {e}; retrying in {self.reconnect_seconds}s")
+                    self._stop_event.wait(self.reconnect_seconds)
+                    continue
+
+            ok, frame = self._capture.read()
+            if not ok:
+                if self.is_file and self.loop_files:
+                    self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                if self.is_file:
+                    self.status = 'finished'
+                    break
+                self.status = 'error'
+                self.last_error = 'Stream read failed'
+                self.reconnects += 1
+                self._release()
+                self._stop_event.wait(self.reconnect_seconds)
+                continue
+
+            now = time.monotonic()
+            self.slot.put(frame, datetime.utcnow())
+            self.meter.tick(now)
+            self.frames_captured += 1
+            self.last_frame_at = now
+
+            if frame_interval:
+                # Replay files in real time, like a live feed
+                next_frame_time += frame_interval
+                self._stop_event.wait(max(0.0, next_frame_time - time.monotonic()))
+
+        self._release()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class CameraIngestionManager:
+    """
+    Continuous frame ingestion for every active camera
+
+    One CameraCapture thread per camera keeps the newest frame. One asyncio
+    task per camera samples that frame at the analysis rate, JPEG-encodes it
+    and sends it to the shared FaceWorkerPool. When the pool is saturated the
+    sample is skipped rather than queued, so analysis never falls behind
+    the live feed. Detected faces are passed to ``handler``.
+
+    Cameras with camera_metadata['roi'] only have faces detected inside
+    those regions (see services.roi); boxes stay in frame coordinates, and
+    the motion gate only watches the regions' bounds.
+
+    A MotionGate in front of encoding skips frames where nothing changed.
+    It is configured per camera through camera_metadata['motion'] on top of
+    ``motion_defaults``; with no defaults only cameras that configure it
+    are gated.
+
+    With ``tracking_defaults`` (or camera_metadata['tracking']) a per-camera
+    FaceTracker follows faces across frames: detection runs on every sample
+    but only new, unconfirmed, degraded-then-improved or periodically
+    refreshed tracks are encoded and passed to ``handler``. The handler's
+    matches are voted per track and confirmed identities are passed to
+    ``event_handler``.
+
+    Camera.status and Camera.last_heartbeat are updated periodically when a
+    session factory is given.
+
+    Args:
+        face_pool: FaceWorkerPool used for detection and encoding
+        handler: Called with (camera_id, captured_at, faces) for every analyzed
+            frame; returns one (user_id, confidence) or None per face
+        event_handler: Called with (camera_id, captured_at, event) for tracked identities
+        session_factory: Callable returning a SQLAlchemy session, for heartbeats
+        analysis_fps: Default analysis rate (camera_metadata['analysis_fps'] overrides)
+        heartbeat_seconds: Interval between Camera status updates
+        reconnect_seconds: Delay before reopening a failed stream
+        jpeg_quality: Quality of the frames sent to the worker pool
+        loop_files: Loop local video files instead of stopping at the end
+        motion_defaults: MotionGate settings for every camera, or None
+        tracking_defaults: FaceTracker settings for every camera, or None
+    """
+
+    def __init__(
+        self,
+        face_pool,
+        handler: Optional[FaceHandler] = None,
+        session_factory: Optional[Callable] = None,
+        analysis_fps: float = 2.0,
+        heartbeat_seconds: float = 10.0,
+        reconnect_seconds: float = 5.0,
+        jpeg_quality: int = 90,
+        loop_files: bool = False,
+        motion_defaults: Optional[Dict] = None,
+        event_handler: Optional[EventHandler] = None,
+        tracking_defaults: Optional[Dict] = None
+    ):
+        self.face_pool = face_pool
+        self.handler = handler
+        self.event_handler = event_handler
+        self.session_factory = session_factory
+        self.analysis_fps = analysis_fps
+        self.heartbeat_seconds = heartbeat_seconds
+        self.reconnect_seconds = reconnect_seconds
+        self.jpeg_quality = jpeg_quality
+        self.loop_files = loop_files
+        self.motion_defaults = motion_defaults
+        self.tracking_defaults = tracking_defaults
+
+        self.cameras: Dict[int, Dict] = {}
+        self._captures: Dict[int, CameraCapture] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._heartbeat_task = None
+        self._stats: Dict[int, Dict] = {}
+        self._meters: Dict[int, RateMeter] = {}
+        self._gates: Dict[int, Optional[MotionGate]] = {}
+        self._trackers: Dict[int, Optional[FaceTracker]] = {}
+
+    @staticmethod
+    def load_cameras(db) -> List[Dict]:
+        """Active cameras from the database as plain dictionaries"""
+        from models.database_models import Camera
+
+        cameras = db.query(Camera).filter(Camera.is_active == True).all()
+        return [
+            {
+                'id': camera.id,
+                'name': camera.name,
+                'url': camera.camera_url,
+                'type': camera.camera_type,
+                'fps': camera.fps,
+                'metadata': camera.camera_metadata or {}
+            }
+            for camera in cameras
+        ]
+
+    async def start(self, cameras: Optional[List[Dict]] = None):
+        """
+        Start capture and analysis for the given cameras
+
+        Args:
+            cameras: Camera dictionaries (see load_cameras); loaded from the
+                database when omitted
+        """
+        if cameras is None:
+            with self.session_factory() as db:
+                cameras = self.load_cameras(db)
+
+        for camera in cameras:
+            self.add_camera(camera)
+
+        if self.session_factory is not None and self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+        logger.info(f"Camera ingestion started for {len(cameras)} cameras")
+
+    def add_camera(self, camera: Dict):
+        camera_id = camera['id']
+        if camera_id in self._captures:
+            return
+
+        capture = CameraCapture(camera, self.reconnect_seconds, self.loop_files)
+        capture.start()
+
+        self.cameras[camera_id] = camera
+        self._captures[camera_id] = capture
+        self._meters[camera_id] = RateMeter()
+        metadata = camera.get('metadata') or {}
+        self._gates[camera_id] = None
+        if self.motion_defaults is not None or metadata.get('motion'):
+            self._gates[camera_id] = MotionGate.from_metadata(metadata, self.motion_defaults)
+        self._trackers[camera_id] = None
+        if self.tracking_defaults is not None or metadata.get('tracking'):
+            self._trackers[camera_id] = FaceTracker.from_metadata(metadata, self.tracking_defaults)
+        self._stats[camera_id] = {
+            'frames_analyzed': 0,
+            'motion_skips': 0,
+            'busy_skips': 0,
+            'faces_detected': 0,
+            'faces_recognized': 0,
+            'events': 0,
+            'analysis_errors': 0
+        }
+        self._tasks[camera_id] = asyncio.create_task(self._analysis_loop(camera_id))
+
+    async def remove_camera(self, camera_id: int):
+        task = self._tasks.pop(camera_id, None)
+        if task is not None:
+            task.cancel()
+        capture = self._captures.pop(camera_id, None)
+        if capture is not None:
+            capture.stop()
+            await asyncio.to_thread(capture.join, 5.0)
+        self.cameras.pop(camera_id, None)
+
+    async def stop(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        for camera_id in list(self._captures):
+            await self.remove_camera(camera_id)
+        logger.info("Camera ingestion stopped")
+
+    def _encode(self, frame: np.ndarray) -> bytes:
+        ok, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return buffer.tobytes()
+
+    def _gate_and_encode(self, gate: Optional[MotionGate], frame: np.ndarray, roi: Optional[List[Dict]] = None) -> Optional[bytes]:
+        """JPEG bytes for the worker pool, or None if the motion gate rejects the frame"""
+        if gate is not None:
+            watched = frame
+            regions = parse_roi(roi, frame.shape) if roi else []
+            if regions:
+                # Only motion inside the regions' combined bounds wakes detection
+                x0, y0 = min(r['box'][0] for r in regions), min(r['box'][1] for r in regions)
+                x1, y1 = max(r['box'][2] for r in regions), max(r['box'][3] for r in regions)
+                watched = frame[y0:y1, x0:x1]
+            if not gate.check(watched):
+                return None
+        return self._encode(frame)
+
+    async def _detect_tracked(
+        self,
+        tracker: FaceTracker,
+        image_bytes: bytes,
+        roi: Optional[List[Dict]],
+        now: float
+    ) -> Tuple[int, List[Dict], List]:
+        """
+        Detect, track and encode only the faces that need identifying
+
+        Returns:
+            Number of detections, encoded faces (with 'track_id') and their tracks
+        """
+        detections = await self.face_pool.detect(image_bytes, roi=roi)
+        tracks = tracker.update(
+            [face['location'] for face in detections],
+            [face['quality'] for face in detections],
+            now
+        )
+        selected = [track for track in tracks if tracker.needs_encoding(track, now)]
+        if not selected:
+            return len(detections), [], []
+
+        encoded = await self.face_pool.encode(image_bytes, [track.box for track in selected])
+        faces, face_tracks = [], []
+        for track, face in zip(selected, encoded):
+            if face['encoding'] is None:
+                tracker.record_identity(track, None, now)
+                continue
+            faces.append({**face, 'track_id': track.track_id})
+            face_tracks.append(track)
+        return len(detections), faces, face_tracks
+
+    async def _emit_event(self, camera_id: int, captured_at: datetime, event: Dict):
+        self._stats[camera_id]['events'] += 1
+        if self.event_handler is None:
+            return
+        try:
+            result = self.event_handler(camera_id, captured_at, {**event, 'camera_id': camera_id})
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.error(f"Camera {camera_id} event handler failed: {e}")
+
+    async def _analysis_loop(self, camera_id: int):
+        camera = self.cameras[camera_id]
+        capture = self._captures[camera_id]
+        stats = self._stats[camera_id]
+        gate = self._gates[camera_id]
+        tracker = self._trackers[camera_id]
+        roi = (camera.get('metadata') or {}).get('roi') or None
+        analysis_fps = float(camera.get('metadata', {}).get('analysis_fps', self.analysis_fps))
+        interval = 1.0 / max(analysis_fps, 0.01)
+
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while capture.is_alive() or capture.slot.pending:
+            next_tick += interval
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            if loop.time() - next_tick > interval:
+                # Analysis fell behind; resume from now instead of bursting
+                next_tick = loop.time()
+
+            item = capture.slot.take()
+            if item is None:
+                continue
+            frame, captured_at = item
+
+            try:
+                image_bytes = await asyncio.to_thread(self._gate_and_encode, gate, frame, roi)
+                if image_bytes is None:
+                    stats['motion_skips'] += 1
+                    continue
+                now = time.monotonic()
+                if tracker is None:
+                    faces = await self.face_pool.detect_and_encode(image_bytes, roi=roi)
+                    detected, tracks = len(faces), None
+                else:
+                    detected, faces, tracks = await self._detect_tracked(tracker, image_bytes, roi, now)
+            except FaceWorkerPoolBusy:
+                stats['busy_skips'] += 1
+                continue
+            except Exception as e:
+                stats['analysis_errors'] += 1
+                logger.error(f"Camera {camera_id} analysis failed: {e}")
+                continue
+
+            stats['frames_analyzed'] += 1
+            stats['faces_detected'] += detected
+            self._meters[camera_id].tick()
+
+            matches = None
+            if self.handler is not None and (faces or tracks is None):
+                try:
+                    matches = self.handler(camera_id, captured_at, faces)
+                    if inspect.isawaitable(matches):
+                        matches = await matches
+                    stats['faces_recognized'] += sum(1 for match in matches or [] if match)
+                except Exception as e:
+                    logger.error(f"Camera {camera_id} face handler failed: {e}")
+
+            if tracks:
+                matches = list(matches or [])
+                matches += [None] * (len(tracks) - len(matches))
+                for track, match in zip(tracks, matches):
+                    event = tracker.record_identity(track, match, now)
+                    if event is not None:
+                        await self._emit_event(camera_id, captured_at, event)
+
+    def _camera_health(self, camera_id: int) -> str:
+        from models.database_models import CameraStatus
+
+        capture = self._captures[camera_id]
+        stale_after = max(5.0, 3.0 / max(capture.meter.rate(), 0.1))
+        receiving = capture.last_frame_at is not None and time.monotonic() - capture.last_frame_at <= stale_after
+        if capture.status == 'active' and receiving:
+            return CameraStatus.ACTIVE
+        if capture.status == 'finished':
+            return CameraStatus.INACTIVE
+        return CameraStatus.ERROR
+
+    def _write_heartbeats(self):
+        from models.database_models import Camera, CameraStatus
+
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            for camera_id in list(self._captures):
+                health = self._camera_health(camera_id)
+                values = {'status': health}
+                if health == CameraStatus.ACTIVE:
+                    values['last_heartbeat'] = now
+                db.query(Camera).filter(Camera.id == camera_id).update(values, synchronize_session=False)
+            db.commit()
+
+    async def _heartbeat_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self._write_heartbeats)
+            except Exception as e:
+                logger.error(f"Camera heartbeat update failed: {e}")
+            await asyncio.sleep(self.heartbeat_seconds)
+
+    def stats(self) -> Dict[int, Dict]:
+        """Per-camera capture/analysis rates and frame counters"""
+        result = {}
+        now = time.monotonic()
+        for camera_id, capture in list(self._captures.items()):
+            last_frame_age = None
+            if capture.last_frame_at is not None:
+                last_frame_age = round(now - capture.last_frame_at, 2)
+            result[camera_id] = {
+                'name': self.cameras[camera_id].get('name'),
+                'status': capture.status,
+                'capture_fps': round(capture.meter.rate(), 2),
+                'analysis_fps': round(self._meters[camera_id].rate(), 2),
+                'frames_captured': capture.frames_captured,
+                'frames_dropped': capture.slot.dropped,
+                'reconnects': capture.reconnects,
+                'last_frame_age_seconds': last_frame_age,
+                'last_error': capture.last_error,
+                **self._stats[camera_id],
+                'motion': self._gates[camera_id].stats() if self._gates.get(camera_id) else None,
+                'tracking': self._trackers[camera_id].stats() if self._trackers.get(camera_id) else None
+            }
+        return result
@@ -0,0 +1,729 @@
+import json
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .ann_index import search_index, squared_distances
+
+logger = logging.getLogger(__name__)
+
+# Version tag stored alongside binary encodings in FaceEncoding.encoding_version
+ENCODING_FORMAT_VERSION = 1
+ENCODING_DTYPE = np.dtype('<f4')
+
+
+def pack_encoding(encoding) -> bytes:
+    """Serialize a face encoding as raw little-endian float32 bytes"""
+    return np.asarray(encoding, dtype=ENCODING_DTYPE).tobytes()
+
+
+def unpack_encoding(blob: bytes, dimension: Optional[int] = None) -> np.ndarray:
+    """
+    Deserialize raw float32 bytes without copying
+
+    Args:
+        blob: Bytes produced by pack_encoding
+        dimension: Expected vector length, validated if given
+
+    Returns:
+        Read-only float32 view over the bytes
+    """
+    encoding = np.frombuffer(blob, dtype=ENCODING_DTYPE)
+    if dimension is not None and len(encoding) != dimension:
+        raise ValueError(f"Encoding has {len(encoding)} values, expected {dimension}")
+    return encoding
+
+
+def decode_face_encoding(encoding_blob, encoding_dim, encoding_data) -> np.ndarray:
+    """Decode a FaceEncoding row, preferring the binary column over legacy JSON"""
+    if encoding_blob is not None:
+        return unpack_encoding(encoding_blob, encoding_dim)
+    return np.asarray(json.loads(encoding_data), dtype=np.float32)
+
+
+def group_rows_by_user(user_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sort rows by owner so per-user reductions become segment operations
+
+    Args:
+        user_ids: Owner of each row
+
+    Returns:
+        Tuple of (order, starts, users): rows in user-sorted order, the
+        start offset of each user's segment within that order, and the user
+        id of each segment
+    """
+    order = np.argsort(user_ids, kind='stable')
+    sorted_ids = user_ids[order]
+    if len(sorted_ids) == 0:
+        return order, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], sorted_ids[1:] != sorted_ids[:-1])))
+    return order, starts, sorted_ids[starts]
+
+
+class FaceGallery:
+    """
+    Process-wide, in-memory gallery of enrolled face encodings
+
+    Encodings are kept in one contiguous float32 matrix with parallel
+    user_id / encoding_id arrays so a lookup is a single vectorized
+    distance computation instead of a per-row Python loop.
+
+    Writers append into spare capacity and only then publish the new size,
+    and removals build fresh arrays, so readers can work on a snapshot
+    taken under the lock without holding it during the scan.
+
+    An optional ANN index (see services.ann_index) narrows large galleries
+    to a shortlist that is then re-ranked exactly. Indexes are rebuilt in a
+    background thread and the gallery falls back to an exact scan while no
+    current index is available.
+
+    ``match_reduction`` decides how a user with several encodings is scored
+    when matching: by their closest encoding ('min') or by the mean of
+    their encodings ('centroid', see user_distances). It applies to match,
+    match_batch and candidate_distances alike, so verification and
+    candidate ranking agree on who is closest.
+    """
+
+    def __init__(
+        self,
+        dimension: int = 128,
+        initial_capacity: int = 1024,
+        index_factory: Optional[Callable] = None,
+        index_min_size: int = 20000,
+        match_reduction: str = 'min'
+    ):
+        if match_reduction not in ('min', 'centroid'):
+            raise ValueError(f"Unknown reduction: {match_reduction}")
+        self.match_reduction = match_reduction
+        self.dimension = dimension
+        self._lock = threading.RLock()
+        self._allocate(max(initial_capacity, 1))
+        self._size = 0
+        self.loaded = False
+        # Highest FaceEncoding id / updated_at reflected in the gallery
+        self.watermark = {'max_id': 0, 'max_updated_at': None}
+
+        self._index_factory = index_factory
+        self.index_min_size = index_min_size
+        self._index = None
+        self._index_building = False
+        # Bumped whenever row positions change so stale index builds are discarded
+        self._layout_version = 0
+        # Per-user grouping of the rows, valid while _grouping_key() is unchanged
+        self._user_groups = None
+
+    def _allocate(self, capacity: int):
+        self._vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+        self._sq_norms = np.zeros(capacity, dtype=np.float32)
+        self._user_ids = np.zeros(capacity, dtype=np.int64)
+        self._encoding_ids = np.zeros(capacity, dtype=np.int64)
+
+    def _grow(self, min_capacity: int):
+        capacity = len(self._vectors)
+        while capacity < min_capacity:
+            capacity *= 2
+
+        vectors, sq_norms = self._vectors, self._sq_norms
+        user_ids, encoding_ids = self._user_ids, self._encoding_ids
+        self._allocate(capacity)
+        self._vectors[:self._size] = vectors[:self._size]
+        self._sq_norms[:self._size] = sq_norms[:self._size]
+        self._user_ids[:self._size] = user_ids[:self._size]
+        self._encoding_ids[:self._size] = encoding_ids[:self._size]
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def layout_version(self) -> int:
+        """Changes whenever existing rows move, invalidating cached row positions"""
+        return self._layout_version
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get a consistent view of the gallery
+
+        Returns:
+            Tuple of (vectors, squared_norms, user_ids, encoding_ids) views
+        """
+        with self._lock:
+            size = self._size
+            return (
+                self._vectors[:size],
+                self._sq_norms[:size],
+                self._user_ids[:size],
+                self._encoding_ids[:size]
+            )
+
+    def load_from_db(self, db) -> int:
+        """
+        Replace the gallery contents with every enrolled encoding
+
+        Args:
+            db: SQLAlchemy session
+
+        Returns:
+            Number of encodings loaded
+        """
+        from models.database_models import FaceEncoding
+
+        rows = db.query(
+            FaceEncoding.id,
+            FaceEncoding.user_id,
+            FaceEncoding.encoding_blob,
+            FaceEncoding.encoding_dim,
+            FaceEncoding.encoding_data,
+            FaceEncoding.updated_at
+        ).all()
+
+        encoding_ids, user_ids, vectors = self.decode_rows(rows)
+        self.replace(vectors, user_ids, encoding_ids)
+        self.watermark = self.watermark_for(rows)
+        logger.info(f"Face gallery loaded with {len(rows)} encodings")
+        return len(rows)
+
+    def decode_rows(self, rows) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Decode (id, user_id, blob, dim, json, ...) FaceEncoding rows
+
+        Returns:
+            Tuple of (encoding_ids, user_ids, vectors)
+        """
+        vectors = np.zeros((len(rows), self.dimension), dtype=np.float32)
+        user_ids = np.zeros(len(rows), dtype=np.int64)
+        encoding_ids = np.zeros(len(rows), dtype=np.int64)
+        for i, (encoding_id, user_id, blob, dim, encoding_data, *_) in enumerate(rows):
+            vectors[i] = decode_face_encoding(blob, dim, encoding_data)
+            user_ids[i] = user_id
+            encoding_ids[i] = encoding_id
+        return encoding_ids, user_ids, vectors
+
+    @staticmethod
+    def watermark_for(rows, previous: Optional[Dict] = None) -> Dict:
+        """Highest encoding id and updated_at seen in rows ending with updated_at"""
+        watermark = dict(previous or {'max_id': 0, 'max_updated_at': None})
+        for row in rows:
+            watermark['max_id'] = max(watermark['max_id'], row[0])
+            updated_at = row[-1].isoformat() if row[-1] else None
+            if updated_at and (watermark['max_updated_at'] is None or updated_at > watermark['max_updated_at']):
+                watermark['max_updated_at'] = updated_at
+        return watermark
+
+    def replace(self, vectors: np.ndarray, user_ids: np.ndarray, encoding_ids: np.ndarray):
+        """Atomically swap in a new set of encodings"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        count = len(vectors)
+
+        with self._lock:
+            self._allocate(max(count, 1024))
+            self._vectors[:count] = vectors
+            self._sq_norms[:count] = np.einsum('ij,ij->i', vectors, vectors)
+            self._user_ids[:count] = user_ids
+            self._encoding_ids[:count] = encoding_ids
+            self._size = count
+            self.loaded = True
+            self._layout_version += 1
+            self._index = None
+
+        self._schedule_index_build()
+
+    def attach(
+        self,
+        vectors: np.ndarray,
+        sq_norms: np.ndarray,
+        user_ids: np.ndarray,
+        encoding_ids: np.ndarray,
+        count: int
+    ):
+        """
+        Use pre-built arrays (e.g. memory-mapped snapshot files) as storage
+
+        Rows past ``count`` are spare capacity for later appends. With
+        copy-on-write maps, untouched pages stay shared with other processes.
+        """
+        with self._lock:
+            self._vectors = vectors
+            self._sq_norms = sq_norms
+            self._user_ids = user_ids
+            self._encoding_ids = encoding_ids
+            self._size = count
+            self.loaded = True
+            self._layout_version += 1
+            self._index = None
+
+        self._schedule_index_build()
+
+    def upsert_many(self, encoding_ids, user_ids, encodings: np.ndarray):
+        """
+        Overwrite rows whose encoding id is already present, append the rest
+
+        Args:
+            encoding_ids: FaceEncoding primary keys
+            user_ids: Owners of the encodings
+            encodings: N x D matrix of face encodings
+        """
+        encoding_ids = np.asarray(encoding_ids, dtype=np.int64)
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        vectors = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dimension)
+
+        with self._lock:
+            _, _, _, existing_ids = self.snapshot()
+            order = np.argsort(existing_ids, kind='stable')
+            positions = np.searchsorted(existing_ids, encoding_ids, sorter=order)
+            positions = np.minimum(positions, max(len(order) - 1, 0))
+            rows = order[positions] if len(order) else np.zeros(len(encoding_ids), dtype=np.int64)
+            present = (existing_ids[rows] == encoding_ids) if len(order) else np.zeros(len(encoding_ids), bool)
+
+            updated = rows[present]
+            if len(updated):
+                # Rows changed in place, so cached per-user centroids are stale
+                self._user_groups = None
+            self._vectors[updated] = vectors[present]
+            self._sq_norms[updated] = np.einsum('ij,ij->i', vectors[present], vectors[present])
+            self._user_ids[updated] = user_ids[present]
+
+            self.add_many(encoding_ids[~present], user_ids[~present], vectors[~present])
+
+    def retain(self, encoding_ids) -> int:
+        """
+        Drop rows whose encoding id is not in encoding_ids
+
+        Returns:
+            Number of rows removed
+        """
+        with self._lock:
+            vectors, _, user_ids, existing_ids = self.snapshot()
+            keep = np.isin(existing_ids, np.asarray(encoding_ids, dtype=np.int64))
+            removed = int(len(keep) - keep.sum())
+            if removed:
+                self.replace(vectors[keep], user_ids[keep], existing_ids[keep])
+            return removed
+
+    def add(self, encoding_id: int, user_id: int, encoding: np.ndarray):
+        """
+        Append a newly enrolled encoding
+
+        Args:
+            encoding_id: FaceEncoding primary key
+            user_id: Owner of the encoding
+            encoding: Face encoding vector
+        """
+        vector = np.asarray(encoding, dtype=np.float32).reshape(self.dimension)
+
+        with self._lock:
+            if self._size >= len(self._vectors):
+                self._grow(self._size + 1)
+
+            row = self._size
+            self._vectors[row] = vector
+            self._sq_norms[row] = float(vector @ vector)
+            self._user_ids[row] = user_id
+            self._encoding_ids[row] = encoding_id
+            self._size = row + 1
+
+            if self._index is None or self._index.needs_rebuild(self._size):
+                self._schedule_index_build()
+
+    def add_many(self, encoding_ids, user_ids, encodings: np.ndarray):
+        """
+        Append many encodings with a single publish
+
+        Args:
+            encoding_ids: FaceEncoding primary keys
+            user_ids: Owners of the encodings
+            encodings: N x D matrix of face encodings
+        """
+        vectors = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dimension)
+        count = len(vectors)
+        if count == 0:
+            return
+
+        with self._lock:
+            start = self._size
+            if start + count > len(self._vectors):
+                self._grow(start + count)
+
+            self._vectors[start:start + count] = vectors
+            self._sq_norms[start:start + count] = np.einsum('ij,ij->i', vectors, vectors)
+            self._user_ids[start:start + count] = user_ids
+            self._encoding_ids[start:start + count] = encoding_ids
+            self._size = start + count
+
+            if self._index is None or self._index.needs_rebuild(self._size):
+                self._schedule_index_build()
+
+    def remove_user(self, user_id: int) -> int:
+        """
+        Drop every encoding belonging to a user
+
+        Returns:
+            Number of encodings removed
+        """
+        with self._lock:
+            vectors, _, user_ids, encoding_ids = self.snapshot()
+            keep = user_ids != user_id
+            removed = int(len(keep) - keep.sum())
+            if removed:
+                self.replace(vectors[keep], user_ids[keep], encoding_ids[keep])
+            return removed
+
+    def build_index(self) -> bool:
+        """
+        Build the ANN index synchronously over the current rows
+
+        Returns:
+            True if an index was installed
+        """
+        if self._index_factory is None:
+            return False
+
+        while True:
+            with self._lock:
+                if self._size < self.index_min_size:
+                    self._index = None
+                    return False
+                version = self._layout_version
+                vectors = self._vectors[:self._size]
+
+            index = self._index_factory()
+            index.build(vectors)
+
+            with self._lock:
+                if version == self._layout_version:
+                    self._index = index
+                    return True
+
+    def _schedule_index_build(self):
+        if self._index_factory is None or self._size < self.index_min_size:
+            return
+
+        with self._lock:
+            if self._index_building:
+                return
+            self._index_building = True
+
+        def run():
+            try:
+                self.build_index()
+            except Exception as e:
+                logger.error(f"Face gallery index build failed: {e}")
+            finally:
+                self._index_building = False
+
+        threading.Thread(target=run, name="face-gallery-index", daemon=True).start()
+
+    def search(
+        self,
+        face_encoding: np.ndarray,
+        k: int = 1,
+        nprobe: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nearest gallery entries, using the ANN index when one is available
+
+        Args:
+            face_encoding: Face encoding to search for
+            k: Number of neighbours to return
+            nprobe: Optional recall knob forwarded to the index
+
+        Returns:
+            Tuple of (distances, user_ids) for the nearest rows, nearest first
+        """
+        with self._lock:
+            vectors, sq_norms, user_ids, _ = self.snapshot()
+            index = self._index
+
+        distances, rows = search_index(index, vectors, sq_norms, face_encoding, k, nprobe)
+        return distances, user_ids[rows]
+
+    def distances(self, face_encoding: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Euclidean distance from a face encoding to every gallery entry
+
+        Args:
+            face_encoding: Face encoding to compare
+
+        Returns:
+            Tuple of (distances, user_ids) arrays aligned by row
+        """
+        vectors, sq_norms, user_ids, _ = self.snapshot()
+        query = np.asarray(face_encoding, dtype=np.float32).reshape(self.dimension)
+
+        return np.sqrt(squared_distances(vectors, sq_norms, query)), user_ids
+
+    def rows_for_users(self, user_ids) -> np.ndarray:
+        """
+        Gallery positions of every encoding owned by the given users
+
+        Positions are valid until the next compaction (replace, retain or
+        remove_user); appended rows are not included.
+        """
+        _, _, gallery_user_ids, _ = self.snapshot()
+        return np.flatnonzero(np.isin(gallery_user_ids, np.asarray(list(user_ids), dtype=np.int64)))
+
+    def distance_matrix(
+        self,
+        face_encodings: np.ndarray,
+        rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Exact distances from several face encodings to every gallery entry
+
+        Args:
+            face_encodings: N x D matrix of face encodings
+            rows: Optional gallery positions to restrict the comparison to
+
+        Returns:
+            Tuple of (N x M distance matrix, user_ids of the M gallery rows)
+        """
+        vectors, sq_norms, user_ids, _ = self.snapshot()
+        if rows is not None:
+            rows = rows[rows < len(vectors)]
+            vectors, sq_norms, user_ids = vectors[rows], sq_norms[rows], user_ids[rows]
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, self.dimension)
+
+        sq_distances = (
+            sq_norms[None, :]
+            - 2.0 * (queries @ vectors.T)
+            + np.einsum('ij,ij->i', queries, queries)[:, None]
+        )
+        np.maximum(sq_distances, 0.0, out=sq_distances)
+        return np.sqrt(sq_distances), user_ids
+
+    def candidate_distances(
+        self,
+        face_encodings: np.ndarray,
+        rows: Optional[np.ndarray] = None,
+        nprobe: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Exact distances from several face encodings to their candidate rows
+
+        Without rows, an installed ANN index shortlists each encoding and the
+        union of the shortlists is scored exactly in one matrix, so a batch
+        gets the same pruning as search() while keeping a single matrix
+        product. Without an index, or with a flat one, every row is scored.
+
+        With the 'centroid' match reduction the columns are users instead,
+        scored against the mean of their encodings (no index is used).
+
+        Args:
+            face_encodings: N x D matrix of face encodings
+            rows: Optional gallery positions to restrict the comparison to
+            nprobe: Optional recall knob forwarded to the ANN index
+
+        Returns:
+            Tuple of (N x M distance matrix, user_ids of the M candidate rows)
+        """
+        if self.match_reduction == 'centroid':
+            return self.user_distances(face_encodings, 'centroid', rows)
+        if rows is not None:
+            return self.distance_matrix(face_encodings, rows)
+
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, self.dimension)
+        with self._lock:
+            # snapshot() lets a shared gallery drop an index built for an older layout
+            size = len(self.snapshot()[0])
+            index = self._index
+            version = self.layout_version
+
+        shortlists = []
+        if index is not None:
+            for query in queries:
+                candidates = index.candidates(query, size, nprobe)
+                if candidates is None:
+                    break
+                shortlists.append(candidates)
+        if not shortlists or len(shortlists) < len(queries):
+            return self.distance_matrix(queries)
+
+        distances, user_ids = self.distance_matrix(queries, np.unique(np.concatenate(shortlists)))
+        if self.layout_version != version:
+            # Rows moved while shortlisting; the positions may name other encodings now
+            return self.distance_matrix(queries)
+        return distances, user_ids
+
+    def _grouping_key(self, size: int):
+        return self._layout_version, size
+
+    def _grouping(self, vectors: np.ndarray, user_ids: np.ndarray, rows: Optional[np.ndarray]) -> Dict:
+        """Per-user segments and centroids, cached for the full gallery"""
+        key = self._grouping_key(len(vectors))
+        cache = self._user_groups
+        if rows is None and cache is not None and cache['key'] == key:
+            return cache
+
+        order, starts, users = group_rows_by_user(user_ids)
+        counts = np.diff(np.append(starts, len(order)))
+        centroids = np.zeros((len(users), self.dimension), dtype=np.float32)
+        if len(users):
+            centroids = np.add.reduceat(vectors[order], starts, axis=0) / counts[:, None]
+            centroids = centroids.astype(np.float32)
+
+        groups = {
+            'key': key,
+            'order': order,
+            'starts': starts,
+            'users': users,
+            'centroids': centroids,
+            'centroid_sq_norms': np.einsum('ij,ij->i', centroids, centroids)
+        }
+        if rows is None:
+            self._user_groups = groups
+        return groups
+
+    def user_distances(
+        self,
+        face_encodings: np.ndarray,
+        reduction: str = 'min',
+        rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        One distance per enrolled user instead of one per encoding
+
+        With 'min' each user scores the distance of their closest encoding
+        (np.minimum.reduceat over user-sorted columns); with 'centroid' the
+        query is compared with the mean of each user's encodings, so the
+        scan itself is proportional to the number of users.
+
+        Args:
+            face_encodings: N x D matrix of face encodings
+            reduction: 'min' or 'centroid'
+            rows: Optional gallery positions to restrict the comparison to
+
+        Returns:
+            Tuple of (N x U distance matrix, user ids of the U columns)
+        """
+        if reduction not in ('min', 'centroid'):
+            raise ValueError(f"Unknown reduction: {reduction}")
+
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, self.dimension)
+        vectors, sq_norms, user_ids, _ = self.snapshot()
+        if rows is not None:
+            rows = rows[rows < len(vectors)]
+            vectors, sq_norms, user_ids = vectors[rows], sq_norms[rows], user_ids[rows]
+
+        groups = self._grouping(vectors, user_ids, rows)
+        users = groups['users']
+        if len(users) == 0:
+            return np.empty((len(queries), 0), dtype=np.float32), users
+
+        if reduction == 'centroid':
+            centroids, centroid_sq_norms = groups['centroids'], groups['centroid_sq_norms']
+            sq_distances = (
+                centroid_sq_norms[None, :]
+                - 2.0 * (queries @ centroids.T)
+                + np.einsum('ij,ij->i', queries, queries)[:, None]
+            )
+            np.maximum(sq_distances, 0.0, out=sq_distances)
+            return np.sqrt(sq_distances), users
+
+        sq_distances = (
+            sq_norms[None, :]
+            - 2.0 * (queries @ vectors.T)
+            + np.einsum('ij,ij->i', queries, queries)[:, None]
+        )
+        per_user = np.minimum.reduceat(sq_distances[:, groups['order']], groups['starts'], axis=1)
+        np.maximum(per_user, 0.0, out=per_user)
+        return np.sqrt(per_user), users
+
+    def rank_users(
+        self,
+        face_encoding: np.ndarray,
+        k: int = 5,
+        reduction: str = 'min',
+        rows: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Closest enrolled users for a face, one entry per user
+
+        Ties are broken by user id so the ranking is stable between calls.
+
+        Args:
+            face_encoding: Face encoding to rank users for
+            k: Number of users to return
+            reduction: 'min' or 'centroid' (see user_distances)
+            rows: Optional gallery positions to restrict the ranking to
+
+        Returns:
+            List of (user_id, distance), nearest first
+        """
+        distances, users = self.user_distances(face_encoding, reduction, rows)
+        distances = distances[0]
+        k = min(k, len(users))
+        if k == 0:
+            return []
+
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.lexsort((users[top], distances[top]))]
+        return [(int(users[i]), float(distances[i])) for i in top]
+
+    def match(
+        self,
+        face_encoding: np.ndarray,
+        tolerance: float,
+        nprobe: Optional[int] = None,
+        rows: Optional[np.ndarray] = None
+    ) -> Optional[Tuple[int, float]]:
+        """
+        Find the closest enrolled face within tolerance
+
+        Args:
+            face_encoding: Face encoding to match
+            tolerance: Maximum accepted distance
+            nprobe: Optional recall knob forwarded to the ANN index
+            rows: Optional gallery positions to search exactly instead of the whole gallery
+
+        Returns:
+            Tuple of (user_id, confidence) if match found, None otherwise
+        """
+        if self._size == 0:
+            return None
+        if rows is not None or self.match_reduction != 'min':
+            return self.match_batch(np.asarray(face_encoding)[None, :], tolerance, rows=rows)[0]
+
+        distances, user_ids = self.search(face_encoding, k=1, nprobe=nprobe)
+        if len(distances) == 0 or distances[0] > tolerance:
+            return None
+        return int(user_ids[0]), float(1.0 - distances[0])
+
+    def match_batch(
+        self,
+        face_encodings: np.ndarray,
+        tolerance: float,
+        rows: Optional[np.ndarray] = None,
+        nprobe: Optional[int] = None
+    ) -> List[Optional[Tuple[int, float]]]:
+        """
+        Best match for each of several independent face encodings
+
+        Searches through the ANN index like match() unless rows are given
+        (see candidate_distances).
+
+        Args:
+            face_encodings: N x D matrix of face encodings
+            tolerance: Maximum accepted distance
+            rows: Optional gallery positions to restrict matching to
+            nprobe: Optional recall knob forwarded to the ANN index
+
+        Returns:
+            List of (user_id, confidence) or None, one per encoding
+        """
+        if len(face_encodings) == 0:
+            return []
+        if self._size == 0:
+            return [None] * len(face_encodings)
+
+        distances, user_ids = self.candidate_distances(face_encodings, rows, nprobe)
+        if distances.shape[1] == 0:
+            return [None] * len(face_encodings)
+        best = np.argmin(distances, axis=1)
+        best_distances = distances[np.arange(len(best)), best]
+
+        return [
+            (int(user_ids[row]), float(1.0 - distance)) if distance <= tolerance else None
+            for row, distance in zip(best, best_distances)
+        ]
@@ -1,37 +1,39 @@
 import pickle
 import json
+import time
 from typing import List, Tuple, Optional, Dict
 from pathlib import Path
 import logging
 import numpy as np
 
-# Optional AI imports - gracefully handle if not installed
-try:
-    import cv2
-    CV2_AVAILABLE = True
-except ImportError:
-    CV2_AVAILABLE = False
+from .ann_index import create_ann_index
+from .face_gallery import FaceGallery
+from .shared_gallery import SHARED_GALLERY_SUPPORTED, SharedFaceGallery
+from .model_registry import default_registry
+from .lazy_import import LazyImport, is_installed, import_times
+from .roi import parse_roi, crop_region, box_center_inside, box_iou
+
+# Optional AI imports - resolved lazily so importing this module stays cheap;
+# availability is checked without importing the libraries
+cv2 = LazyImport('cv2')
+face_recognition = LazyImport('face_recognition')
+MTCNN = LazyImport('mtcnn', 'MTCNN')
+DeepFace = LazyImport('deepface', 'DeepFace')
+
+CV2_AVAILABLE = is_installed('cv2')
+if not CV2_AVAILABLE:
     logging.warning("OpenCV not installed. Face detection features will be limited.")
 
-try:
-    import face_recognition
-    FACE_RECOGNITION_AVAILABLE = True
-except ImportError:
-    FACE_RECOGNITION_AVAILABLE = False
+FACE_RECOGNITION_AVAILABLE = is_installed('face_recognition')
+if not FACE_RECOGNITION_AVAILABLE:
     logging.warning("face_recognition not installed. Install with: pip install -r requirements-ai.txt")
 
-try:
-    from mtcnn import MTCNN
-    MTCNN_AVAILABLE = True
-except ImportError:
-    MTCNN_AVAILABLE = False
+MTCNN_AVAILABLE = is_installed('mtcnn')
+if not MTCNN_AVAILABLE:
     logging.warning("MTCNN not installed.")
 
-try:
-    from deepface import DeepFace
-    DEEPFACE_AVAILABLE = True
-except ImportError:
-    DEEPFACE_AVAILABLE = False
+DEEPFACE_AVAILABLE = is_installed('deepface')
+if not DEEPFACE_AVAILABLE:
     logging.warning("DeepFace not installed.")
 
 logger = logging.getLogger(__name__)
@@ -48,15 +50,30 @@ class FaceRecognitionService:
         self.face_model = self.config.get('face_model', 'hog')  # hog or cnn
         self.encoding_model = self.config.get('encoding_model', 'large')  # small or large
         
-        # Initialize MTCNN detector if available
-        if MTCNN_AVAILABLE:
-            try:
-                self.mtcnn_detector = MTCNN()
-            except Exception as e:
-                logger.warning(f"Failed to initialize MTCNN: {e}")
-                self.mtcnn_detector = None
-        else:
-            self.mtcnn_detector = None
+        # Detection runs on a downscaled copy; boxes are mapped back to full resolution
+        self.detection_scale = float(self.config.get('detection_scale', 1.0))
+        self.detection_short_side = int(self.config.get('detection_short_side', 0))  # 0 = use detection_scale
+        self.detection_upsample = int(self.config.get('detection_upsample', 1))
+        
+        # Gallery ANN index: 'flat' (exact) or 'ivf'
+        self.ann_index = self.config.get('ann_index', 'flat')
+        self.ann_nlist = int(self.config.get('ann_nlist', 0))
+        self.ann_nprobe = int(self.config.get('ann_nprobe', 8))
+        self.ann_min_size = int(self.config.get('ann_min_size', 20000))
+        self.ann_shortlist = int(self.config.get('ann_shortlist', 32))
+        self.match_reduction = self.config.get('match_reduction', 'min')
+        self.shared_gallery_dir = self.config.get('shared_gallery_dir') or None
+        
+        # Detector and model objects are built once per process and cached here
+        self.models = self.config.get('model_registry') or default_registry
+        self.warmup_models = [
+            name.strip() for name in self.config.get('warmup_models', '').split(',') if name.strip()
+        ]
+        
+        # 'eager' imports the AI libraries now, 'lazy' defers them to first use
+        self.model_loading = self.config.get('model_loading', 'eager')
+        if self.model_loading == 'eager':
+            self.load_backends()
         
         # Face encoding cache
         self.encoding_cache = {}
@@ -68,29 +85,199 @@ class FaceRecognitionService:
             logger.warning("AI libraries not fully installed. Face recognition features limited.")
             logger.info("Install AI features with: pip install -r requirements-ai.txt")
         
+        if self.warmup_models and self.model_loading == 'eager':
+            self.warm_up(self.warmup_models)
+        
         logger.info(f"Face Recognition Service initialized (AI available: {self.ai_available})")
     
-    def detect_faces(self, image: np.ndarray, method: str = 'dlib') -> List[Tuple[int, int, int, int]]:
+    def load_backends(self) -> Dict[str, float]:
+        """
+        Import the installed AI libraries and build the MTCNN detector
+        
+        Returns:
+            Import time in seconds per library
+        """
+        for name, module, available in (
+            ('cv2', cv2, CV2_AVAILABLE),
+            ('face_recognition', face_recognition, FACE_RECOGNITION_AVAILABLE),
+            ('mtcnn', MTCNN, MTCNN_AVAILABLE),
+            ('deepface', DeepFace, DEEPFACE_AVAILABLE)
+        ):
+            if not available:
+                continue
+            try:
+                module.load()
+            except Exception as e:
+                logger.warning(f"Failed to import {name}: {e}")
+        
+        # Initialize MTCNN detector if available
+        if MTCNN_AVAILABLE:
+            try:
+                self.get_mtcnn_detector()
+            except Exception as e:
+                logger.warning(f"Failed to initialize MTCNN: {e}")
+        
+        return dict(import_times)
+    
+    def get_haar_cascade(self):
+        """Haar cascade classifier, one per thread since detectMultiScale is not re-entrant"""
+        return self.models.get(
+            'haar_cascade',
+            lambda: cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'),
+            per_thread=True
+        )
+    
+    def get_mtcnn_detector(self):
+        """MTCNN detector, one per thread since its TensorFlow graph is not shared safely"""
+        return self.models.get('mtcnn', MTCNN, per_thread=True)
+    
+    def get_dlib_models(self):
+        """face_recognition module; its dlib HOG/CNN detectors and encoders load on import"""
+        return self.models.get('dlib', face_recognition.load)
+    
+    def get_deepface_model(self, model_name: str, task: str = 'facial_recognition'):
+        """DeepFace model by name; building it also fills DeepFace's own model cache"""
+        return self.models.get(
+            f'deepface:{model_name}',
+            lambda: DeepFace.build_model(model_name=model_name, task=task)
+        )
+    
+    def pipeline_models(self) -> List[str]:
+        """
+        Warm-up names for the detector and encoder this config selects
+
+        FACE_WARMUP_MODELS wins when set; otherwise the face_recognition
+        pipeline (dlib HOG/CNN detector per face_model, dlib encoder per
+        encoding_model) that detect_and_encode_faces runs by default.
+
+        Returns:
+            Model names accepted by warm_up
+        """
+        if self.warmup_models:
+            return list(self.warmup_models)
+        return ['dlib'] if FACE_RECOGNITION_AVAILABLE else []
+
+    def warm_up(self, model_names: List[str]):
+        """
+        Load models and run a dummy inference so the first request is not slow
+        
+        Args:
+            model_names: Any of 'dlib', 'opencv', 'mtcnn' or 'deepface:<ModelName>'
+        """
+        dummy = np.zeros((160, 160, 3), dtype=np.uint8)
+        
+        for name in model_names:
+            started = time.perf_counter()
+            try:
+                if name == 'dlib':
+                    self.get_dlib_models()
+                    self._detect_faces_at_scale(dummy, 'dlib')
+                    face_recognition.face_encodings(dummy, known_face_locations=[(0, 150, 150, 0)])
+                elif name == 'opencv':
+                    self._detect_faces_at_scale(dummy, 'opencv')
+                elif name == 'mtcnn':
+                    self._detect_faces_at_scale(dummy, 'mtcnn')
+                elif name.startswith('deepface:'):
+                    self.get_deepface_model(name.split(':', 1)[1])
+                else:
+                    logger.warning(f"Unknown warm-up model: {name}")
+                    continue
+                logger.info(f"Warmed up '{name}' in {time.perf_counter() - started:.2f}s")
+            except Exception as e:
+                logger.error(f"Warm-up failed for '{name}': {e}")
+    
+    def get_detection_scale(self, image: np.ndarray) -> float:
+        """
+        Resize factor applied before detection for this image
+        
+        Args:
+            image: Input image as numpy array
+        
+        Returns:
+            Factor in (0, 1]; 1.0 means detect at full resolution
+        """
+        if self.detection_short_side > 0:
+            short_side = min(image.shape[:2])
+            return min(1.0, self.detection_short_side / short_side)
+        return min(1.0, max(self.detection_scale, 0.01))
+    
+    def detect_faces(
+        self,
+        image: np.ndarray,
+        method: str = 'dlib',
+        scale: Optional[float] = None,
+        roi: Optional[List[Dict]] = None
+    ) -> List[Tuple[int, int, int, int]]:
         """
         Detect faces in an image using specified method
         
+        Detection runs on a downscaled copy when a scale below 1.0 is
+        configured, and the boxes are mapped back to the original resolution
+        so encoding can use the full-resolution pixels.
+        
+        With a region of interest (see services.roi.parse_roi), only the
+        regions are searched and boxes are returned in frame coordinates.
+        
         Args:
             image: Input image as numpy array
             method: Detection method ('dlib', 'mtcnn', 'opencv')
+            scale: Optional resize factor overriding the configured one
+            roi: Optional rect/polygon regions, e.g. Camera.camera_metadata['roi']
         
         Returns:
             List of face locations as (top, right, bottom, left) tuples
         """
+        scale = self.get_detection_scale(image) if scale is None else scale
+        if roi:
+            return self._detect_faces_in_regions(image, method, scale, parse_roi(roi, image.shape))
+        if scale >= 1.0:
+            return self._detect_faces_at_scale(image, method)
+        
+        height, width = image.shape[:2]
+        small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        
+        face_locations = []
+        for top, right, bottom, left in self._detect_faces_at_scale(small, method):
+            face_locations.append((
+                max(0, int(round(top / scale))),
+                min(width, int(round(right / scale))),
+                min(height, int(round(bottom / scale))),
+                max(0, int(round(left / scale)))
+            ))
+        return face_locations
+    
+    def _detect_faces_in_regions(
+        self,
+        image: np.ndarray,
+        method: str,
+        scale: float,
+        regions: List[Dict]
+    ) -> List[Tuple[int, int, int, int]]:
+        face_locations = []
+        for region in regions:
+            x0, y0, _, _ = region['box']
+            for top, right, bottom, left in self.detect_faces(crop_region(image, region), method, scale):
+                location = (top + y0, right + x0, bottom + y0, left + x0)
+                if not box_center_inside(location, region):
+                    continue
+                # Overlapping regions can see the same face twice
+                if any(box_iou(location, existing) > 0.5 for existing in face_locations):
+                    continue
+                face_locations.append(location)
+        return face_locations
+    
+    def _detect_faces_at_scale(self, image: np.ndarray, method: str) -> List[Tuple[int, int, int, int]]:
         try:
             if method == 'dlib':
                 face_locations = face_recognition.face_locations(
                     image, 
+                    number_of_times_to_upsample=self.detection_upsample,
                     model=self.face_model
                 )
                 return face_locations
             
             elif method == 'mtcnn':
-                results = self.mtcnn_detector.detect_faces(image)
+                results = self.get_mtcnn_detector().detect_faces(image)
                 face_locations = []
                 
                 for result in results:
@@ -107,10 +294,7 @@ class FaceRecognitionService:
             
             elif method == 'opencv':
                 gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-                face_cascade = cv2.CascadeClassifier(
-                    cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-                )
-                faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+                faces = self.get_haar_cascade().detectMultiScale(gray, 1.3, 5)
                 
                 face_locations = []
                 for (x, y, w, h) in faces:
@@ -157,7 +341,33 @@ class FaceRecognitionService:
         except Exception as e:
             logger.error(f"Face encoding error: {e}")
             return None
-    
+
+    def face_quality(self, image: np.ndarray, face_location: Tuple, sharpness_reference: float = 100.0) -> float:
+        """
+        Cheap quality score for a detected face, used to pick frames worth encoding
+
+        Args:
+            image: Input image as numpy array
+            face_location: (top, right, bottom, left) box
+            sharpness_reference: Laplacian variance treated as fully sharp
+
+        Returns:
+            Short side of the box in pixels, discounted for blur
+        """
+        top, right, bottom, left = face_location
+        size = float(max(0, min(bottom - top, right - left)))
+        crop = image[max(0, top):bottom, max(0, left):right]
+        if size == 0 or crop.size == 0:
+            return 0.0
+
+        try:
+            gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+            sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+        except Exception as e:
+            logger.error(f"Face quality error: {e}")
+            return size
+        return size * min(1.0, sharpness / sharpness_reference)
+
     def compare_faces(
         self, 
         known_encoding: np.ndarray, 
@@ -211,6 +421,7 @@ class FaceRecognitionService:
             Verification result dictionary
         """
         try:
+            self.get_deepface_model(model_name)
             result = DeepFace.verify(
                 img1_path=img1_path,
                 img2_path=img2_path,
@@ -234,6 +445,8 @@ class FaceRecognitionService:
             Analysis results dictionary
         """
         try:
+            for attribute_model in ('Age', 'Gender', 'Emotion', 'Race'):
+                self.get_deepface_model(attribute_model, task='facial_attribute')
             analysis = DeepFace.analyze(
                 img_path=image_path,
                 actions=['age', 'gender', 'emotion', 'race'],
@@ -248,7 +461,8 @@ class FaceRecognitionService:
     def detect_and_encode_faces(
         self, 
         image: np.ndarray, 
-        detection_method: str = 'dlib'
+        detection_method: str = 'dlib',
+        roi: Optional[List[Dict]] = None
     ) -> List[Dict]:
         """
         Detect all faces in image and generate encodings
@@ -256,6 +470,7 @@ class FaceRecognitionService:
         Args:
             image: Input image as numpy array
             detection_method: Face detection method
+            roi: Optional regions to restrict detection to (see detect_faces)
         
         Returns:
             List of dictionaries containing face data
@@ -264,7 +479,7 @@ class FaceRecognitionService:
         
         try:
             # Detect faces
-            face_locations = self.detect_faces(image, method=detection_method)
+            face_locations = self.detect_faces(image, method=detection_method, roi=roi)
             
             if not face_locations:
                 logger.warning("No faces detected in image")
@@ -314,28 +529,170 @@ class FaceRecognitionService:
                 return None
             
             tolerance = tolerance or self.face_recognition_tolerance
-            best_match = None
-            best_confidence = 0.0
+            user_ids = np.array([user_id for user_id, _ in known_encodings])
+            encodings = np.array([encoding for _, encoding in known_encodings])
             
-            for user_id, known_encoding in known_encodings:
-                is_match, confidence = self.compare_faces(
-                    known_encoding, 
-                    face_encoding, 
-                    tolerance
-                )
-                
-                if is_match and confidence > best_confidence:
-                    best_match = user_id
-                    best_confidence = confidence
+            # One vectorized distance computation over all known encodings
+            distances = np.linalg.norm(encodings - face_encoding, axis=1)
+            best = int(np.argmin(distances))
             
-            if best_match:
-                return (best_match, best_confidence)
+            if distances[best] <= tolerance:
+                return (int(user_ids[best]), float(1.0 - distances[best]))
             return None
         
         except Exception as e:
             logger.error(f"Face matching error: {e}")
             return None
     
+    def match_face_against_gallery(
+        self,
+        face_encoding: np.ndarray,
+        gallery,
+        tolerance: Optional[float] = None
+    ) -> Optional[Tuple[int, float]]:
+        """
+        Match a face encoding against the resident in-memory gallery
+        
+        Args:
+            face_encoding: Face encoding to match
+            gallery: FaceGallery holding the enrolled encodings
+            tolerance: Optional custom tolerance
+        
+        Returns:
+            Tuple of (user_id, confidence) if match found, None otherwise
+        """
+        try:
+            tolerance = tolerance or self.face_recognition_tolerance
+            return gallery.match(face_encoding, tolerance, nprobe=self.ann_nprobe)
+        
+        except Exception as e:
+            logger.error(f"Face matching error: {e}")
+            return None
+    
+    def rank_candidates(
+        self,
+        face_encoding: np.ndarray,
+        gallery,
+        k: int = 5,
+        rows: Optional[np.ndarray] = None
+    ) -> List[Dict]:
+        """
+        Top-k enrolled users for a face, aggregated over each user's encodings
+        
+        Args:
+            face_encoding: Face encoding to rank users for
+            gallery: FaceGallery holding the enrolled encodings
+            k: Number of users to return
+            rows: Optional gallery positions to restrict the ranking to
+        
+        Returns:
+            List of dictionaries with user_id, distance, confidence and
+            whether the distance is within tolerance, nearest first
+        """
+        try:
+            ranked = gallery.rank_users(face_encoding, k, self.match_reduction, rows)
+            return [
+                {
+                    'user_id': user_id,
+                    'distance': distance,
+                    'confidence': 1.0 - distance,
+                    'within_tolerance': distance <= self.face_recognition_tolerance
+                }
+                for user_id, distance in ranked
+            ]
+        
+        except Exception as e:
+            logger.error(f"Candidate ranking error: {e}")
+            return []
+    
+    def identify_faces(
+        self,
+        face_encodings: List[np.ndarray],
+        gallery,
+        tolerance: Optional[float] = None,
+        rows: Optional[np.ndarray] = None,
+        exclude_users: Optional[set] = None
+    ) -> List[Optional[Tuple[int, float]]]:
+        """
+        Identify several faces from one frame with a single distance matrix
+        
+        Without rows, the matrix covers the gallery's ANN shortlists for the
+        frame's faces when an index is installed.
+        
+        Candidate (face, user) pairs within tolerance are assigned greedily
+        from the closest pair outwards, so one identity is never given to
+        two faces in the same frame.
+        
+        Args:
+            face_encodings: Encodings of the faces detected in a frame
+            gallery: FaceGallery holding the enrolled encodings
+            tolerance: Optional custom tolerance
+            rows: Optional gallery positions to restrict matching to
+            exclude_users: Users already assigned to other faces in the frame
+        
+        Returns:
+            List aligned with face_encodings of (user_id, confidence) or None
+        """
+        results = [None] * len(face_encodings)
+        
+        try:
+            if not face_encodings or len(gallery) == 0:
+                return results
+            
+            tolerance = tolerance or self.face_recognition_tolerance
+            distances, user_ids = gallery.candidate_distances(np.array(face_encodings), rows)
+            
+            face_idx, row_idx = np.nonzero(distances <= tolerance)
+            order = np.argsort(distances[face_idx, row_idx], kind='stable')
+            
+            assigned_users = set(exclude_users or ())
+            for k in order:
+                face, row = int(face_idx[k]), int(row_idx[k])
+                user_id = int(user_ids[row])
+                if results[face] is not None or user_id in assigned_users:
+                    continue
+                results[face] = (user_id, float(1.0 - distances[face, row]))
+                assigned_users.add(user_id)
+            
+            return results
+        
+        except Exception as e:
+            logger.error(f"Face identification error: {e}")
+            return results
+    
+    def create_gallery(self) -> FaceGallery:
+        """
+        Build a face gallery backed by the configured ANN index
+        
+        Returns:
+            Empty FaceGallery ready to be loaded, shared across worker
+            processes when 'shared_gallery_dir' is configured and the
+            platform supports it
+        """
+        index_factory = None
+        if self.ann_index != 'flat':
+            create_ann_index(self.ann_index)  # fail fast on unknown names
+            if self.ann_index == 'ivf':
+                options = {'n_lists': self.ann_nlist, 'nprobe': self.ann_nprobe}
+            else:
+                options = {'shortlist': self.ann_shortlist}
+            index_factory = lambda: create_ann_index(self.ann_index, **options)
+        
+        if self.shared_gallery_dir and not SHARED_GALLERY_SUPPORTED:
+            logger.warning("Shared face gallery is not supported on this platform; each worker keeps its own copy")
+        elif self.shared_gallery_dir:
+            return SharedFaceGallery(
+                self.shared_gallery_dir,
+                index_factory=index_factory,
+                index_min_size=self.ann_min_size,
+                match_reduction=self.match_reduction
+            )
+        return FaceGallery(
+            index_factory=index_factory,
+            index_min_size=self.ann_min_size,
+            match_reduction=self.match_reduction
+        )
+    
     def encode_faces_from_file(self, image_path: str) -> List[np.ndarray]:
         """
         Load image from file and generate face encodings
@@ -0,0 +1,280 @@
+import itertools
+import logging
+from collections import Counter, deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .roi import box_iou
+
+logger = logging.getLogger(__name__)
+
+Box = Tuple[int, int, int, int]
+
+
+class FaceTrack:
+    """One face followed across frames"""
+
+    def __init__(self, track_id: int, box: Box, quality: float, now: float, vote_window: int):
+        self.track_id = track_id
+        self.box = box
+        self.quality = quality
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 1
+
+        # Identification state
+        self.encoded_at: Optional[float] = None
+        self.encoded_quality = 0.0
+        self.encodings = 0
+        self.votes = deque(maxlen=vote_window)
+        self.user_id: Optional[int] = None
+        self.confidence: Optional[float] = None
+
+    @property
+    def center(self) -> Tuple[float, float]:
+        top, right, bottom, left = self.box
+        return (left + right) / 2.0, (top + bottom) / 2.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'track_id': self.track_id,
+            'box': self.box,
+            'hits': self.hits,
+            'encodings': self.encodings,
+            'user_id': self.user_id,
+            'confidence': self.confidence
+        }
+
+
+class FaceTracker:
+    """
+    IoU/centroid tracker that decides which detected faces need encoding
+
+    Detections are associated with existing tracks greedily by IoU, with a
+    centroid-distance fallback for fast movement that leaves no overlap.
+    A track is encoded and identified when it is created, on every frame
+    until ``vote_window`` identifications have been collected, afterwards
+    only every ``reencode_seconds`` or when its quality score improves by
+    ``quality_gain``. The identity is confirmed once ``vote_min`` of the
+    last ``vote_window`` identifications name the same user; each user
+    then yields at most one event per ``event_cooldown_seconds``, even
+    across tracks.
+
+    Per-camera settings come from Camera.camera_metadata['tracking'], e.g.
+    {"enabled": true, "vote_min": 3, "vote_window": 5, "reencode_seconds": 5}.
+
+    Args:
+        iou_threshold: Minimum IoU to associate a detection with a track
+        centroid_ratio: Fallback association when the centres are closer than
+            this share of the track box diagonal (0 disables)
+        max_age_seconds: Drop tracks not seen for this long
+        reencode_seconds: Re-identify confirmed tracks this often (0 = never)
+        quality_gain: Re-identify when quality exceeds the encoded one by this factor
+        vote_min: Identifications of the same user needed to confirm (k)
+        vote_window: Identifications voted over (n)
+        event_cooldown_seconds: Minimum time between events for one user
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        centroid_ratio: float = 0.5,
+        max_age_seconds: float = 2.0,
+        reencode_seconds: float = 5.0,
+        quality_gain: float = 1.25,
+        vote_min: int = 3,
+        vote_window: int = 5,
+        event_cooldown_seconds: float = 300.0
+    ):
+        if not 1 <= vote_min <= vote_window:
+            raise ValueError(f"Need 1 <= vote_min <= vote_window, got {vote_min}/{vote_window}")
+        self.iou_threshold = iou_threshold
+        self.centroid_ratio = centroid_ratio
+        self.max_age_seconds = max_age_seconds
+        self.reencode_seconds = reencode_seconds
+        self.quality_gain = quality_gain
+        self.vote_min = vote_min
+        self.vote_window = vote_window
+        self.event_cooldown_seconds = event_cooldown_seconds
+
+        self.tracks: Dict[int, FaceTrack] = {}
+        self._ids = itertools.count(1)
+        self._last_event: Dict[int, float] = {}
+
+        self.detections = 0
+        self.encodings = 0
+        self.tracks_created = 0
+        self.events = 0
+
+    @classmethod
+    def from_metadata(cls, metadata: Optional[Dict], defaults: Optional[Dict] = None) -> Optional['FaceTracker']:
+        """
+        Build a tracker from a camera's camera_metadata
+
+        Args:
+            metadata: Camera.camera_metadata (may be None)
+            defaults: Settings applied when the camera does not override them
+
+        Returns:
+            FaceTracker, or None when tracking is disabled for the camera
+        """
+        options = {**(defaults or {}), **((metadata or {}).get('tracking') or {})}
+        if not options.pop('enabled', True):
+            return None
+        known = (
+            'iou_threshold', 'centroid_ratio', 'max_age_seconds', 'reencode_seconds',
+            'quality_gain', 'vote_min', 'vote_window', 'event_cooldown_seconds'
+        )
+        return cls(**{key: value for key, value in options.items() if key in known})
+
+    def _associate(self, boxes: Sequence[Box]) -> Dict[int, int]:
+        """Greedy detection index -> track id assignment"""
+        track_ids = list(self.tracks)
+        if not boxes or not track_ids:
+            return {}
+
+        iou = np.array([[box_iou(box, self.tracks[t].box) for t in track_ids] for box in boxes])
+        assigned: Dict[int, int] = {}
+        used = set()
+
+        for flat in np.argsort(-iou, axis=None):
+            det, col = divmod(int(flat), len(track_ids))
+            if iou[det, col] < self.iou_threshold:
+                break
+            if det in assigned or col in used:
+                continue
+            assigned[det] = track_ids[col]
+            used.add(col)
+
+        if self.centroid_ratio > 0:
+            pairs = []
+            for det, box in enumerate(boxes):
+                if det in assigned:
+                    continue
+                cx, cy = (box[3] + box[1]) / 2.0, (box[0] + box[2]) / 2.0
+                for col, t in enumerate(track_ids):
+                    if col in used:
+                        continue
+                    track = self.tracks[t]
+                    top, right, bottom, left = track.box
+                    diagonal = float(np.hypot(right - left, bottom - top))
+                    distance = float(np.hypot(cx - track.center[0], cy - track.center[1]))
+                    if distance <= self.centroid_ratio * diagonal:
+                        pairs.append((distance, det, col))
+            for _, det, col in sorted(pairs):
+                if det in assigned or col in used:
+                    continue
+                assigned[det] = track_ids[col]
+                used.add(col)
+
+        return assigned
+
+    def update(self, boxes: Sequence[Box], qualities: Sequence[float], now: float) -> List[FaceTrack]:
+        """
+        Associate one frame's detections with tracks
+
+        Args:
+            boxes: Detected (top, right, bottom, left) boxes
+            qualities: Quality score per box (see FaceRecognitionService.face_quality)
+            now: Frame time in seconds (monotonic)
+
+        Returns:
+            Track for each detection, aligned with boxes
+        """
+        boxes = [tuple(int(v) for v in box) for box in boxes]
+        self.detections += len(boxes)
+        assigned = self._associate(boxes)
+
+        tracks = []
+        for det, (box, quality) in enumerate(zip(boxes, qualities)):
+            track = self.tracks.get(assigned.get(det))
+            if track is None:
+                track = FaceTrack(next(self._ids), box, quality, now, self.vote_window)
+                self.tracks[track.track_id] = track
+                self.tracks_created += 1
+            else:
+                track.box = box
+                track.quality = quality
+                track.last_seen = now
+                track.hits += 1
+            tracks.append(track)
+
+        for track_id, track in list(self.tracks.items()):
+            if now - track.last_seen > self.max_age_seconds:
+                del self.tracks[track_id]
+
+        return tracks
+
+    def needs_encoding(self, track: FaceTrack, now: float) -> bool:
+        """Whether a track should be encoded and identified on this frame"""
+        if track.encoded_at is None:
+            return True
+        if track.user_id is None and len(track.votes) < self.vote_window:
+            return True
+        if self.reencode_seconds > 0 and now - track.encoded_at >= self.reencode_seconds:
+            return True
+        return track.quality >= track.encoded_quality * self.quality_gain > 0
+
+    def record_identity(self, track: FaceTrack, match: Optional[Tuple[int, float]], now: float) -> Optional[Dict]:
+        """
+        Add one identification to a track's vote
+
+        Args:
+            track: Track that was encoded on this frame
+            match: (user_id, confidence) from gallery matching, or None
+            now: Frame time in seconds (monotonic)
+
+        Returns:
+            Event dictionary when this vote confirms a user who is out of
+            cooldown, otherwise None
+        """
+        track.encoded_at = now
+        track.encoded_quality = track.quality
+        track.encodings += 1
+        self.encodings += 1
+        track.votes.append(tuple(match) if match else None)
+
+        counts = Counter(vote[0] for vote in track.votes if vote)
+        if not counts:
+            return None
+        user_id, votes = counts.most_common(1)[0]
+        if votes < self.vote_min:
+            return None
+
+        confidence = float(np.mean([vote[1] for vote in track.votes if vote and vote[0] == user_id]))
+        newly_confirmed = track.user_id != user_id
+        track.user_id, track.confidence = user_id, confidence
+        if not newly_confirmed:
+            return None
+
+        last_event = self._last_event.get(user_id)
+        if last_event is not None and now - last_event < self.event_cooldown_seconds:
+            return None
+        self._last_event[user_id] = now
+        self.events += 1
+
+        return {
+            'track_id': track.track_id,
+            'user_id': user_id,
+            'confidence': confidence,
+            'votes': votes,
+            'window': len(track.votes),
+            'first_seen': track.first_seen,
+            'confirmed_at': now
+        }
+
+    @property
+    def encodings_saved(self) -> int:
+        """Detections that were not encoded thanks to tracking"""
+        return self.detections - self.encodings
+
+    def stats(self) -> Dict:
+        return {
+            'active_tracks': len(self.tracks),
+            'tracks_created': self.tracks_created,
+            'detections': self.detections,
+            'encodings': self.encodings,
+            'encodings_saved': self.encodings_saved,
+            'events': self.events
+        }
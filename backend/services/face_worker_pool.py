@@ -0,0 +1,359 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Per-process service instance, built once by the pool initializer
+_worker_service = None
+
+
+class FaceWorkerPoolBusy(Exception):
+    """Raised when the pool already has its maximum number of queued tasks"""
+
+
+def _init_worker(config: Dict):
+    """Preload the configured face pipeline once per worker process"""
+    global _worker_service
+    from services.face_recognition_service import FaceRecognitionService
+    # Warm only the detector and encoder the config selects; MTCNN and
+    # DeepFace (TensorFlow) stay behind their LazyImport until a request uses them
+    _worker_service = FaceRecognitionService({**config, 'model_loading': 'lazy'})
+    _worker_service.warm_up(_worker_service.pipeline_models())
+
+
+def _decode_image(image_bytes: bytes):
+    import cv2
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+
+def _strip_face_data(faces_data: List[Dict]) -> List[Dict]:
+    """Drop pixel crops so only boxes and encodings cross the process boundary"""
+    return [
+        {key: value for key, value in face.items() if key != 'face_image'}
+        for face in faces_data
+    ]
+
+
+def detect_and_encode_image(
+    service,
+    image_bytes: bytes,
+    detection_method: str = 'dlib',
+    roi: Optional[List[Dict]] = None
+) -> Dict:
+    """
+    Decode raw image bytes and run detection + encoding
+
+    Args:
+        service: FaceRecognitionService to run the pipeline with
+        image_bytes: Encoded image (JPEG/PNG) as uploaded
+        detection_method: Face detection method
+        roi: Optional regions of the image to restrict detection to
+
+    Returns:
+        Dictionary with 'faces' and 'compute_seconds'
+    """
+    started = time.perf_counter()
+    image = _decode_image(image_bytes)
+    faces = []
+    if image is not None:
+        faces = _strip_face_data(service.detect_and_encode_faces(image, detection_method, roi))
+    return {'faces': faces, 'compute_seconds': time.perf_counter() - started}
+
+
+def detect_image(
+    service,
+    image_bytes: bytes,
+    detection_method: str = 'dlib',
+    roi: Optional[List[Dict]] = None
+) -> Dict:
+    """
+    Decode raw image bytes and run detection only
+
+    Args:
+        service: FaceRecognitionService to run the pipeline with
+        image_bytes: Encoded image (JPEG/PNG)
+        detection_method: Face detection method
+        roi: Optional regions of the image to restrict detection to
+
+    Returns:
+        Dictionary with 'faces' ('face_id', 'location', 'quality') and 'compute_seconds'
+    """
+    started = time.perf_counter()
+    image = _decode_image(image_bytes)
+    faces = []
+    if image is not None:
+        faces = [
+            {'face_id': i, 'location': location, 'quality': service.face_quality(image, location)}
+            for i, location in enumerate(service.detect_faces(image, method=detection_method, roi=roi))
+        ]
+    return {'faces': faces, 'compute_seconds': time.perf_counter() - started}
+
+
+def encode_image_faces(service, image_bytes: bytes, locations: List[Tuple[int, int, int, int]]) -> Dict:
+    """
+    Decode raw image bytes and encode faces at known locations
+
+    Args:
+        service: FaceRecognitionService to run the pipeline with
+        image_bytes: Encoded image (JPEG/PNG)
+        locations: (top, right, bottom, left) boxes to encode
+
+    Returns:
+        Dictionary with 'faces' aligned with locations ('encoding' is None
+        when encoding failed) and 'compute_seconds'
+    """
+    started = time.perf_counter()
+    image = _decode_image(image_bytes)
+    faces = []
+    for i, location in enumerate(locations):
+        encoding = service.encode_face(image, tuple(location)) if image is not None else None
+        faces.append({
+            'face_id': i,
+            'location': tuple(location),
+            'encoding': encoding.tolist() if encoding is not None else None
+        })
+    return {'faces': faces, 'compute_seconds': time.perf_counter() - started}
+
+
+def _worker_batch_task(func, images: List[bytes], *args) -> List[Dict]:
+    return [func(_worker_service, image, *args) for image in images]
+
+
+def _worker_ping() -> bool:
+    return _worker_service is not None
+
+
+class FaceWorkerPool:
+    """
+    Dedicated process pool for CPU-bound face detection and encoding
+
+    Keeps HOG/CNN detection and dlib encoding off the asyncio event loop so
+    a slow image never blocks unrelated endpoints. Each worker process builds
+    its own FaceRecognitionService once at startup; only raw image bytes go
+    in and boxes/encodings come back.
+
+    Args:
+        config: FaceRecognitionService config used in every worker
+        max_workers: Number of worker processes (0 runs in a thread of this process)
+        max_queue: Maximum in-flight tasks before submissions are rejected
+        start_method: multiprocessing start method ('spawn', 'fork', 'forkserver')
+        local_service: In-process service used when max_workers is 0
+    """
+
+    def __init__(
+        self,
+        config: Dict,
+        max_workers: int = 2,
+        max_queue: int = 32,
+        start_method: str = 'spawn',
+        local_service=None
+    ):
+        self.config = config
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.local_service = local_service
+
+        self.executor = None
+        if max_workers > 0:
+            self.executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context(start_method),
+                initializer=_init_worker,
+                initargs=(config,)
+            )
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._compute_times = deque(maxlen=1000)
+        self._wait_times = deque(maxlen=1000)
+
+        logger.info(f"Face worker pool initialized (workers: {max_workers}, queue: {max_queue})")
+
+    def warm_up(self):
+        """Start every worker process so models load before the first request"""
+        if self.executor is None:
+            return
+        futures = [self.executor.submit(_worker_ping) for _ in range(self.max_workers)]
+        for future in futures:
+            future.result()
+        logger.info("Face worker pool warmed up")
+
+    def _reserve(self, count: int):
+        with self._lock:
+            if self._pending + count > self.max_queue:
+                self._rejected += count
+                raise FaceWorkerPoolBusy(f"Face worker queue full ({self.max_queue} pending)")
+            self._pending += count
+
+    def _record(self, results: List[Dict], total_seconds: float):
+        with self._lock:
+            for result in results:
+                self._completed += 1
+                self._compute_times.append(result['compute_seconds'])
+                self._wait_times.append(max(total_seconds - result['compute_seconds'], 0.0))
+
+    async def _run(self, func, *args):
+        if self.executor is not None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        return await asyncio.to_thread(func, *args)
+
+    async def detect_and_encode(
+        self,
+        image_bytes: bytes,
+        detection_method: str = 'dlib',
+        roi: Optional[List[Dict]] = None
+    ) -> List[Dict]:
+        """
+        Detect and encode faces without blocking the event loop
+
+        Args:
+            image_bytes: Encoded image as uploaded
+            detection_method: Face detection method
+            roi: Optional regions of the image to restrict detection to
+
+        Returns:
+            List of face dictionaries with 'face_id', 'location' and 'encoding'
+
+        Raises:
+            FaceWorkerPoolBusy: If max_queue tasks are already in flight
+        """
+        faces_per_image = await self.detect_and_encode_batch([image_bytes], detection_method, roi)
+        return faces_per_image[0]
+
+    async def detect_and_encode_batch(
+        self,
+        images: List[bytes],
+        detection_method: str = 'dlib',
+        roi: Optional[List[Dict]] = None
+    ) -> List[List[Dict]]:
+        """
+        Detect and encode faces for several images at once
+
+        The batch is split into one task per worker so each process handles
+        a contiguous slice and IPC overhead is paid once per slice.
+
+        Args:
+            images: Encoded images as uploaded
+            detection_method: Face detection method
+            roi: Optional regions to restrict detection to, shared by all images
+
+        Returns:
+            List aligned with images of face dictionary lists
+
+        Raises:
+            FaceWorkerPoolBusy: If the batch does not fit in the queue
+        """
+        return await self._map(detect_and_encode_image, images, detection_method, roi)
+
+    async def detect(
+        self,
+        image_bytes: bytes,
+        detection_method: str = 'dlib',
+        roi: Optional[List[Dict]] = None
+    ) -> List[Dict]:
+        """
+        Detect faces without encoding them
+
+        Args:
+            image_bytes: Encoded image
+            detection_method: Face detection method
+            roi: Optional regions of the image to restrict detection to
+
+        Returns:
+            List of face dictionaries with 'face_id', 'location' and 'quality'
+
+        Raises:
+            FaceWorkerPoolBusy: If max_queue tasks are already in flight
+        """
+        faces_per_image = await self._map(detect_image, [image_bytes], detection_method, roi)
+        return faces_per_image[0]
+
+    async def encode(self, image_bytes: bytes, locations: List[Tuple[int, int, int, int]]) -> List[Dict]:
+        """
+        Encode faces at locations found by an earlier detect call
+
+        Args:
+            image_bytes: The same encoded image that was passed to detect
+            locations: (top, right, bottom, left) boxes to encode
+
+        Returns:
+            List aligned with locations of face dictionaries with 'encoding' (None on failure)
+
+        Raises:
+            FaceWorkerPoolBusy: If max_queue tasks are already in flight
+        """
+        faces_per_image = await self._map(encode_image_faces, [image_bytes], locations)
+        return faces_per_image[0]
+
+    async def _map(self, func, images: List[bytes], *args) -> List[List[Dict]]:
+        """Run func(service, image, *args) for every image and return each result's faces"""
+        self._reserve(len(images))
+
+        submitted = time.perf_counter()
+        try:
+            if self.executor is not None:
+                slices = max(1, min(self.max_workers, len(images)))
+                bounds = np.linspace(0, len(images), slices + 1).astype(int)
+                parts = await asyncio.gather(*(
+                    self._run(_worker_batch_task, func, images[start:end], *args)
+                    for start, end in zip(bounds[:-1], bounds[1:])
+                ))
+                results = [result for part in parts for result in part]
+            else:
+                results = await self._run(
+                    lambda: [func(self.local_service, image, *args) for image in images]
+                )
+        except Exception:
+            with self._lock:
+                self._failed += len(images)
+            raise
+        finally:
+            with self._lock:
+                self._pending -= len(images)
+
+        self._record(results, time.perf_counter() - submitted)
+        return [result['faces'] for result in results]
+
+    def stats(self) -> Dict:
+        """Pool size, queue depth and per-task timing"""
+        with self._lock:
+            compute = np.array(self._compute_times) * 1000.0
+            wait = np.array(self._wait_times) * 1000.0
+
+            def summary(values: np.ndarray) -> Optional[Dict]:
+                if len(values) == 0:
+                    return None
+                p50, p95 = np.percentile(values, [50, 95])
+                return {
+                    "mean_ms": round(float(values.mean()), 2),
+                    "p50_ms": round(float(p50), 2),
+                    "p95_ms": round(float(p95), 2)
+                }
+
+            return {
+                "pool_size": self.max_workers,
+                "queue_depth": self._pending,
+                "max_queue": self.max_queue,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "compute_time": summary(compute),
+                "queue_wait": summary(wait)
+            }
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
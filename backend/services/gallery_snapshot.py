@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+CURRENT_POINTER = 'CURRENT'
+ARRAY_NAMES = ('vectors', 'sq_norms', 'user_ids', 'encoding_ids')
+
+
+def save_gallery_snapshot(gallery, directory: str, headroom: float = 0.1, keep: int = 2) -> Path:
+    """
+    Write the gallery as a versioned on-disk snapshot
+
+    Each snapshot is a directory of .npy arrays plus a header.json holding
+    the row count and the FaceEncoding id / updated_at watermark. Arrays are
+    padded with spare rows so a memory-mapped gallery can absorb new
+    enrollments without copying. The CURRENT pointer is swapped atomically,
+    so readers never see a half-written snapshot.
+
+    Args:
+        gallery: FaceGallery to persist
+        directory: Snapshot root directory
+        headroom: Spare capacity as a fraction of the row count
+        keep: Number of snapshot generations to retain
+
+    Returns:
+        Path of the new snapshot directory
+    """
+    root = Path(directory)
+    root.mkdir(parents=True, exist_ok=True)
+
+    vectors, sq_norms, user_ids, encoding_ids = gallery.snapshot()
+    count = len(vectors)
+    capacity = count + max(1024, int(count * headroom))
+
+    name = f"gallery-{int(time.time() * 1000)}-{os.getpid()}"
+    staging = root / f".{name}.tmp"
+    staging.mkdir()
+
+    for array_name, array in zip(ARRAY_NAMES, (vectors, sq_norms, user_ids, encoding_ids)):
+        padded = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+        padded[:count] = array
+        np.save(staging / f"{array_name}.npy", padded)
+
+    header = {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'dimension': gallery.dimension,
+        'count': count,
+        'capacity': capacity,
+        'max_id': int(gallery.watermark['max_id']),
+        'max_updated_at': gallery.watermark['max_updated_at'],
+        'created_at': datetime.utcnow().isoformat()
+    }
+    (staging / 'header.json').write_text(json.dumps(header, indent=2))
+
+    snapshot_dir = root / name
+    staging.rename(snapshot_dir)
+
+    pointer_tmp = root / f".{CURRENT_POINTER}.{os.getpid()}"
+    pointer_tmp.write_text(name)
+    os.replace(pointer_tmp, root / CURRENT_POINTER)
+
+    generations = sorted(p for p in root.iterdir() if p.is_dir() and p.name.startswith('gallery-'))
+    for old in generations[:-keep]:
+        shutil.rmtree(old, ignore_errors=True)
+
+    logger.info(f"Face gallery snapshot written: {snapshot_dir} ({count} encodings)")
+    return snapshot_dir
+
+
+def load_gallery_snapshot(gallery, directory: str) -> Optional[Dict]:
+    """
+    Memory-map the current snapshot into the gallery
+
+    Arrays are opened copy-on-write, so worker processes share the pages
+    through the OS page cache until they append or update rows.
+
+    Args:
+        gallery: FaceGallery to attach the snapshot to
+        directory: Snapshot root directory
+
+    Returns:
+        Snapshot header, or None if no usable snapshot exists
+    """
+    root = Path(directory)
+    pointer = root / CURRENT_POINTER
+    if not pointer.exists():
+        return None
+
+    snapshot_dir = root / pointer.read_text().strip()
+    header = json.loads((snapshot_dir / 'header.json').read_text())
+    if header['format_version'] != SNAPSHOT_FORMAT_VERSION or header['dimension'] != gallery.dimension:
+        logger.warning(f"Ignoring incompatible face gallery snapshot {snapshot_dir}")
+        return None
+
+    arrays = [np.load(snapshot_dir / f"{name}.npy", mmap_mode='c') for name in ARRAY_NAMES]
+    gallery.attach(*arrays, count=header['count'])
+    gallery.watermark = {'max_id': header['max_id'], 'max_updated_at': header['max_updated_at']}
+    return header
+
+
+def apply_db_delta(gallery, db, check_deletions: bool = True) -> Dict:
+    """
+    Bring a snapshot-loaded gallery up to date with the database
+
+    Fetches only rows created or updated since the gallery watermark, and
+    optionally drops encodings deleted since (one id-only query).
+
+    Args:
+        gallery: FaceGallery loaded from a snapshot
+        db: SQLAlchemy session
+        check_deletions: Compare encoding ids with the table to find deletions
+
+    Returns:
+        Counts of changed and removed rows
+    """
+    from sqlalchemy import or_
+    from models.database_models import FaceEncoding
+
+    watermark = gallery.watermark
+    condition = FaceEncoding.id > watermark['max_id']
+    if watermark['max_updated_at']:
+        # >= re-reads rows sharing the boundary timestamp; upserts make that harmless
+        since = datetime.fromisoformat(watermark['max_updated_at'])
+        condition = or_(condition, FaceEncoding.updated_at >= since)
+
+    rows = db.query(
+        FaceEncoding.id,
+        FaceEncoding.user_id,
+        FaceEncoding.encoding_blob,
+        FaceEncoding.encoding_dim,
+        FaceEncoding.encoding_data,
+        FaceEncoding.updated_at
+    ).filter(condition).all()
+
+    if rows:
+        encoding_ids, user_ids, vectors = gallery.decode_rows(rows)
+        gallery.upsert_many(encoding_ids, user_ids, vectors)
+        gallery.watermark = gallery.watermark_for(rows, watermark)
+
+    removed = 0
+    if check_deletions:
+        ids = np.array([row[0] for row in db.query(FaceEncoding.id).all()], dtype=np.int64)
+        removed = gallery.retain(ids)
+
+    return {'changed': len(rows), 'removed': removed}
+
+
+def warm_start_gallery(gallery, db, directory: Optional[str], write_if_missing: bool = True) -> Dict:
+    """
+    Load the gallery from a snapshot plus DB delta, or fully from the DB
+
+    Args:
+        gallery: FaceGallery to populate
+        db: SQLAlchemy session
+        directory: Snapshot root directory, or None to always load from the DB
+        write_if_missing: Write a snapshot after a full DB load
+
+    Returns:
+        Description of how the gallery was loaded and how long it took
+    """
+    started = time.perf_counter()
+
+    header = None
+    if directory:
+        try:
+            header = load_gallery_snapshot(gallery, directory)
+        except Exception as e:
+            logger.error(f"Failed to load face gallery snapshot: {e}")
+
+    if header is not None:
+        delta = apply_db_delta(gallery, db)
+        result = {'source': 'snapshot', 'snapshot_count': header['count'], **delta}
+    else:
+        gallery.load_from_db(db)
+        result = {'source': 'database'}
+        if directory and write_if_missing:
+            try:
+                save_gallery_snapshot(gallery, directory)
+            except Exception as e:
+                logger.error(f"Failed to write face gallery snapshot: {e}")
+
+    result.update({'encodings': len(gallery), 'seconds': round(time.perf_counter() - started, 3)})
+    logger.info(f"Face gallery warm start: {result}")
+    return result
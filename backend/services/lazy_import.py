@@ -0,0 +1,62 @@
+import importlib
+import importlib.util
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Import durations of lazily loaded libraries, keyed by module name
+import_times: Dict[str, float] = {}
+_import_lock = threading.Lock()
+
+
+def is_installed(module_name: str) -> bool:
+    """Check whether a module can be imported without importing it"""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyImport:
+    """
+    Stand-in for a module (or an attribute of one) imported on first use
+
+    ``cv2 = LazyImport('cv2')`` or ``MTCNN = LazyImport('mtcnn', 'MTCNN')``
+    keep call sites unchanged while deferring heavy imports such as
+    TensorFlow until a face request or an explicit warm-up needs them.
+    """
+
+    def __init__(self, module_name: str, attribute: Optional[str] = None):
+        self._module_name = module_name
+        self._attribute = attribute
+        self._target = None
+
+    def load(self):
+        """Import the target now and return it"""
+        if self._target is None:
+            with _import_lock:
+                if self._target is None:
+                    started = time.perf_counter()
+                    target = importlib.import_module(self._module_name)
+                    if self._module_name not in import_times:
+                        import_times[self._module_name] = time.perf_counter() - started
+                        logger.info(
+                            f"Imported {self._module_name} in {import_times[self._module_name]:.2f}s"
+                        )
+                    if self._attribute:
+                        target = getattr(target, self._attribute)
+                    self._target = target
+        return self._target
+
+    @property
+    def loaded(self) -> bool:
+        return self._target is not None
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
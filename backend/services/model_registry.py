@@ -0,0 +1,88 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of detector and recognition model objects
+
+    Each model is built once per process (or once per thread for backends
+    that are not safe to share across threads) the first time it is
+    requested, and its load time is recorded. Later lookups are a dict
+    access with no model-loading I/O.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._models: Dict[str, Any] = {}
+        self._local = threading.local()
+        self._load_stats: Dict[str, Dict] = {}
+
+    def _key_lock(self, name: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(name, threading.Lock())
+
+    def _build(self, name: str, factory: Callable[[], Any], per_thread: bool) -> Any:
+        started = time.perf_counter()
+        model = factory()
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            stats = self._load_stats.setdefault(name, {
+                "per_thread": per_thread,
+                "instances": 0,
+                "load_seconds": []
+            })
+            stats["instances"] += 1
+            stats["load_seconds"].append(round(elapsed, 4))
+            stats["loaded_at"] = datetime.utcnow().isoformat()
+
+        logger.info(f"Loaded model '{name}' in {elapsed:.2f}s")
+        return model
+
+    def get(self, name: str, factory: Callable[[], Any], per_thread: bool = False) -> Any:
+        """
+        Get a model, building it on first use
+
+        Args:
+            name: Registry key, e.g. 'haar_cascade' or 'deepface:Facenet'
+            factory: Zero-argument callable that builds the model
+            per_thread: Keep one instance per thread instead of per process
+
+        Returns:
+            The cached model object
+        """
+        if per_thread:
+            models = getattr(self._local, 'models', None)
+            if models is None:
+                models = self._local.models = {}
+            if name not in models:
+                models[name] = self._build(name, factory, per_thread=True)
+            return models[name]
+
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._key_lock(name):
+            if name not in self._models:
+                self._models[name] = self._build(name, factory, per_thread=False)
+            return self._models[name]
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models or name in getattr(self._local, 'models', {})
+
+    def stats(self) -> Dict[str, Dict]:
+        """Load times and instance counts per model"""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._load_stats.items()}
+
+
+# Shared by every FaceRecognitionService in this process
+default_registry = ModelRegistry()
@@ -0,0 +1,133 @@
+import logging
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from .lazy_import import LazyImport
+
+cv2 = LazyImport('cv2')
+
+logger = logging.getLogger(__name__)
+
+
+class MotionGate:
+    """
+    Cheap change detector run before face detection
+
+    Frames are reduced to a small blurred grayscale copy and compared with
+    either the previous frame ('diff') or a running-average background
+    ('background'). A frame passes the gate when the share of pixels that
+    changed by more than ``threshold`` grey levels reaches ``min_area``.
+    Static frames are skipped, except that one frame is let through every
+    ``max_idle_seconds`` so a person standing still is still seen.
+
+    Per-camera settings come from Camera.camera_metadata['motion'], e.g.
+    {"enabled": true, "threshold": 25, "min_area": 0.01, "mode": "background"}.
+
+    Args:
+        mode: 'diff' or 'background'
+        threshold: Grey-level change counted as motion for a pixel
+        min_area: Share of changed pixels needed to pass the gate
+        width: Width of the analysed copy in pixels
+        background_alpha: Learning rate of the background model
+        max_idle_seconds: Let one frame through after this long without motion (0 = never)
+    """
+
+    def __init__(
+        self,
+        mode: str = 'background',
+        threshold: int = 25,
+        min_area: float = 0.01,
+        width: int = 160,
+        background_alpha: float = 0.05,
+        max_idle_seconds: float = 10.0
+    ):
+        if mode not in ('diff', 'background'):
+            raise ValueError(f"Unknown motion gate mode: {mode}")
+        self.mode = mode
+        self.threshold = threshold
+        self.min_area = min_area
+        self.width = width
+        self.background_alpha = background_alpha
+        self.max_idle_seconds = max_idle_seconds
+
+        self._reference = None
+        self._last_pass = 0.0
+        self.frames_checked = 0
+        self.frames_skipped = 0
+        self.last_change = 0.0
+
+    @classmethod
+    def from_metadata(cls, metadata: Optional[Dict], defaults: Optional[Dict] = None) -> Optional['MotionGate']:
+        """
+        Build a gate from a camera's camera_metadata
+
+        Args:
+            metadata: Camera.camera_metadata (may be None)
+            defaults: Settings applied when the camera does not override them
+
+        Returns:
+            MotionGate, or None when gating is disabled for the camera
+        """
+        options = {**(defaults or {}), **((metadata or {}).get('motion') or {})}
+        if not options.pop('enabled', True):
+            return None
+        known = ('mode', 'threshold', 'min_area', 'width', 'background_alpha', 'max_idle_seconds')
+        return cls(**{key: value for key, value in options.items() if key in known})
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        height = max(1, int(frame.shape[0] * self.width / frame.shape[1]))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0).astype(np.float32)
+
+    def check(self, frame: np.ndarray) -> bool:
+        """
+        Whether a frame changed enough to be worth running detection on
+
+        Args:
+            frame: BGR or grayscale frame
+
+        Returns:
+            True if detection should run on the frame
+        """
+        gray = self._prepare(frame)
+        self.frames_checked += 1
+        now = time.monotonic()
+
+        if self._reference is None or self._reference.shape != gray.shape:
+            self._reference = gray
+            self._last_pass = now
+            return True
+
+        changed = np.abs(gray - self._reference) > self.threshold
+        self.last_change = float(changed.mean())
+
+        if self.mode == 'background':
+            cv2.accumulateWeighted(gray, self._reference, self.background_alpha)
+        else:
+            self._reference = gray
+
+        idle_expired = self.max_idle_seconds > 0 and now - self._last_pass >= self.max_idle_seconds
+        if self.last_change >= self.min_area or idle_expired:
+            self._last_pass = now
+            return True
+
+        self.frames_skipped += 1
+        return False
+
+    @property
+    def skip_ratio(self) -> float:
+        """Share of checked frames that skipped detection"""
+        return self.frames_skipped / self.frames_checked if self.frames_checked else 0.0
+
+    def stats(self) -> Dict:
+        return {
+            'mode': self.mode,
+            'frames_checked': self.frames_checked,
+            'frames_skipped': self.frames_skipped,
+            'skip_ratio': round(self.skip_ratio, 3),
+            'last_change': round(self.last_change, 4)
+        }
@@ -0,0 +1,99 @@
+import logging
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class OpenSessionIndex:
+    """
+    In-process index of today's open attendance sessions
+
+    Maps user_id -> (record id, check_in_time) for records of the current
+    UTC day with no check-out. It is loaded from the database on first use
+    and again whenever the day changes, and kept up to date by every write
+    this process makes.
+
+    Other processes may write too, so the index is a cache: callers either
+    run as the only writer and trust it, or verify what it says (see
+    AttendanceService). The partial unique index on
+    (user_id, attendance_date) WHERE check_out_time IS NULL is what
+    guarantees one open session per user per day across processes.
+
+    Args:
+        session_factory: Callable returning a SQLAlchemy session
+    """
+
+    def __init__(self, session_factory: Callable):
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._day: Optional[date] = None
+        self._sessions: Dict[int, Tuple[int, datetime]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    def rebuild(self, day: Optional[date] = None):
+        """Load the open sessions of a day (defaults to today, UTC)"""
+        from models.database_models import AttendanceRecord
+
+        day = day or datetime.utcnow().date()
+        day_start = datetime.combine(day, time.min)
+        with self.session_factory() as db:
+            rows = db.query(
+                AttendanceRecord.user_id,
+                AttendanceRecord.id,
+                AttendanceRecord.check_in_time
+            ).filter(
+                AttendanceRecord.check_in_time >= day_start,
+                AttendanceRecord.check_in_time < day_start + timedelta(days=1),
+                AttendanceRecord.check_out_time == None
+            ).all()
+
+        with self._lock:
+            self._day = day
+            self._sessions = {user_id: (record_id, check_in_time) for user_id, record_id, check_in_time in rows}
+            self.rebuilds += 1
+        logger.info(f"Open session index loaded for {day}: {len(rows)} open sessions")
+
+    def _current(self, when: datetime):
+        if when.date() != self._day:
+            self.rebuild(when.date())
+
+    def get(self, user_id: int, when: datetime) -> Optional[Tuple[int, datetime]]:
+        """Open (record id, check_in_time) of a user on when's day (see covers)"""
+        self._current(when)
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return session
+
+    def covers(self, when: datetime) -> bool:
+        """Whether when falls on today (UTC), the only day that is indexed"""
+        return when.date() == datetime.utcnow().date()
+
+    def opened(self, user_id: int, record_id: int, check_in_time: datetime):
+        if check_in_time.date() != self._day:
+            return
+        with self._lock:
+            self._sessions[user_id] = (record_id, check_in_time)
+
+    def closed(self, user_id: int, record_id: Optional[int] = None):
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is not None and (record_id is None or session[0] == record_id):
+                del self._sessions[user_id]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'day': self._day.isoformat() if self._day else None,
+                'open_sessions': len(self._sessions),
+                'hits': self.hits,
+                'misses': self.misses,
+                'rebuilds': self.rebuilds
+            }
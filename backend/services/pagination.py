@@ -0,0 +1,183 @@
+import base64
+import binascii
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_
+
+logger = logging.getLogger(__name__)
+
+
+def encode_cursor(kind: str, values: Sequence) -> str:
+    """
+    Opaque page token for the row a page ended on
+
+    Args:
+        kind: Listing the cursor belongs to, checked when it is decoded
+        values: The row's sort key, e.g. (check_in_time, id)
+
+    Returns:
+        URL-safe base64 token
+    """
+    payload = {
+        'k': kind,
+        'v': [{'dt': value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token: str, kind: str, columns: Sequence) -> List:
+    """
+    Sort key stored in a token from encode_cursor
+
+    Args:
+        token: Token from a previous page
+        kind: Listing the token must belong to
+        columns: The listing's sort columns; the key must have one value of each column's type
+
+    Returns:
+        The sort key values
+
+    Raises:
+        ValueError: If the token is malformed or belongs to another listing
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        listing = payload['k']
+        values = [
+            datetime.fromisoformat(value['dt']) if isinstance(value, dict) else value
+            for value in payload['v']
+        ]
+    except (binascii.Error, UnicodeDecodeError, KeyError, TypeError, ValueError):
+        # ValueError covers bad JSON and bad datetimes
+        raise ValueError("Invalid cursor")
+    if listing != kind:
+        raise ValueError(f"Cursor belongs to another listing ({listing})")
+
+    types = [column.type.python_type for column in columns]
+    # bool is an int subclass, but never a sort key
+    if len(values) != len(types) or any(
+        isinstance(value, bool) or not isinstance(value, expected)
+        for value, expected in zip(values, types)
+    ):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_after(columns: Sequence, values: Sequence, descending: bool = False):
+    """
+    Filter for rows strictly after a sort key in ORDER BY columns order
+
+    Expanded to a = :a AND b > :b OR a > :a form with a redundant bound on
+    the leading column (a >= :a), so the leading column narrows an index
+    range scan on every backend instead of relying on row-value support.
+
+    Args:
+        columns: Sort columns, most significant first, ending in a unique one
+        values: Sort key of the last row already returned
+        descending: Whether the listing sorts in descending order
+
+    Returns:
+        SQLAlchemy boolean expression
+    """
+    def after(column, value):
+        return column < value if descending else column > value
+
+    condition = after(columns[-1], values[-1])
+    for column, value in zip(reversed(columns[:-1]), reversed(values[:-1])):
+        condition = or_(after(column, value), and_(column == value, condition))
+    if len(columns) > 1:
+        leading = columns[0] <= values[0] if descending else columns[0] >= values[0]
+        condition = and_(leading, condition)
+    return condition
+
+
+def keyset_page(
+    query,
+    columns: Sequence,
+    limit: int,
+    after: Optional[Sequence] = None,
+    descending: bool = False
+) -> Tuple[List, bool]:
+    """
+    One page of a query ordered by columns, starting after a sort key
+
+    Cost depends on the page size, not on how deep the page is, as long as
+    an index matches the filters and the sort columns.
+
+    Args:
+        query: SQLAlchemy query with the listing's filters applied
+        columns: Sort columns, most significant first, ending in a unique one
+        limit: Page size
+        after: Sort key of the previous page's last row (None for the first page)
+        descending: Sort in descending order
+
+    Returns:
+        Tuple of (rows, whether more rows follow)
+    """
+    if after is not None:
+        query = query.filter(keyset_after(columns, after, descending))
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+    rows = query.limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+
+def estimate_count(db, query) -> Optional[int]:
+    """
+    Row count estimated by the PostgreSQL planner, without counting
+
+    Args:
+        db: SQLAlchemy session
+        query: SQLAlchemy query with the listing's filters applied
+
+    Returns:
+        Estimated rows, or None on databases without planner estimates
+    """
+    bind = db.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return None
+    compiled = query.statement.compile(dialect=bind.dialect)
+    plan = db.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class CountCache:
+    """
+    Exact counts remembered for a few seconds per listing filter
+
+    Paging through a listing with its total asks for the same count on
+    every page; it is computed once per ``ttl_seconds`` instead.
+
+    Args:
+        ttl_seconds: How long a count is reused
+        max_entries: Filters remembered before the oldest are dropped
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._counts: Dict[Hashable, Tuple[float, int]] = {}
+
+    def get(self, key: Hashable, count: Callable[[], int]) -> int:
+        """Cached count for key, computed with count() when missing or stale"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._counts.get(key)
+            if cached is not None and cached[0] > now:
+                return cached[1]
+
+        value = count()
+        with self._lock:
+            if len(self._counts) >= self.max_entries:
+                for stale in sorted(self._counts, key=lambda k: self._counts[k][0])[:len(self._counts) // 4 + 1]:
+                    del self._counts[stale]
+            self._counts[key] = (now + self.ttl_seconds, value)
+        return value
@@ -0,0 +1,99 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .lazy_import import LazyImport
+
+cv2 = LazyImport('cv2')
+
+
+def parse_roi(roi: Optional[Sequence[Dict]], frame_shape: Tuple[int, ...]) -> List[Dict]:
+    """
+    Resolve camera ROI definitions to pixel regions of a frame
+
+    Regions are stored in Camera.camera_metadata['roi'] as a list of
+    {"rect": [x, y, width, height]} or {"polygon": [[x, y], ...]} entries.
+    Coordinates that are all within [0, 1] are read as fractions of the
+    frame size, anything else as pixels.
+
+    Args:
+        roi: Region definitions, or None for the whole frame
+        frame_shape: Shape of the frame the regions apply to
+
+    Returns:
+        List of {'box': (x0, y0, x1, y1), 'polygon': int32 points or None},
+        clipped to the frame; empty regions are dropped
+    """
+    height, width = frame_shape[:2]
+    regions = []
+
+    for region in roi or []:
+        if 'rect' in region:
+            x, y, w, h = (float(v) for v in region['rect'])
+            points = np.array([[x, y], [x + w, y], [x + w, y + h], [x, y + h]], dtype=np.float64)
+            is_polygon = False
+        elif 'polygon' in region:
+            points = np.array(region['polygon'], dtype=np.float64).reshape(-1, 2)
+            is_polygon = len(points) >= 3
+        else:
+            raise ValueError(f"ROI region needs 'rect' or 'polygon': {region}")
+
+        if len(points) and points.max() <= 1.0:
+            points = points * [width, height]
+
+        x0, y0 = np.floor(points.min(axis=0)).astype(int)
+        x1, y1 = np.ceil(points.max(axis=0)).astype(int)
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(width, x1), min(height, y1)
+        if x1 <= x0 or y1 <= y0:
+            continue
+
+        regions.append({
+            'box': (int(x0), int(y0), int(x1), int(y1)),
+            'polygon': np.round(points).astype(np.int32) if is_polygon else None
+        })
+
+    return regions
+
+
+def roi_area_ratio(regions: List[Dict], frame_shape: Tuple[int, ...]) -> float:
+    """Share of the frame covered by the regions' bounding boxes"""
+    height, width = frame_shape[:2]
+    area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in (r['box'] for r in regions))
+    return min(1.0, area / float(width * height)) if width and height else 0.0
+
+
+def crop_region(image: np.ndarray, region: Dict) -> np.ndarray:
+    """
+    Contiguous crop of a region's bounding box
+
+    Pixels outside a polygon are blanked so detectors do not fire there.
+    """
+    x0, y0, x1, y1 = region['box']
+    crop = np.ascontiguousarray(image[y0:y1, x0:x1])
+
+    if region['polygon'] is not None:
+        mask = np.zeros(crop.shape[:2], dtype=np.uint8)
+        cv2.fillPoly(mask, [region['polygon'] - [x0, y0]], 255)
+        crop[mask == 0] = 0
+
+    return crop
+
+
+def box_center_inside(location: Tuple[int, int, int, int], region: Dict) -> bool:
+    """Whether a (top, right, bottom, left) box is centred inside a region"""
+    top, right, bottom, left = location
+    cx, cy = (left + right) / 2.0, (top + bottom) / 2.0
+    if region['polygon'] is None:
+        x0, y0, x1, y1 = region['box']
+        return x0 <= cx < x1 and y0 <= cy < y1
+    return cv2.pointPolygonTest(region['polygon'].reshape(-1, 1, 2), (float(cx), float(cy)), False) >= 0
+
+
+def box_iou(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+    """Intersection over union of two (top, right, bottom, left) boxes"""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    intersection = max(0, bottom - top) * max(0, right - left)
+    union = (a[2] - a[0]) * (a[1] - a[3]) + (b[2] - b[0]) * (b[1] - b[3]) - intersection
+    return intersection / union if union > 0 else 0.0
@@ -0,0 +1,261 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.strip().split(':')[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def _room_key(value: Optional[str]) -> Optional[str]:
+    return value.strip().lower() if value else None
+
+
+def roster_user_ids(db, course_code: Optional[str], teacher_id: Optional[int]) -> List[int]:
+    """
+    Users expected at a scheduled session
+
+    Args:
+        db: SQLAlchemy session
+        course_code: Schedule.course_code; active users with User.course equal to it
+        teacher_id: Schedule.teacher_id, added when set
+
+    Returns:
+        Sorted, de-duplicated user ids
+    """
+    from models.database_models import User
+
+    user_ids = set()
+    if course_code:
+        user_ids.update(
+            row[0] for row in db.query(User.id).filter(
+                User.course == course_code,
+                User.is_active == True
+            ).all()
+        )
+    if teacher_id:
+        user_ids.add(teacher_id)
+    return sorted(user_ids)
+
+
+class ScheduleScope:
+    """
+    Narrow face matching to the people expected in a camera's room
+
+    Active schedules are indexed by room and weekday. A recognition request
+    from a camera is mapped through Camera.location to the session running
+    in that room right now, and matched first against the encodings of
+    that session's students (User.course == Schedule.course_code) plus its
+    teacher. Only when nothing in that subset is within tolerance does the
+    request fall back to the whole gallery.
+
+    The room index, camera locations and per-session gallery rows are all
+    cached, so a scoped request normally makes no database queries. When a
+    cache expires, current_slot, candidate_rows and match_batch query the
+    database synchronously, so async callers run them with asyncio.to_thread.
+
+    Args:
+        session_factory: Callable returning a new SQLAlchemy session
+        gallery: FaceGallery to take candidate rows from
+        grace_minutes: Minutes before start / after end a session still applies
+        cache_seconds: Lifetime of the room index and candidate caches
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        gallery,
+        grace_minutes: int = 10,
+        cache_seconds: float = 300.0
+    ):
+        self.session_factory = session_factory
+        self.gallery = gallery
+        self.grace_minutes = grace_minutes
+        self.cache_seconds = cache_seconds
+
+        self._lock = threading.Lock()
+        self._room_index: Dict[Tuple[str, int], List[Dict]] = {}
+        self._camera_rooms: Dict[int, Optional[str]] = {}
+        self._index_loaded_at = 0.0
+        # schedule id -> (user ids, loaded_at)
+        self._slot_users: Dict[int, Tuple[np.ndarray, float]] = {}
+        # schedule id -> (gallery layout version, gallery size, rows)
+        self._slot_rows: Dict[int, Tuple[int, int, np.ndarray]] = {}
+
+        self._scoped_matches = 0
+        self._fallbacks = 0
+        self._unscoped = 0
+
+    def _refresh_index(self):
+        from models.database_models import Camera, Schedule
+
+        with self.session_factory() as db:
+            schedules = db.query(
+                Schedule.id,
+                Schedule.day_of_week,
+                Schedule.start_time,
+                Schedule.end_time,
+                Schedule.course_code,
+                Schedule.room_number,
+                Schedule.teacher_id
+            ).filter(Schedule.is_active == True, Schedule.room_number.isnot(None)).all()
+            cameras = db.query(Camera.id, Camera.location).all()
+
+        room_index = defaultdict(list)
+        for schedule_id, day, start, end, course_code, room, teacher_id in schedules:
+            try:
+                slot = {
+                    'schedule_id': schedule_id,
+                    'start': _minutes(start),
+                    'end': _minutes(end),
+                    'course_code': course_code,
+                    'teacher_id': teacher_id
+                }
+            except ValueError:
+                logger.warning(f"Skipping schedule {schedule_id} with invalid times {start}-{end}")
+                continue
+            room_index[(_room_key(room), day)].append(slot)
+
+        with self._lock:
+            self._room_index = dict(room_index)
+            self._camera_rooms = {camera_id: _room_key(location) for camera_id, location in cameras}
+            self._index_loaded_at = time.monotonic()
+            self._slot_users.clear()
+            self._slot_rows.clear()
+
+        logger.info(f"Schedule scope index loaded: {len(schedules)} sessions, {len(cameras)} cameras")
+
+    def invalidate(self):
+        """Drop every cache, e.g. after schedules or cameras change"""
+        with self._lock:
+            self._index_loaded_at = 0.0
+
+    def current_slot(self, camera_id: int, when: Optional[datetime] = None) -> Optional[Dict]:
+        """
+        The session running in a camera's room at a given time
+
+        Args:
+            camera_id: Camera the frame came from
+            when: Local wall-clock time (defaults to now)
+
+        Returns:
+            Schedule slot dictionary, or None if the room has no session
+        """
+        age = time.monotonic() - self._index_loaded_at
+        if age > self.cache_seconds or (camera_id not in self._camera_rooms and age > 30):
+            # Also picks up cameras registered since the last refresh
+            self._refresh_index()
+
+        room = self._camera_rooms.get(camera_id)
+        if room is None:
+            return None
+
+        when = when or datetime.now()
+        minute = when.hour * 60 + when.minute
+        slots = self._room_index.get((room, when.weekday()), [])
+        for slot in slots:
+            if slot['start'] - self.grace_minutes <= minute <= slot['end'] + self.grace_minutes:
+                return slot
+        return None
+
+    def _users_for_slot(self, slot: Dict) -> np.ndarray:
+        cached = self._slot_users.get(slot['schedule_id'])
+        if cached is not None and time.monotonic() - cached[1] <= self.cache_seconds:
+            return cached[0]
+
+        user_ids = [slot['teacher_id']] if slot['teacher_id'] else []
+        if slot['course_code']:
+            with self.session_factory() as db:
+                user_ids = roster_user_ids(db, slot['course_code'], slot['teacher_id'])
+
+        users = np.array(user_ids, dtype=np.int64)
+        with self._lock:
+            self._slot_users[slot['schedule_id']] = (users, time.monotonic())
+        return users
+
+    def candidate_rows(self, camera_id: Optional[int], when: Optional[datetime] = None) -> Optional[np.ndarray]:
+        """
+        Gallery positions of the people expected in front of a camera
+
+        Returns:
+            Row positions, or None when the request cannot be scoped
+        """
+        if camera_id is None:
+            return None
+
+        slot = self.current_slot(camera_id, when)
+        if slot is None:
+            return None
+
+        key = (self.gallery.layout_version, len(self.gallery))
+        cached = self._slot_rows.get(slot['schedule_id'])
+        if cached is not None and cached[:2] == key:
+            return cached[2]
+
+        rows = self.gallery.rows_for_users(self._users_for_slot(slot))
+        with self._lock:
+            self._slot_rows[slot['schedule_id']] = (*key, rows)
+        return rows
+
+    def match_batch(
+        self,
+        face_encodings: np.ndarray,
+        tolerance: float,
+        camera_id: Optional[int],
+        when: Optional[datetime] = None
+    ) -> List[Optional[Tuple[int, float]]]:
+        """
+        Match encodings against the session candidates, then the whole gallery
+
+        Args:
+            face_encodings: N x D matrix of face encodings
+            tolerance: Maximum accepted distance
+            camera_id: Camera the frames came from, or None for a full search
+            when: Local wall-clock time of the frames (defaults to now)
+
+        Returns:
+            List of (user_id, confidence) or None, one per encoding
+        """
+        rows = None
+        try:
+            rows = self.candidate_rows(camera_id, when)
+        except Exception as e:
+            logger.error(f"Schedule scope lookup failed: {e}")
+
+        if rows is None or len(rows) == 0:
+            with self._lock:
+                self._unscoped += len(face_encodings)
+            return self.gallery.match_batch(face_encodings, tolerance)
+
+        results = self.gallery.match_batch(face_encodings, tolerance, rows=rows)
+        missed = [i for i, result in enumerate(results) if result is None]
+        if missed:
+            fallback = self.gallery.match_batch(np.asarray(face_encodings)[missed], tolerance)
+            for i, result in zip(missed, fallback):
+                results[i] = result
+
+        with self._lock:
+            self._scoped_matches += len(face_encodings) - len(missed)
+            self._fallbacks += len(missed)
+        return results
+
+    def stats(self) -> Dict:
+        """Scoped vs. fallback counts and cache sizes"""
+        with self._lock:
+            return {
+                "scoped_matches": self._scoped_matches,
+                "fallbacks": self._fallbacks,
+                "unscoped": self._unscoped,
+                "rooms": len({room for room, _ in self._room_index}),
+                "cached_slots": len(self._slot_rows),
+                "index_age_seconds": round(time.monotonic() - self._index_loaded_at, 1)
+                if self._index_loaded_at else None
+            }
@@ -0,0 +1,428 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from .face_gallery import FaceGallery
+
+try:
+    import fcntl
+except ImportError:
+    # Native Windows has no flock; galleries cannot be shared between processes there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Whether SharedFaceGallery can be used on this platform
+SHARED_GALLERY_SUPPORTED = fcntl is not None
+
+# Odd-generation retries before a reader checks whether the writer is still alive
+_WRITER_CHECK_RETRIES = 100
+
+SHARED_GALLERY_MAGIC = 0x46414345474C5259  # "FACEGLRY"
+
+# Slots of the int64 header array
+_MAGIC, _GENERATION, _COUNT, _CAPACITY, _DIMENSION, _INITIALIZED, _LAYOUT, _MAX_ID, _MAX_UPDATED_US = range(9)
+_HEADER_SLOTS = 16
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class SharedGalleryUnavailable(RuntimeError):
+    """Raised when a consistent read of the shared gallery is not possible"""
+
+
+class SharedFaceGallery(FaceGallery):
+    """
+    Face gallery stored in memory-mapped files shared by all workers
+
+    Every uvicorn worker on the box maps the same files (by default under
+    /dev/shm), so gallery memory does not grow with the worker count and
+    an enrollment in one worker is visible to the others as soon as it is
+    published.
+
+    Writes follow a single-writer protocol: a writer holds an exclusive
+    flock on the gallery directory and brackets its changes with two
+    increments of a generation counter (odd while writing). Readers take
+    the generation before and after a scan and retry if it was odd or
+    changed, so they never act on a half-written update. A reader that
+    keeps seeing an odd generation checks whether the flock is still held;
+    if it is not, the writer died mid-update, so the gallery is marked
+    unloaded (to be reloaded by the next initialize or load_from_db) and
+    the read fails instead of waiting forever. A read also fails after
+    ``read_timeout`` seconds without a consistent view.
+
+    Each worker keeps its own ANN index over the shared rows and rebuilds
+    it when another worker compacts the gallery.
+
+    Args:
+        path: Directory holding the shared files
+        dimension: Encoding length
+        initial_capacity: Rows allocated when the files are created
+        index_factory: Optional ANN index factory, built per worker
+        index_min_size: Gallery size below which no index is used
+        read_timeout: Longest a read waits for a writer before raising
+        match_reduction: How users with several encodings are scored (see FaceGallery)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dimension: int = 128,
+        initial_capacity: int = 65536,
+        index_factory: Optional[Callable] = None,
+        index_min_size: int = 20000,
+        read_timeout: float = 5.0,
+        match_reduction: str = 'min'
+    ):
+        if not SHARED_GALLERY_SUPPORTED:
+            raise RuntimeError("Shared face galleries need fcntl.flock, which this platform does not provide")
+
+        if match_reduction not in ('min', 'centroid'):
+            raise ValueError(f"Unknown reduction: {match_reduction}")
+        self.match_reduction = match_reduction
+        self.dimension = dimension
+        self.read_timeout = read_timeout
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._writer_depth = threading.local()
+        self._lock_file = open(self.path / 'lock', 'a+')
+
+        self._index_factory = index_factory
+        self.index_min_size = index_min_size
+        self._index = None
+        self._index_building = False
+        self._seen_layout = None
+        self._user_groups = None
+        self._mapped_capacity = 0
+
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            self._create_files(max(initial_capacity, 1))
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._map()
+
+    # -- storage ---------------------------------------------------------------
+
+    def _file(self, name: str) -> Path:
+        return self.path / name
+
+    def _create_files(self, capacity: int):
+        header_path = self._file('header.i64')
+        if header_path.exists() and header_path.stat().st_size == _HEADER_SLOTS * 8:
+            header = np.memmap(header_path, dtype=np.int64, mode='r+', shape=(_HEADER_SLOTS,))
+            if header[_MAGIC] == SHARED_GALLERY_MAGIC:
+                if header[_DIMENSION] != self.dimension:
+                    raise ValueError(
+                        f"Shared gallery at {self.path} has dimension {header[_DIMENSION]}, "
+                        f"expected {self.dimension}"
+                    )
+                if header[_GENERATION] % 2:
+                    # A writer died mid-update; contents are rebuilt on initialize()
+                    header[_GENERATION] += 1
+                    header[_INITIALIZED] = 0
+                return
+
+        self._resize_files(capacity)
+        header = np.memmap(header_path, dtype=np.int64, mode='w+', shape=(_HEADER_SLOTS,))
+        header[:] = 0
+        header[_CAPACITY] = capacity
+        header[_DIMENSION] = self.dimension
+        header[_MAGIC] = SHARED_GALLERY_MAGIC
+        header.flush()
+
+    def _resize_files(self, capacity: int):
+        # Files only ever grow, so mappings held by other workers stay valid
+        for name, row_bytes in (
+            ('vectors.f32', 4 * self.dimension),
+            ('sq_norms.f32', 4),
+            ('user_ids.i64', 8),
+            ('encoding_ids.i64', 8)
+        ):
+            path = self._file(name)
+            with open(path, 'ab') as f:
+                if f.tell() < capacity * row_bytes:
+                    f.truncate(capacity * row_bytes)
+
+    def _map(self):
+        self._header = np.memmap(self._file('header.i64'), dtype=np.int64, mode='r+', shape=(_HEADER_SLOTS,))
+        capacity = int(self._header[_CAPACITY])
+        self._shared_vectors = np.memmap(
+            self._file('vectors.f32'), dtype=np.float32, mode='r+', shape=(capacity, self.dimension)
+        )
+        self._shared_sq_norms = np.memmap(self._file('sq_norms.f32'), dtype=np.float32, mode='r+', shape=(capacity,))
+        self._shared_user_ids = np.memmap(self._file('user_ids.i64'), dtype=np.int64, mode='r+', shape=(capacity,))
+        self._shared_encoding_ids = np.memmap(
+            self._file('encoding_ids.i64'), dtype=np.int64, mode='r+', shape=(capacity,)
+        )
+        self._mapped_capacity = capacity
+
+    def _ensure_mapped(self):
+        if int(self._header[_CAPACITY]) != self._mapped_capacity:
+            with self._lock:
+                if int(self._header[_CAPACITY]) != self._mapped_capacity:
+                    self._map()
+
+    @property
+    def _vectors(self):
+        self._ensure_mapped()
+        return self._shared_vectors
+
+    @property
+    def _sq_norms(self):
+        self._ensure_mapped()
+        return self._shared_sq_norms
+
+    @property
+    def _user_ids(self):
+        self._ensure_mapped()
+        return self._shared_user_ids
+
+    @property
+    def _encoding_ids(self):
+        self._ensure_mapped()
+        return self._shared_encoding_ids
+
+    def _allocate(self, capacity: int):
+        if capacity > self._mapped_capacity:
+            self._grow(capacity)
+
+    def _grow(self, min_capacity: int):
+        capacity = max(self._mapped_capacity, 1)
+        while capacity < min_capacity:
+            capacity *= 2
+        self._resize_files(capacity)
+        self._header[_CAPACITY] = capacity
+        self._map()
+        logger.info(f"Shared face gallery grown to {capacity} rows")
+
+    # -- header-backed state ---------------------------------------------------
+
+    @property
+    def _size(self) -> int:
+        return int(self._header[_COUNT])
+
+    @_size.setter
+    def _size(self, value: int):
+        self._header[_COUNT] = value
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._header[_INITIALIZED])
+
+    @loaded.setter
+    def loaded(self, value: bool):
+        self._header[_INITIALIZED] = int(value)
+
+    @property
+    def _layout_version(self) -> int:
+        return int(self._header[_LAYOUT])
+
+    @_layout_version.setter
+    def _layout_version(self, value: int):
+        self._header[_LAYOUT] = value
+
+    @property
+    def generation(self) -> int:
+        return int(self._header[_GENERATION])
+
+    @property
+    def watermark(self) -> Dict:
+        updated_us = int(self._header[_MAX_UPDATED_US])
+        max_updated_at = None
+        if updated_us:
+            max_updated_at = (_EPOCH + timedelta(microseconds=updated_us)).isoformat()
+        return {'max_id': int(self._header[_MAX_ID]), 'max_updated_at': max_updated_at}
+
+    @watermark.setter
+    def watermark(self, value: Dict):
+        self._header[_MAX_ID] = int(value['max_id'])
+        updated_us = 0
+        if value.get('max_updated_at'):
+            updated_us = (datetime.fromisoformat(value['max_updated_at']) - _EPOCH) // timedelta(microseconds=1)
+        self._header[_MAX_UPDATED_US] = updated_us
+
+    # -- writer protocol -------------------------------------------------------
+
+    @contextmanager
+    def writer(self):
+        """
+        Exclusive write section across all processes mapping the gallery
+
+        Re-entrant within a thread; only the outermost section takes the
+        flock and moves the generation counter.
+        """
+        depth = getattr(self._writer_depth, 'value', 0)
+        if depth:
+            self._writer_depth.value = depth + 1
+            try:
+                yield
+            finally:
+                self._writer_depth.value = depth
+            return
+
+        with self._lock:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._writer_depth.value = 1
+            self._ensure_mapped()
+            self._header[_GENERATION] += 1
+            try:
+                yield
+            finally:
+                self._header[_GENERATION] += 1
+                self._writer_depth.value = 0
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def replace(self, vectors, user_ids, encoding_ids):
+        with self.writer():
+            super().replace(vectors, user_ids, encoding_ids)
+
+    def attach(self, vectors, sq_norms, user_ids, encoding_ids, count: int):
+        # Snapshot arrays are copied into the shared files rather than mapped
+        self.replace(vectors[:count], user_ids[:count], encoding_ids[:count])
+
+    def add(self, encoding_id, user_id, encoding):
+        with self.writer():
+            super().add(encoding_id, user_id, encoding)
+
+    def add_many(self, encoding_ids, user_ids, encodings):
+        with self.writer():
+            super().add_many(encoding_ids, user_ids, encodings)
+
+    def upsert_many(self, encoding_ids, user_ids, encodings):
+        with self.writer():
+            super().upsert_many(encoding_ids, user_ids, encodings)
+
+    def retain(self, encoding_ids) -> int:
+        with self.writer():
+            return super().retain(encoding_ids)
+
+    def remove_user(self, user_id: int) -> int:
+        with self.writer():
+            return super().remove_user(user_id)
+
+    def initialize(self, db, snapshot_dir: Optional[str] = None) -> Dict:
+        """
+        Populate the shared files once per boot, or catch up on the DB delta
+
+        The first worker to get the writer lock loads the gallery; workers
+        that start later only replay changes since the stored watermark.
+        """
+        from .gallery_snapshot import apply_db_delta, warm_start_gallery
+
+        with self.writer():
+            if self.loaded:
+                result = {'source': 'shared', **apply_db_delta(self, db), 'encodings': len(self)}
+            else:
+                result = warm_start_gallery(self, db, snapshot_dir)
+        return result
+
+    # -- reader protocol -------------------------------------------------------
+
+    def snapshot(self):
+        layout = self._layout_version
+        if layout != self._seen_layout:
+            # Another worker compacted the rows; positions in the local index are stale
+            self._seen_layout = layout
+            self._index = None
+            self._schedule_index_build()
+        return super().snapshot()
+
+    def _read_consistent(self, read: Callable):
+        if getattr(self._writer_depth, 'value', 0):
+            return read()
+
+        deadline = time.monotonic() + self.read_timeout
+        odd_reads = 0
+        while True:
+            before = self.generation
+            if before % 2 == 0:
+                result = read()
+                if self.generation == before:
+                    return result
+            else:
+                odd_reads += 1
+                if odd_reads % _WRITER_CHECK_RETRIES == 0 and self._recover_dead_writer():
+                    raise SharedGalleryUnavailable(
+                        f"Shared face gallery at {self.path} was left mid-update by a writer that exited; "
+                        f"it is marked for reload"
+                    )
+            if time.monotonic() > deadline:
+                raise SharedGalleryUnavailable(
+                    f"No consistent read of the shared face gallery at {self.path} within {self.read_timeout}s"
+                )
+            time.sleep(0.0005)
+
+    def _recover_dead_writer(self) -> bool:
+        """
+        Close an update left open by a writer that died
+
+        The kernel drops a dead process's flock, so an odd generation with
+        the lock free means nobody will finish the update.
+
+        Returns:
+            True if an abandoned update was found and the gallery marked unloaded
+        """
+        # Writers in this process hold _lock for their whole section
+        with self._lock:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return False
+            try:
+                if self.generation % 2 == 0:
+                    return False
+                self._header[_GENERATION] += 1
+                self._header[_INITIALIZED] = 0
+                logger.error(f"Shared face gallery writer died mid-update; {self.path} marked for reload")
+                return True
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def search(self, face_encoding, k: int = 1, nprobe: Optional[int] = None):
+        def read():
+            distances, user_ids = super(SharedFaceGallery, self).search(face_encoding, k, nprobe)
+            return distances, np.array(user_ids)
+
+        if self._index is not None and self._index.needs_rebuild(self._size):
+            self._schedule_index_build()
+        return self._read_consistent(read)
+
+    def distances(self, face_encoding):
+        def read():
+            distances, user_ids = super(SharedFaceGallery, self).distances(face_encoding)
+            return distances, np.array(user_ids)
+
+        return self._read_consistent(read)
+
+    def distance_matrix(self, face_encodings, rows=None):
+        def read():
+            distances, user_ids = super(SharedFaceGallery, self).distance_matrix(face_encodings, rows)
+            return distances, np.array(user_ids)
+
+        return self._read_consistent(read)
+
+    def _grouping_key(self, size: int):
+        # Other workers may update rows in place; the generation covers every write
+        return self.generation, size
+
+    def user_distances(self, face_encodings, reduction='min', rows=None):
+        def read():
+            distances, users = super(SharedFaceGallery, self).user_distances(face_encodings, reduction, rows)
+            return distances, np.array(users)
+
+        return self._read_consistent(read)
+
+    def rows_for_users(self, user_ids):
+        return self._read_consistent(lambda: super(SharedFaceGallery, self).rows_for_users(user_ids))
+
+    def close(self):
+        self._lock_file.close()
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class VerifyBatcher:
+    """
+    Micro-batching coalescer for concurrent face verification
+
+    Verify jobs arriving within a short window (or until ``max_batch`` jobs
+    are waiting) are detected/encoded together through the worker pool and
+    matched against the gallery with one distance matrix. Each caller then
+    receives its own result. The added latency is bounded by ``window_ms``.
+
+    Args:
+        face_pool: FaceWorkerPool running detection and encoding
+        face_service: FaceRecognitionService providing the match tolerance
+        gallery: FaceGallery to match against
+        window_ms: Maximum time the first job in a batch waits for company
+        max_batch: Flush immediately once this many jobs are waiting
+        scope: Optional ScheduleScope used for jobs that name their camera
+    """
+
+    def __init__(
+        self,
+        face_pool,
+        face_service,
+        gallery,
+        window_ms: float = 10.0,
+        max_batch: int = 16,
+        scope=None
+    ):
+        self.face_pool = face_pool
+        self.face_service = face_service
+        self.gallery = gallery
+        self.scope = scope
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._jobs = 0
+        self._largest_batch = 0
+
+    async def verify(self, image_bytes: bytes, camera_id: Optional[int] = None) -> Dict:
+        """
+        Queue a verify job and wait for its batch to complete
+
+        Args:
+            image_bytes: Encoded image as uploaded
+            camera_id: Camera the image came from, used to scope matching
+
+        Returns:
+            Dictionary with 'faces' (detected faces) and 'match'
+            ((user_id, confidence) of the first face, or None)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((image_bytes, camera_id, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List):
+        futures = [future for _, _, future in batch]
+        try:
+            faces_per_image = await self.face_pool.detect_and_encode_batch(
+                [image_bytes for image_bytes, _, _ in batch]
+            )
+
+            # One distance matrix per camera for the first face of every job that found one
+            by_camera = {}
+            for i, (_, camera_id, _) in enumerate(batch):
+                if faces_per_image[i]:
+                    by_camera.setdefault(camera_id if self.scope else None, []).append(i)
+
+            matches = {}
+            tolerance = self.face_service.face_recognition_tolerance
+            if self.gallery.loaded:
+                for camera_id, jobs in by_camera.items():
+                    encodings = np.array([faces_per_image[i][0]['encoding'] for i in jobs])
+                    if self.scope is not None and camera_id is not None:
+                        # The scope may refresh its schedule caches from the database
+                        results = await asyncio.to_thread(self.scope.match_batch, encodings, tolerance, camera_id)
+                    else:
+                        results = self.gallery.match_batch(encodings, tolerance)
+                    matches.update(zip(jobs, results))
+
+            for i, future in enumerate(futures):
+                if not future.done():
+                    future.set_result({'faces': faces_per_image[i], 'match': matches.get(i)})
+
+            with self._stats_lock:
+                self._batches += 1
+                self._jobs += len(batch)
+                self._largest_batch = max(self._largest_batch, len(batch))
+
+        except Exception as e:
+            logger.error(f"Verify batch failed: {e}")
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+
+    def stats(self) -> Dict:
+        """Batch counts and sizes since startup"""
+        with self._stats_lock:
+            return {
+                "window_ms": self.window * 1000.0,
+                "max_batch": self.max_batch,
+                "batches": self._batches,
+                "jobs": self._jobs,
+                "mean_batch_size": round(self._jobs / self._batches, 2) if self._batches else None,
+                "largest_batch": self._largest_batch
+            }
@@ -0,0 +1,389 @@
+import logging
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import face_worker_pool
+from .face_worker_pool import _init_worker
+from .lazy_import import LazyImport
+from .schedule_scope import _minutes, _room_key, roster_user_ids
+
+cv2 = LazyImport('cv2')
+
+logger = logging.getLogger(__name__)
+
+def probe_video(path: str) -> Dict:
+    """
+    Frame rate, frame count and size of a video file
+
+    Raises:
+        ValueError: If the file cannot be opened
+    """
+    capture = cv2.VideoCapture(str(path))
+    try:
+        if not capture.isOpened():
+            raise ValueError(f"Cannot open video: {path}")
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        return {
+            'fps': fps,
+            'frame_count': frame_count,
+            'width': int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'duration_seconds': frame_count / fps
+        }
+    finally:
+        capture.release()
+
+
+def plan_chunks(frame_count: int, fps: float, chunk_seconds: float) -> List[Tuple[int, int]]:
+    """Split [0, frame_count) into (start, end) frame ranges of about chunk_seconds"""
+    size = max(1, int(round(chunk_seconds * fps)))
+    return [(start, min(start + size, frame_count)) for start in range(0, frame_count, size)]
+
+
+def process_chunk(
+    path: str,
+    start_frame: int,
+    end_frame: int,
+    step: int,
+    detection_method: str = 'dlib',
+    service=None
+) -> Dict:
+    """
+    Decode one frame range and detect + encode faces on every step-th frame
+
+    Frames between samples are only grabbed, not converted, and samples are
+    aligned to the global frame index so chunks sample the same frames a
+    single sequential pass would.
+
+    Args:
+        path: Video file
+        start_frame: First frame of the chunk
+        end_frame: Frame after the last one of the chunk
+        step: Sample every step-th frame of the video
+        detection_method: Face detection method
+        service: FaceRecognitionService (defaults to the worker's)
+
+    Returns:
+        Dictionary with 'samples' (list of (frame index, N x D float32
+        encodings)), 'frames_decoded' and 'compute_seconds'
+    """
+    service = service or face_worker_pool._worker_service
+    started = time.perf_counter()
+    capture = cv2.VideoCapture(str(path))
+    samples = []
+    frames_decoded = 0
+
+    try:
+        if start_frame > 0:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        for index in range(start_frame, end_frame):
+            if index % step:
+                if not capture.grab():
+                    break
+                frames_decoded += 1
+                continue
+
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frames_decoded += 1
+            faces = service.detect_and_encode_faces(frame, detection_method)
+            encodings = np.array([face['encoding'] for face in faces], dtype=np.float32)
+            samples.append((index, encodings))
+    finally:
+        capture.release()
+
+    return {'samples': samples, 'frames_decoded': frames_decoded, 'compute_seconds': time.perf_counter() - started}
+
+
+class VideoAttendanceJob:
+    """
+    Derive attendance for a scheduled session from a recorded video
+
+    The video is split into time chunks that worker processes decode and
+    sample in parallel; each sample is detected and encoded in the worker,
+    and only the encodings come back to be matched against the gallery.
+    When a schedule is given, matching is restricted to its roster (see
+    schedule_scope.roster_user_ids). Per-user sightings are aggregated over
+    presence windows and users seen in enough windows get one
+    AttendanceRecord, written with a single bulk insert.
+
+    Args:
+        config: FaceRecognitionService config used in every worker
+        gallery: Loaded FaceGallery to match against
+        session_factory: Callable returning a SQLAlchemy session
+        workers: Worker processes (0 = CPU count)
+        chunk_seconds: Length of video decoded per task
+        sample_fps: Frames per second of video analyzed
+        tolerance: Maximum face distance for a match
+        presence_window_seconds: Granularity of the presence timeline
+        min_presence: Share of windows a user must be seen in to be present
+        min_samples: Minimum matched samples to be present
+        late_minutes: Check-ins this long after the scheduled start are late
+        early_departure_minutes: Check-outs this long before the end are early
+        start_method: multiprocessing start method
+    """
+
+    def __init__(
+        self,
+        config: Dict,
+        gallery,
+        session_factory: Callable,
+        workers: int = 0,
+        chunk_seconds: float = 120.0,
+        sample_fps: float = 1.0,
+        tolerance: float = 0.6,
+        presence_window_seconds: float = 60.0,
+        min_presence: float = 0.25,
+        min_samples: int = 3,
+        late_minutes: int = 15,
+        early_departure_minutes: int = 15,
+        start_method: str = 'spawn'
+    ):
+        self.config = config
+        self.gallery = gallery
+        self.session_factory = session_factory
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_seconds = chunk_seconds
+        self.sample_fps = sample_fps
+        self.tolerance = tolerance
+        self.presence_window_seconds = presence_window_seconds
+        self.min_presence = min_presence
+        self.min_samples = min_samples
+        self.late_minutes = late_minutes
+        self.early_departure_minutes = early_departure_minutes
+        self.start_method = start_method
+
+    def _resolve_session(self, schedule_id: Optional[int], camera_id: Optional[int]) -> Dict:
+        """Schedule roster and the room's camera, if a schedule is given"""
+        from models.database_models import Camera, Schedule
+
+        if schedule_id is None:
+            return {'schedule': None, 'user_ids': None, 'camera_id': camera_id}
+
+        with self.session_factory() as db:
+            schedule = db.query(Schedule).filter(Schedule.id == schedule_id).first()
+            if schedule is None:
+                raise ValueError(f"Schedule {schedule_id} not found")
+
+            if camera_id is None and schedule.room_number:
+                room = _room_key(schedule.room_number)
+                for cid, location in db.query(Camera.id, Camera.location).order_by(Camera.id).all():
+                    if _room_key(location) == room:
+                        camera_id = cid
+                        break
+
+            return {
+                'schedule': {
+                    'start': _minutes(schedule.start_time),
+                    'end': _minutes(schedule.end_time),
+                    'name': schedule.name
+                },
+                'user_ids': roster_user_ids(db, schedule.course_code, schedule.teacher_id),
+                'camera_id': camera_id
+            }
+
+    def _decode(self, path: str, video: Dict, detection_method: str, on_progress: Optional[Callable]):
+        """Yield chunk results as worker processes finish them"""
+        step = max(1, int(round(video['fps'] / self.sample_fps)))
+        chunks = plan_chunks(video['frame_count'], video['fps'], self.chunk_seconds)
+
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(chunks)) or 1,
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=_init_worker,
+            initargs=(self.config,)
+        ) as executor:
+            futures = [
+                executor.submit(process_chunk, str(path), start, end, step, detection_method)
+                for start, end in chunks
+            ]
+            for done, future in enumerate(as_completed(futures), start=1):
+                yield future.result()
+                if on_progress:
+                    on_progress(done, len(chunks))
+
+    def aggregate(
+        self,
+        sightings: Dict[int, List[Tuple[float, float]]],
+        duration_seconds: float
+    ) -> List[Dict]:
+        """
+        Per-user presence over the session
+
+        Args:
+            sightings: user id -> list of (seconds into video, confidence)
+            duration_seconds: Length of the video
+
+        Returns:
+            One entry per sighted user, sorted by presence
+        """
+        windows = max(1, math.ceil(duration_seconds / self.presence_window_seconds))
+        presence = []
+        for user_id, seen in sightings.items():
+            times = np.array([t for t, _ in seen])
+            confidences = np.array([c for _, c in seen])
+            seen_windows = len(np.unique((times // self.presence_window_seconds).astype(int)))
+            ratio = seen_windows / windows
+            presence.append({
+                'user_id': user_id,
+                'samples': len(seen),
+                'first_seen_seconds': float(times.min()),
+                'last_seen_seconds': float(times.max()),
+                'presence': round(ratio, 3),
+                'confidence': float(confidences.mean()),
+                'present': len(seen) >= self.min_samples and ratio >= self.min_presence
+            })
+        return sorted(presence, key=lambda entry: -entry['presence'])
+
+    def _write_records(
+        self,
+        presence: List[Dict],
+        recorded_at: datetime,
+        duration_seconds: float,
+        session: Dict,
+        source_name: str
+    ) -> int:
+        from models.database_models import AttendanceRecord, AttendanceStatus, VerificationMethod
+
+        present = [entry for entry in presence if entry['present']]
+        if not present:
+            return 0
+
+        # attendance_records stores naive UTC; the schedule is in local wall-clock time
+        local_start = recorded_at.astimezone().replace(tzinfo=None) if recorded_at.tzinfo else recorded_at
+        utc_start = recorded_at.astimezone(timezone.utc).replace(tzinfo=None)
+        session_end = utc_start + timedelta(seconds=duration_seconds)
+        schedule = session['schedule']
+        day_start = local_start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        with self.session_factory() as db:
+            # Re-running the job for the same recording must not duplicate rows
+            existing = {
+                row[0] for row in db.query(AttendanceRecord.user_id).filter(
+                    AttendanceRecord.user_id.in_([entry['user_id'] for entry in present]),
+                    AttendanceRecord.camera_id == session['camera_id'],
+                    AttendanceRecord.check_in_time >= utc_start,
+                    AttendanceRecord.check_in_time <= session_end,
+                    AttendanceRecord.verification_method == VerificationMethod.FACE
+                ).all()
+            }
+
+            now = datetime.utcnow()
+            rows = []
+            for entry in present:
+                if entry['user_id'] in existing:
+                    continue
+                first_seen = timedelta(seconds=entry['first_seen_seconds'])
+                last_seen = timedelta(seconds=entry['last_seen_seconds'])
+                check_in, check_out = utc_start + first_seen, utc_start + last_seen
+                is_late = is_early = False
+                if schedule:
+                    is_late = local_start + first_seen > day_start + timedelta(minutes=schedule['start'] + self.late_minutes)
+                    is_early = local_start + last_seen < day_start + timedelta(minutes=schedule['end'] - self.early_departure_minutes)
+                rows.append({
+                    'user_id': entry['user_id'],
+                    'camera_id': session['camera_id'],
+                    'check_in_time': check_in,
+                    'check_out_time': check_out,
+                    'duration_minutes': int((check_out - check_in).total_seconds() // 60),
+                    'status': AttendanceStatus.LATE if is_late else AttendanceStatus.PRESENT,
+                    'verification_method': VerificationMethod.FACE,
+                    'face_confidence': round(entry['confidence'], 4),
+                    'is_late': is_late,
+                    'is_early_departure': is_early,
+                    'notes': f"From recorded video {source_name} (presence {entry['presence']:.0%})",
+                    'created_at': now,
+                    'updated_at': now
+                })
+
+            if rows:
+                db.bulk_insert_mappings(AttendanceRecord, rows)
+                db.commit()
+            return len(rows)
+
+    def run(
+        self,
+        path: str,
+        recorded_at: datetime,
+        schedule_id: Optional[int] = None,
+        camera_id: Optional[int] = None,
+        detection_method: str = 'dlib',
+        dry_run: bool = False,
+        on_progress: Optional[Callable[[int, int], None]] = None
+    ) -> Dict:
+        """
+        Process a recording and write attendance for the users present
+
+        Args:
+            path: Video file
+            recorded_at: Time of the first frame; naive values are local wall-clock time
+            schedule_id: Session the recording belongs to (restricts matching to its roster)
+            camera_id: Camera stored on the records (defaults to the schedule room's camera)
+            detection_method: Face detection method
+            dry_run: Aggregate presence without writing records
+            on_progress: Called with (chunks done, total chunks)
+
+        Returns:
+            Summary with timing, per-user presence and records written
+        """
+        started = time.perf_counter()
+        video = probe_video(path)
+        session = self._resolve_session(schedule_id, camera_id)
+
+        rows = None
+        if session['user_ids'] is not None:
+            rows = self.gallery.rows_for_users(np.array(session['user_ids'], dtype=np.int64))
+
+        sightings: Dict[int, List[Tuple[float, float]]] = {}
+        frames_sampled = frames_decoded = faces_found = 0
+        compute_seconds = 0.0
+        for result in self._decode(path, video, detection_method, on_progress):
+            frames_decoded += result['frames_decoded']
+            compute_seconds += result['compute_seconds']
+            for frame_index, encodings in result['samples']:
+                frames_sampled += 1
+                faces_found += len(encodings)
+                if len(encodings) == 0 or (rows is not None and len(rows) == 0):
+                    continue
+                for match in self.gallery.match_batch(encodings, self.tolerance, rows=rows):
+                    if match:
+                        user_id, confidence = match
+                        sightings.setdefault(user_id, []).append((frame_index / video['fps'], confidence))
+
+        presence = self.aggregate(sightings, video['duration_seconds'])
+        written = 0
+        if not dry_run:
+            written = self._write_records(presence, recorded_at, video['duration_seconds'], session, Path(path).name)
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Video attendance for {Path(path).name}: {sum(e['present'] for e in presence)} present, "
+            f"{written} records written, {video['duration_seconds'] / max(elapsed, 1e-6):.1f}x real time"
+        )
+
+        return {
+            'video': Path(path).name,
+            'duration_seconds': round(video['duration_seconds'], 1),
+            'resolution': f"{video['width']}x{video['height']}",
+            'frames_decoded': frames_decoded,
+            'frames_sampled': frames_sampled,
+            'faces_found': faces_found,
+            'camera_id': session['camera_id'],
+            'roster_size': len(session['user_ids']) if session['user_ids'] is not None else None,
+            'elapsed_seconds': round(elapsed, 2),
+            'worker_seconds': round(compute_seconds, 2),
+            'realtime_factor': round(video['duration_seconds'] / max(elapsed, 1e-6), 1),
+            'present': sum(1 for entry in presence if entry['present']),
+            'records_written': written,
+            'users': presence
+        }
@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# main builds its engine at import; tests that import it never touch a real database
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/aivision-tests.db")
+
+from models.database_models import Base, User
+
+
+@pytest.fixture
+def session_factory():
+    """Sessions on a fresh in-memory SQLite database with the current models"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    with session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+def student(db):
+    user = User(username="student", email="student@example.com", password_hash="x", full_name="Student", role="student")
+    db.add(user)
+    db.commit()
+    return user.id
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from models.database_models import AttendanceRecord
+from services.attendance_service import AttendanceEvent, AttendanceService
+
+
+def _events(user_id, *entries):
+    return [AttendanceEvent(type=kind, user_id=user_id, timestamp=timestamp) for kind, timestamp in entries]
+
+
+def test_replaying_a_mixed_batch_is_idempotent(db, student):
+    service = AttendanceService()
+    batch = _events(
+        student,
+        ('check_in', datetime(2024, 3, 4, 8, 0)),
+        ('check_in', datetime(2024, 3, 4, 8, 5)),
+        ('check_out', datetime(2024, 3, 4, 9, 0)),
+    )
+
+    first = service.ingest_events(db, batch)
+    assert [r['status'] for r in first['results']] == ['checked_in', 'already_checked_in', 'checked_out']
+
+    replay = service.ingest_events(db, batch)
+    assert [r['status'] for r in replay['results']] == ['duplicate', 'already_checked_in', 'duplicate']
+    assert [r['attendance_id'] for r in replay['results']] == [r['attendance_id'] for r in first['results']]
+
+    records = db.query(AttendanceRecord).all()
+    assert len(records) == 1
+    assert records[0].check_out_time == datetime(2024, 3, 4, 9, 0)
+
+
+def test_check_in_after_check_out_opens_a_new_session(db, student):
+    service = AttendanceService()
+    batch = _events(
+        student,
+        ('check_in', datetime(2024, 3, 4, 8, 0)),
+        ('check_out', datetime(2024, 3, 4, 9, 0)),
+        ('check_in', datetime(2024, 3, 4, 13, 0)),
+    )
+
+    first = service.ingest_events(db, batch)
+    assert [r['status'] for r in first['results']] == ['checked_in', 'checked_out', 'checked_in']
+
+    replay = service.ingest_events(db, batch)
+    assert [r['status'] for r in replay['results']] == ['duplicate', 'duplicate', 'duplicate']
+    assert db.query(AttendanceRecord).count() == 2
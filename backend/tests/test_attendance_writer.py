@@ -0,0 +1,194 @@
+import asyncio
+import fcntl
+import json
+import threading
+from datetime import datetime
+
+from models.database_models import AttendanceRecord
+from services.attendance_service import AttendanceEvent, AttendanceService
+from services.attendance_writer import AttendanceWriteBuffer
+
+
+class _GatedService(AttendanceService):
+    """Blocks the first ingest until released, to hold a flush in flight"""
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.active = 0
+        self.overlapped = False
+
+    def ingest_events(self, db, events, attempts=3):
+        self.active += 1
+        self.overlapped = self.overlapped or self.active > 1
+        try:
+            if not self.started.is_set():
+                self.started.set()
+                self.release.wait(5)
+            return super().ingest_events(db, events, attempts)
+        finally:
+            self.active -= 1
+
+
+def _journal_line(seq, event):
+    return json.dumps({'seq': seq, 'event': event.model_dump(mode='json')}) + '\n'
+
+
+def test_stop_waits_for_the_flush_in_flight(session_factory, student):
+    service = _GatedService()
+    buffer = AttendanceWriteBuffer(session_factory, service, flush_interval_ms=1)
+
+    async def run():
+        await buffer.start()
+        buffer.submit([AttendanceEvent(type='check_in', user_id=student, timestamp=datetime(2024, 3, 4, 8, 0))])
+        await asyncio.to_thread(service.started.wait, 5)
+        buffer.submit([AttendanceEvent(type='check_out', user_id=student, timestamp=datetime(2024, 3, 4, 9, 0))])
+
+        stopping = asyncio.create_task(buffer.stop())
+        await asyncio.sleep(0.05)
+        service.release.set()
+        await stopping
+
+    asyncio.run(run())
+
+    assert not service.overlapped
+    stats = buffer.stats()
+    assert stats['queue_depth'] == 0
+    assert stats['flushed'] == 2
+    with session_factory() as db:
+        records = db.query(AttendanceRecord).all()
+    assert len(records) == 1
+    assert records[0].check_out_time == datetime(2024, 3, 4, 9, 0)
+
+
+def test_journals_of_dead_workers_are_taken_over(session_factory, student, tmp_path):
+    journal = tmp_path / 'attendance.journal'
+    check_in = AttendanceEvent(type='check_in', user_id=student, timestamp=datetime(2024, 3, 4, 8, 0))
+    check_out = AttendanceEvent(type='check_out', user_id=student, timestamp=datetime(2024, 3, 4, 9, 0))
+
+    # A dead worker that had flushed its first event, and a live one holding its journal
+    dead = tmp_path / 'attendance.journal.101'
+    dead.write_text(_journal_line(1, check_out) + _journal_line(2, check_in))
+    (tmp_path / 'attendance.journal.101.checkpoint').write_text('1')
+    live = tmp_path / 'attendance.journal.102'
+    live.write_text(_journal_line(1, check_out))
+    live_handle = open(live, 'r')
+    fcntl.flock(live_handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    buffer = AttendanceWriteBuffer(session_factory, AttendanceService(), mode='journal', journal_path=str(journal))
+
+    async def run():
+        await buffer.start()
+        assert buffer.stats()['replayed'] == 1
+        await buffer.stop()
+
+    try:
+        asyncio.run(run())
+    finally:
+        live_handle.close()
+
+    assert not dead.exists()
+    assert not (tmp_path / 'attendance.journal.101.checkpoint').exists()
+    assert live.exists()
+    assert not buffer.own_journal_path.exists()
+    with session_factory() as db:
+        records = db.query(AttendanceRecord).all()
+    assert len(records) == 1
+    assert records[0].check_out_time is None
+
+
+class _PoisonService(AttendanceService):
+    """Fails every batch that contains an event of the poison user"""
+
+    def __init__(self, poison_user, error):
+        super().__init__()
+        self.poison_user = poison_user
+        self.error = error
+
+    def ingest_events(self, db, events, attempts=3):
+        if any(event.user_id == self.poison_user for event in events):
+            raise self.error
+        return super().ingest_events(db, events, attempts)
+
+
+def _flush_until_empty(buffer, rounds):
+    for _ in range(rounds):
+        try:
+            buffer._flush_once()
+        except Exception:
+            pass
+
+
+def test_a_batch_that_keeps_failing_is_dead_lettered(session_factory, student, tmp_path):
+    dead_letters = tmp_path / 'dead.jsonl'
+    service = _PoisonService(-1, ValueError("bad event"))
+    buffer = AttendanceWriteBuffer(
+        session_factory, service, max_flush_attempts=2, dead_letter_path=str(dead_letters)
+    )
+    buffer.submit([
+        AttendanceEvent(type='check_in', user_id=student, timestamp=datetime(2024, 3, 4, 8, 0)),
+        AttendanceEvent(type='check_in', user_id=-1, timestamp=datetime(2024, 3, 4, 8, 1)),
+        AttendanceEvent(type='check_out', user_id=student, timestamp=datetime(2024, 3, 4, 9, 0)),
+    ])
+
+    _flush_until_empty(buffer, 3)
+
+    stats = buffer.stats()
+    assert (stats['queue_depth'], stats['flushed'], stats['dead_lettered']) == (0, 2, 1)
+    [line] = dead_letters.read_text().splitlines()
+    assert json.loads(line)['event']['user_id'] == -1
+    assert 'bad event' in json.loads(line)['error']
+    with session_factory() as db:
+        assert db.query(AttendanceRecord).one().check_out_time == datetime(2024, 3, 4, 9, 0)
+
+
+def test_an_unreachable_database_is_retried_without_dead_lettering(session_factory, student, tmp_path):
+    from sqlalchemy.exc import OperationalError
+
+    dead_letters = tmp_path / 'dead.jsonl'
+    service = _PoisonService(student, OperationalError("SELECT 1", {}, Exception("connection refused")))
+    buffer = AttendanceWriteBuffer(
+        session_factory, service, max_flush_attempts=1, dead_letter_path=str(dead_letters)
+    )
+    buffer.submit([AttendanceEvent(type='check_in', user_id=student, timestamp=datetime(2024, 3, 4, 8, 0))])
+
+    _flush_until_empty(buffer, 5)
+
+    assert buffer.stats()['queue_depth'] == 1
+    assert not dead_letters.exists()
+
+
+def test_submit_does_not_wait_for_the_checkpoint(session_factory, student, tmp_path):
+    buffer = AttendanceWriteBuffer(
+        session_factory, AttendanceService(), mode='journal', journal_path=str(tmp_path / 'attendance.journal')
+    )
+    buffer._open_journal()
+    writing, release = threading.Event(), threading.Event()
+    write_checkpoint = buffer._write_checkpoint
+
+    def slow_checkpoint(sequence):
+        writing.set()
+        release.wait(5)
+        write_checkpoint(sequence)
+
+    buffer._write_checkpoint = slow_checkpoint
+    buffer.submit([AttendanceEvent(type='check_in', user_id=student, timestamp=datetime(2024, 3, 4, 8, 0))])
+    flusher = threading.Thread(target=buffer._flush_once)
+    flusher.start()
+    try:
+        assert writing.wait(5)
+        submitted = threading.Thread(target=buffer.submit, args=([
+            AttendanceEvent(type='check_out', user_id=student, timestamp=datetime(2024, 3, 4, 9, 0))
+        ],))
+        submitted.start()
+        submitted.join(1)
+        assert not submitted.is_alive()
+    finally:
+        release.set()
+        flusher.join(5)
+    buffer._journal.close()
+
+    assert buffer.stats()['queue_depth'] == 1
+    # The journal still holds the event queued during the checkpoint
+    assert len(buffer.own_journal_path.read_text().splitlines()) == 2
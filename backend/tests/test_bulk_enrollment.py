@@ -0,0 +1,103 @@
+import asyncio
+import io
+import json
+import zipfile
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from models.database_models import FaceEncoding
+from services.bulk_enrollment import BulkEnrollmentJob, ImageSource
+from services.face_worker_pool import FaceWorkerPoolBusy
+
+
+class _BusyPool:
+    """Answers one face per image after rejecting the first few rounds as busy"""
+
+    def __init__(self, max_queue=32, busy_rounds=0):
+        self.max_queue = max_queue
+        self.busy_rounds = busy_rounds
+        self.rounds = []
+
+    async def detect_and_encode_batch(self, images):
+        if self.busy_rounds:
+            self.busy_rounds -= 1
+            raise FaceWorkerPoolBusy("Face worker queue full")
+        self.rounds.append(len(images))
+        return [[{'encoding': np.full(128, len(self.rounds), dtype=np.float32)}] for _ in images]
+
+
+class _Gallery:
+    loaded = True
+
+    def __init__(self):
+        self.added = []
+
+    def add_many(self, encoding_ids, user_ids, encodings):
+        self.added.append((list(encoding_ids), list(user_ids), encodings.shape))
+
+
+def _run(job, entries, source):
+    async def collect():
+        return [event async for event in job.run(entries, source)]
+    return asyncio.run(collect())
+
+
+def _images(tmp_path, count):
+    for i in range(count):
+        (tmp_path / f'{i}.jpg').write_bytes(b'jpeg')
+    return [{'file': f'{i}.jpg', 'column': 'user_id', 'value': None} for i in range(count)]
+
+
+def test_rounds_leave_room_in_a_shared_pool_and_wait_while_it_is_busy(db, student, tmp_path):
+    entries = _images(tmp_path, 10)
+    for entry in entries:
+        entry['value'] = str(student)
+    pool = _BusyPool(max_queue=16, busy_rounds=2)
+    gallery = _Gallery()
+
+    job = BulkEnrollmentJob(db, pool, gallery=gallery, insert_batch_size=4)
+    events = _run(job, entries, ImageSource(tmp_path))
+
+    assert pool.rounds == [4, 4, 2]
+    assert events[-1]['enrolled'] == 10
+    # The gallery grows with each committed insert batch, not once at the end
+    assert [shape[0] for _, _, shape in gallery.added] == [4, 4, 2]
+    assert sum(len(ids) for ids, _, _ in gallery.added) == db.query(FaceEncoding).count()
+
+
+def test_only_a_users_first_encoding_is_primary(db, student, tmp_path):
+    db.add(FaceEncoding(user_id=student, is_primary=True))
+    db.commit()
+    entries = _images(tmp_path, 2)
+    for entry in entries:
+        entry['value'] = str(student)
+
+    _run(BulkEnrollmentJob(db, _BusyPool()), entries, ImageSource(tmp_path))
+
+    assert db.query(FaceEncoding).filter(FaceEncoding.is_primary == True).count() == 1
+
+
+def test_bulk_endpoint_reads_the_uploaded_zip(monkeypatch, session_factory, student):
+    import main
+
+    monkeypatch.setattr(main, 'face_service', object())
+    monkeypatch.setattr(main, 'face_pool', _BusyPool())
+    monkeypatch.setattr(main, 'face_gallery', _Gallery())
+    monkeypatch.setattr(main, 'SessionLocal', session_factory)
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zipped:
+        zipped.writestr('a.jpg', b'jpeg')
+        zipped.writestr('b.jpg', b'jpeg')
+    manifest = f"file,user_id\na.jpg,{student}\nb.jpg,{student}\nmissing.jpg,{student}\n"
+
+    response = TestClient(main.app).post('/api/v1/face/enroll/bulk', files={
+        'archive': ('faces.zip', archive.getvalue(), 'application/zip'),
+        'manifest': ('manifest.csv', manifest, 'text/csv'),
+    })
+
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[-1]['type'] == 'summary'
+    assert (events[-1]['enrolled'], events[-1]['missing_file']) == (2, 1)
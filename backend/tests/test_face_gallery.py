@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from services.ann_index import QuantizedIndex
+from services.face_gallery import FaceGallery
+
+
+class _CountingIndex(QuantizedIndex):
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.queries = 0
+
+    def candidates(self, query, size, nprobe=None):
+        self.queries += 1
+        return super().candidates(query, size, nprobe)
+
+
+def _gallery(rows=2000, index_factory=None):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(rows, 128)).astype(np.float32)
+    gallery = FaceGallery(index_factory=index_factory, index_min_size=100)
+    gallery.replace(vectors, np.arange(rows) // 2 + 1, np.arange(rows) + 1)
+    return gallery, vectors
+
+
+def test_match_batch_searches_through_the_installed_index():
+    index = _CountingIndex(precision='int8', shortlist=8)
+    gallery, vectors = _gallery(index_factory=lambda: index)
+    assert gallery.build_index()
+
+    queries = vectors[[3, 500, 1999]] + 0.01
+    distances, user_ids = gallery.candidate_distances(queries)
+    assert index.queries == 3
+    # Only the shortlists are scored, not the whole gallery
+    assert distances.shape[1] <= 3 * 8
+
+    batched = gallery.match_batch(queries, tolerance=0.5)
+    single = [gallery.match(query, 0.5) for query in queries]
+    assert [match[0] for match in batched] == [match[0] for match in single] == [2, 251, 1000]
+    assert [match[1] for match in batched] == pytest.approx([match[1] for match in single], abs=1e-4)
+
+
+def test_match_batch_scans_everything_without_an_index():
+    gallery, vectors = _gallery(rows=300)
+    distances, _ = gallery.candidate_distances(vectors[:2])
+    assert distances.shape == (2, 300)
+    assert [match[0] for match in gallery.match_batch(vectors[:2], tolerance=0.1)] == [1, 1]
+
+
+def test_centroid_reduction_decides_verification_like_ranking():
+    # User 1 has one encoding close to the query and one far away; user 2 has two moderately close ones
+    query = np.zeros(128, dtype=np.float32)
+    vectors = np.zeros((4, 128), dtype=np.float32)
+    vectors[0, 0], vectors[1, 0] = 0.1, 1.5
+    vectors[2, 1], vectors[3, 2] = 0.3, 0.3
+    user_ids, encoding_ids = np.array([1, 1, 2, 2]), np.arange(1, 5)
+
+    closest = FaceGallery()
+    closest.replace(vectors, user_ids, encoding_ids)
+    assert closest.match(query, 0.6)[0] == closest.rank_users(query, 1, 'min')[0][0] == 1
+
+    centroid = FaceGallery(match_reduction='centroid')
+    centroid.replace(vectors, user_ids, encoding_ids)
+    ranked = centroid.rank_users(query, 1, 'centroid')[0]
+    assert ranked[0] == 2
+    assert centroid.match(query, 0.6) == pytest.approx((2, 1.0 - ranked[1]))
+    assert [match[0] for match in centroid.match_batch(query[None, :], 0.6)] == [2]
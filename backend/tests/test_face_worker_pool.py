@@ -0,0 +1,18 @@
+from services import face_recognition_service, face_worker_pool
+from services.face_recognition_service import FaceRecognitionService
+
+
+def test_workers_warm_only_the_configured_pipeline(monkeypatch):
+    warmed = []
+    monkeypatch.setattr(face_recognition_service, 'FACE_RECOGNITION_AVAILABLE', True)
+    monkeypatch.setattr(FaceRecognitionService, 'warm_up', lambda self, names: warmed.append(names))
+    monkeypatch.setattr(face_worker_pool, '_worker_service', None)
+
+    face_worker_pool._init_worker({'face_model': 'hog', 'model_loading': 'eager'})
+
+    assert warmed == [['dlib']]
+    assert not face_recognition_service.DeepFace.loaded
+    assert not face_recognition_service.MTCNN.loaded
+
+    face_worker_pool._init_worker({'warmup_models': 'opencv,deepface:Facenet'})
+    assert warmed[-1] == ['opencv', 'deepface:Facenet']
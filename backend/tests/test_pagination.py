@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import pytest
+
+from models.database_models import AttendanceRecord, User
+from services.pagination import decode_cursor, encode_cursor
+
+USERS = [User.id]
+ATTENDANCE = [AttendanceRecord.check_in_time, AttendanceRecord.id]
+
+
+def test_cursor_round_trips():
+    key = [datetime(2024, 3, 4, 8, 0, 5, 120), 42]
+    assert decode_cursor(encode_cursor("attendance", key), "attendance", ATTENDANCE) == key
+    assert decode_cursor(encode_cursor("users", [7]), "users", USERS) == [7]
+
+
+@pytest.mark.parametrize("token", [
+    "eyJrIjoidXNlcnMiLCJ2IjpbXX0",  # {"k":"users","v":[]}
+    encode_cursor("users", [1, 2]),
+    encode_cursor("users", ["1"]),
+    encode_cursor("users", [True]),
+    encode_cursor("users", [datetime(2024, 3, 4)]),
+    "not a cursor",
+])
+def test_malformed_user_cursors_are_rejected(token):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(token, "users", USERS)
+
+
+@pytest.mark.parametrize("values", [
+    [42, datetime(2024, 3, 4)],
+    [{"dt": "yesterday"}, 42],
+    [datetime(2024, 3, 4)],
+])
+def test_malformed_attendance_cursors_are_rejected(values):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(encode_cursor("attendance", values), "attendance", ATTENDANCE)
+
+
+def test_cursor_of_another_listing_is_rejected():
+    with pytest.raises(ValueError, match="another listing"):
+        decode_cursor(encode_cursor("users", [7]), "attendance", ATTENDANCE)
@@ -0,0 +1,22 @@
+import pytest
+
+from scripts.check_query_plans import _sqlite_plan, check_plans, hot_queries
+
+
+@pytest.fixture
+def engine(session_factory):
+    return session_factory.kw['bind']
+
+
+HOT_QUERIES = hot_queries()
+
+
+@pytest.mark.parametrize("name, statement, expected", HOT_QUERIES, ids=[query[0] for query in HOT_QUERIES])
+def test_hot_query_uses_its_index(engine, name, statement, expected):
+    with engine.connect() as conn:
+        indexes, seq_scan, plan = _sqlite_plan(conn, statement)
+    assert indexes & expected and not seq_scan, f"{name} plan:\n{plan}"
+
+
+def test_check_plans_passes_on_the_model_schema(engine):
+    assert check_plans(bind=engine)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from services.shared_gallery import _GENERATION, SharedFaceGallery, SharedGalleryUnavailable
+
+fcntl = pytest.importorskip("fcntl")
+
+
+def _gallery(tmp_path, **options):
+    gallery = SharedFaceGallery(str(tmp_path), initial_capacity=16, **options)
+    gallery.replace(np.eye(4, 128, dtype=np.float32), np.arange(1, 5), np.arange(1, 5))
+    gallery.loaded = True
+    return gallery
+
+
+def _leave_generation_odd(gallery):
+    # What a writer that died between its two generation increments leaves behind
+    gallery._header[_GENERATION] += 1
+    assert gallery.generation % 2
+
+
+def test_read_after_a_writer_died_mid_update_fails_and_marks_the_gallery_for_reload(tmp_path):
+    gallery = _gallery(tmp_path)
+    _leave_generation_odd(gallery)
+
+    with pytest.raises(SharedGalleryUnavailable, match="marked for reload"):
+        gallery.search(np.eye(1, 128, dtype=np.float32)[0])
+
+    assert gallery.generation % 2 == 0
+    assert not gallery.loaded
+    # Readers recover once the gallery is consistent again
+    distances, user_ids = gallery.search(np.eye(1, 128, dtype=np.float32)[0])
+    assert user_ids[0] == 1
+
+
+def test_read_gives_up_while_a_live_writer_holds_the_lock(tmp_path):
+    gallery = _gallery(tmp_path, read_timeout=0.2)
+    _leave_generation_odd(gallery)
+
+    # Another process's open file description: its flock excludes ours
+    with open(tmp_path / 'lock', 'a+') as writer_lock:
+        fcntl.flock(writer_lock, fcntl.LOCK_EX)
+        with pytest.raises(SharedGalleryUnavailable, match="within 0.2s"):
+            gallery.rows_for_users([1])
+    assert gallery.generation % 2
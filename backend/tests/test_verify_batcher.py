@@ -0,0 +1,43 @@
+import asyncio
+import threading
+
+import numpy as np
+
+from services.face_gallery import FaceGallery
+from services.verify_batcher import VerifyBatcher
+
+
+class _Pool:
+    async def detect_and_encode_batch(self, images):
+        return [[{'encoding': np.zeros(128, dtype=np.float32)}] for _ in images]
+
+
+class _Service:
+    face_recognition_tolerance = 0.6
+
+
+class _Scope:
+    """Records the thread it is called on; the real scope may query the database"""
+
+    def __init__(self):
+        self.threads = []
+
+    def match_batch(self, encodings, tolerance, camera_id):
+        self.threads.append(threading.current_thread())
+        return [(7, 0.9)] * len(encodings)
+
+
+def test_scoped_matching_runs_off_the_event_loop():
+    gallery = FaceGallery()
+    gallery.replace(np.zeros((1, 128), dtype=np.float32), np.array([7]), np.array([1]))
+    gallery.loaded = True
+    scope = _Scope()
+    batcher = VerifyBatcher(_Pool(), _Service(), gallery, window_ms=1, scope=scope)
+
+    async def run():
+        return await asyncio.gather(batcher.verify(b'a', camera_id=3), batcher.verify(b'b', camera_id=3))
+
+    results = asyncio.run(run())
+
+    assert [result['match'] for result in results] == [(7, 0.9), (7, 0.9)]
+    assert scope.threads and threading.main_thread() not in scope.threads
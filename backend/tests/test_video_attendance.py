@@ -0,0 +1,36 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from models.database_models import AttendanceRecord
+from services.video_attendance import VideoAttendanceJob
+
+
+@pytest.fixture
+def india_time(monkeypatch):
+    monkeypatch.setenv('TZ', 'Asia/Kolkata')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_records_are_stored_in_utc_and_judged_against_the_local_schedule(india_time, session_factory, db, student):
+    job = VideoAttendanceJob({}, gallery=None, session_factory=session_factory, late_minutes=10)
+    presence = [{
+        'user_id': student, 'present': True, 'presence': 1.0, 'confidence': 0.9,
+        'first_seen_seconds': 20 * 60, 'last_seen_seconds': 40 * 60
+    }]
+    # 09:00-10:00 local session, recording starts at 09:00 local (03:30 UTC)
+    session = {'schedule': {'start': 9 * 60, 'end': 10 * 60, 'name': 'Lecture'}, 'camera_id': None}
+    recorded_at = datetime(2024, 3, 4, 9, 0)
+
+    assert job._write_records(presence, recorded_at, 3600, session, 'lecture.mp4') == 1
+    # Re-running for the same recording finds the stored UTC rows
+    assert job._write_records(presence, recorded_at, 3600, session, 'lecture.mp4') == 0
+
+    record = db.query(AttendanceRecord).one()
+    assert record.check_in_time == datetime(2024, 3, 4, 3, 50)
+    assert record.check_out_time == datetime(2024, 3, 4, 4, 10)
+    assert record.is_late and record.is_early_departure